@@ -0,0 +1,246 @@
+"""
+Benchmark of the product API, used by the `benchmark_api` command.
+
+`seed_catalog` creates a synthetic catalog with the factories of `product.factories`, and `run_benchmark` sends
+a weighted mix of requests to the list of products of a category, products, facets and ratings through the test
+client, recording the latency, the number of queries and the peak of allocated memory of every request.
+The results of runs are plain dictionaries, so they are saved as JSON and compared with `compare_results`.
+"""
+import random
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .factories import create_categories, create_features, create_products, create_users
+from .metrics import RequestMetrics
+from .models import Category, Features, Product
+
+BENCHMARK_CATEGORY_TITLE = 'Benchmark API category'
+BENCHMARK_FEATURE_VALUE = 'benchmark api'
+BENCHMARK_USERNAME = 'benchmark_api_user'
+
+# Relative weights of the endpoints in the request mix
+REQUEST_MIX = {
+    'list': 50,
+    'list_filtered': 15,
+    'item': 20,
+    'facets': 10,
+    'rating': 5,
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+def delete_catalog():
+    """
+    Delete the catalog created by `seed_catalog`.
+    """
+    Category.objects.filter(title__startswith=BENCHMARK_CATEGORY_TITLE).delete()
+    Features.objects.filter(value__startswith=BENCHMARK_FEATURE_VALUE).delete()
+    User.objects.filter(username__startswith=BENCHMARK_USERNAME).delete()
+
+
+def seed_catalog(categories: int, products: int, keys: int, values: int, ratings: int, images: int, users: int,
+                 random_generator: random.Random) -> dict:
+    """
+    Create a catalog of products spread over the categories, with one value of every feature key,
+    up to `ratings` ratings and `images` images of every product.
+
+    Returns:
+        The catalog of `get_catalog`.
+    """
+    create_products(
+        create_categories(categories, BENCHMARK_CATEGORY_TITLE),
+        products,
+        create_features(keys, values, BENCHMARK_FEATURE_VALUE),
+        create_users(users, BENCHMARK_USERNAME),
+        max_ratings=ratings,
+        max_images=images,
+        random_generator=random_generator,
+        prefix='Benchmark API product',
+    )
+
+    return get_catalog()
+
+
+def get_catalog() -> dict:
+    """
+    Get the IDs of the categories, products, features by keys and users of the seeded catalog,
+    or None if it isn't seeded.
+    """
+    category_ids = list(
+        Category.objects.filter(title__startswith=BENCHMARK_CATEGORY_TITLE).order_by('id').values_list('id', flat=True))
+    if not category_ids:
+        return None
+
+    features_by_keys = {}
+    for feature_id, key in Features.objects.filter(
+            value__startswith=BENCHMARK_FEATURE_VALUE).order_by('id').values_list('id', 'key'):
+        features_by_keys.setdefault(key, []).append(feature_id)
+
+    return {
+        'category_ids': category_ids,
+        'product_ids': list(
+            Product.objects.filter(category_id__in=category_ids).order_by('id').values_list('id', flat=True)),
+        'feature_ids': [features_by_keys[key] for key in sorted(features_by_keys)],
+        'user_ids': list(
+            User.objects.filter(username__startswith=BENCHMARK_USERNAME).order_by('id').values_list('id', flat=True)),
+    }
+
+
+def get_request(endpoint: str, catalog: dict, random_generator: random.Random) -> tuple:
+    """
+    Get a random request to the endpoint.
+
+    Returns:
+        A tuple of the method, the path, the query parameters and the ID of the user sending the request or None.
+    """
+    category_id = random_generator.choice(catalog['category_ids'])
+    filter_params = [
+        random_generator.choice(key_feature_ids)
+        for key_feature_ids in random_generator.sample(
+            catalog['feature_ids'], min(len(catalog['feature_ids']), random_generator.randint(1, 3)))
+    ]
+
+    if endpoint == 'list':
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        return 'get', f'/api/v1/category/{category_id}/', {
+            'limit': page_size,
+            'offset': page_size * random_generator.choice([0, 0, 0, 1, 2]),
+            'sort_by': random_generator.choice(list(Product.SORT_FIELDS)),
+            'sort_dict': random_generator.choice(['asc', 'desc']),
+        }, None
+    if endpoint == 'list_filtered':
+        return 'get', f'/api/v1/category/{category_id}/', {'filter': filter_params}, None
+    if endpoint == 'item':
+        return 'get', f'/api/v1/product/{random_generator.choice(catalog["product_ids"])}/', {}, None
+    if endpoint == 'facets':
+        return 'get', f'/api/v1/feature/category/{category_id}/', {'filter': filter_params[:1]}, None
+
+    product_id = random_generator.choice(catalog['product_ids'])
+    grade = random_generator.choice(['like', 'dislike'])
+    return random_generator.choice(['post', 'delete']), f'/api/v1/rating/{product_id}/{grade}/', {}, \
+        random_generator.choice(catalog['user_ids'])
+
+
+def get_percentile(sorted_values: list, percentile: int) -> float:
+    """
+    Get the percentile of sorted values with the nearest-rank method.
+    """
+    if not sorted_values:
+        return None
+
+    return sorted_values[max(0, -(-len(sorted_values) * percentile // 100) - 1)]
+
+
+def run_benchmark(catalog: dict, requests: int, warmup: int, random_generator: random.Random,
+                  allocations: bool = False, request_mix: dict = None) -> dict:
+    """
+    Send the requests of the request mix after `warmup` requests which aren't measured.
+
+    Returns:
+        The results of endpoints by their names with the number of requests and statuses, percentiles of
+        the latency in milliseconds, the mean and maximum number of queries and, with `allocations`,
+        percentiles of the peak of memory allocated by a request in KiB.
+    """
+    request_mix = request_mix or REQUEST_MIX
+    endpoints = list(request_mix)
+    weights = [request_mix[endpoint] for endpoint in endpoints]
+    client = Client()
+    authorizations = {}
+    measurements = {endpoint: [] for endpoint in endpoints}
+
+    if allocations:
+        tracemalloc.start()
+    try:
+        for number in range(warmup + requests):
+            endpoint = random_generator.choices(endpoints, weights)[0]
+            method, path, query_params, user_id = get_request(endpoint, catalog, random_generator)
+            headers = {}
+            if user_id is not None:
+                if user_id not in authorizations:
+                    authorizations[user_id] = 'Bearer ' + str(RefreshToken.for_user(User(id=user_id)).access_token)
+                headers['Authorization'] = authorizations[user_id]
+
+            metrics = RequestMetrics()
+            if allocations:
+                tracemalloc.reset_peak()
+                allocated_before = tracemalloc.get_traced_memory()[0]
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.execute_wrapper))
+                started_at = time.perf_counter()
+                if method == 'get':
+                    response = client.get(path, query_params, headers=headers)
+                else:
+                    response = getattr(client, method)(path, headers=headers)
+                duration = (time.perf_counter() - started_at) * 1000
+
+            if number < warmup:
+                continue
+            measurements[endpoint].append({
+                'duration': duration,
+                'queries': metrics.queries,
+                'status': response.status_code,
+                'allocated': (tracemalloc.get_traced_memory()[1] - allocated_before) / 1024 if allocations else None,
+            })
+    finally:
+        if allocations:
+            tracemalloc.stop()
+
+    return {
+        endpoint: get_endpoint_results(endpoint_measurements, allocations)
+        for endpoint, endpoint_measurements in measurements.items()
+        if endpoint_measurements
+    }
+
+
+def get_endpoint_results(measurements: list, allocations: bool) -> dict:
+    """
+    Get the results of an endpoint from the measurements of its requests.
+    """
+    durations = sorted(measurement['duration'] for measurement in measurements)
+    queries = [measurement['queries'] for measurement in measurements]
+    statuses = {}
+    for measurement in measurements:
+        statuses[str(measurement['status'])] = statuses.get(str(measurement['status']), 0) + 1
+
+    results = {
+        'requests': len(measurements),
+        'statuses': statuses,
+        **{f'p{percentile}_ms': round(get_percentile(durations, percentile), 3) for percentile in PERCENTILES},
+        'mean_queries': round(sum(queries) / len(queries), 2),
+        'max_queries': max(queries),
+    }
+    if allocations:
+        allocated = sorted(measurement['allocated'] for measurement in measurements)
+        results.update({
+            f'p{percentile}_allocated_kib': round(get_percentile(allocated, percentile), 1)
+            for percentile in PERCENTILES
+        })
+
+    return results
+
+
+def compare_results(baseline: dict, results: dict) -> dict:
+    """
+    Get the relative changes of the numeric results of endpoints from the baseline, in percent.
+    """
+    changes = {}
+    for endpoint, endpoint_results in results.items():
+        baseline_results = baseline.get(endpoint)
+        if baseline_results is None:
+            continue
+        changes[endpoint] = {
+            name: round((value - baseline_results[name]) / baseline_results[name] * 100, 1)
+            for name, value in endpoint_results.items()
+            if isinstance(value, (int, float)) and name != 'requests' and baseline_results.get(name)
+        }
+
+    return changes
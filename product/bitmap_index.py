@@ -0,0 +1,183 @@
+"""
+In-process bitmap index of the features of products per category.
+
+Every product of a category has a position, and the bitmap of a feature is an `int` with the bits
+of the positions of the products having the feature set, so filtering products and counting facets
+are `&`, `|` and `bit_count()` operations in memory instead of queries on the features of products.
+The index of a category is loaded lazily, dropped by signals when the products or features of
+the category change and reloaded after `PRODUCT_BITMAP_INDEX_TTL` seconds to pick up changes
+made by other processes.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Product, Features
+
+
+class CategoryBitmapIndex:
+    """
+    Bitmaps of the features of products of one category.
+    """
+
+    def __init__(self, category_id: int):
+        self.category_id = category_id
+        self.loaded_at = time.monotonic()
+
+        self.product_ids = list(
+            Product.objects.filter(category_id=category_id).order_by('id').values_list('id', flat=True))
+        self.all_products = (1 << len(self.product_ids)) - 1
+
+        positions = {product_id: position for position, product_id in enumerate(self.product_ids)}
+        features_bits = {}
+        for product_id, feature_id in Product.features.through.objects.filter(
+                product__category_id=category_id).values_list('product_id', 'features_id'):
+            position = positions.get(product_id)
+            if position is None:
+                continue
+            features_bits.setdefault(feature_id, bytearray(len(self.product_ids) // 8 + 1))
+            features_bits[feature_id][position // 8] |= 1 << (position % 8)
+
+        self.features_bitmaps = {
+            feature_id: int.from_bytes(bits, 'little') for feature_id, bits in features_bits.items()
+        }
+        self.features = list(
+            Features.objects.filter(id__in=list(self.features_bitmaps)).order_by('key', 'value').values_list(
+                'id', 'key', 'value'))
+        self.features_keys = {feature_id: key for feature_id, key, _ in self.features}
+
+    def get_features_groups(self, filter_params) -> dict:
+        """
+        Get the IDs of the selected features grouped by the keys of the features.
+        Only the keys of features without products in the category are selected from the database.
+        """
+        features_ids = sorted({int(feature_id) for feature_id in filter_params})
+        features_keys = {
+            feature_id: self.features_keys[feature_id] for feature_id in features_ids if feature_id in self.features_keys
+        }
+        if len(features_keys) < len(features_ids):
+            features_keys.update(Features.objects.filter(
+                id__in=[feature_id for feature_id in features_ids if feature_id not in features_keys]
+            ).values_list('id', 'key'))
+
+        features_groups = {}
+        for feature_id in sorted(features_keys):
+            features_groups.setdefault(features_keys[feature_id], []).append(feature_id)
+
+        return features_groups
+
+    def get_products_bitmap(self, features_groups: dict) -> int:
+        """
+        Get the bitmap of products having any feature of every group of features.
+        """
+        products_bitmap = self.all_products
+        for features_ids in features_groups.values():
+            key_bitmap = 0
+            for feature_id in features_ids:
+                key_bitmap |= self.features_bitmaps.get(feature_id, 0)
+            products_bitmap &= key_bitmap
+
+        return products_bitmap
+
+    def get_product_ids(self, products_bitmap: int) -> list:
+        """
+        Get the IDs of products whose bits are set in the bitmap.
+        """
+        product_ids = []
+        for byte_position, byte in enumerate(products_bitmap.to_bytes(len(self.product_ids) // 8 + 1, 'little')):
+            while byte:
+                lowest_bit = byte & -byte
+                product_ids.append(self.product_ids[byte_position * 8 + lowest_bit.bit_length() - 1])
+                byte ^= lowest_bit
+
+        return product_ids
+
+    def get_facets(self, features_groups: dict) -> list:
+        """
+        Get the keys of features of the category with the values and the count of products,
+        counted the same way as `CategoryFacet.get_facets_by_category`.
+        """
+        all_groups_bitmap = self.get_products_bitmap(features_groups)
+        keys_bitmaps = {
+            key: self.get_products_bitmap({
+                other_key: features_ids
+                for other_key, features_ids in features_groups.items() if other_key != key
+            })
+            for key in features_groups
+        }
+
+        facets_by_keys = {}
+        for feature_id, key, value in self.features:
+            counted_products = keys_bitmaps.get(key, all_groups_bitmap)
+            facets_by_keys.setdefault(key, []).append({
+                'value': value,
+                'id': feature_id,
+                'product_count': (self.features_bitmaps[feature_id] & counted_products).bit_count(),
+            })
+
+        return [{'key': key, 'options': options} for key, options in facets_by_keys.items()]
+
+
+_category_indexes = {}
+_category_indexes_lock = threading.Lock()
+
+
+def get_category_index(category_id: int) -> CategoryBitmapIndex:
+    """
+    Get the bitmap index of a category, loading it if it isn't loaded or is older than the TTL.
+    """
+    with _category_indexes_lock:
+        category_index = _category_indexes.get(category_id)
+
+    if category_index is None or time.monotonic() - category_index.loaded_at > settings.PRODUCT_BITMAP_INDEX_TTL:
+        category_index = CategoryBitmapIndex(category_id)
+        with _category_indexes_lock:
+            _category_indexes[category_id] = category_index
+
+    return category_index
+
+
+def invalidate_category_indexes(category_ids):
+    """
+    Drop the loaded bitmap indexes of categories.
+    """
+    with _category_indexes_lock:
+        for category_id in category_ids:
+            _category_indexes.pop(category_id, None)
+
+
+def get_filtered_product_ids(category_id: int, filter_params) -> list:
+    """
+    Get the IDs of products of a category having any of the selected features of every key.
+    Returns None if none of the selected features exist.
+    """
+    category_index = get_category_index(category_id)
+    features_groups = category_index.get_features_groups(filter_params)
+    if not features_groups:
+        return None
+
+    return category_index.get_product_ids(category_index.get_products_bitmap(features_groups))
+
+
+def count_filtered_products(category_id: int, filter_params) -> int:
+    """
+    Count the products of a category having any of the selected features of every key, from the bits
+    of the bitmap of the products. Returns None if none of the selected features exist.
+    """
+    category_index = get_category_index(category_id)
+    features_groups = category_index.get_features_groups(filter_params)
+    if not features_groups:
+        return None
+
+    return category_index.get_products_bitmap(features_groups).bit_count()
+
+
+def get_facets_by_category(category_id: int, filter_params=None) -> list:
+    """
+    Get the keys of features of products by category ID with the values and the count of products
+    matching the filter parameters.
+    """
+    category_index = get_category_index(category_id)
+
+    return category_index.get_facets(category_index.get_features_groups(filter_params or []))
@@ -0,0 +1,354 @@
+"""
+Caching of responses of catalog views, invalidated by versions of categories and products.
+
+Every category and product has a version in the shared cache `PRODUCT_VERSION_CACHE`, bumped by signals
+when the products, their features, images or ratings change. The versions are a part of the cache keys of
+the responses, so a change makes the cached responses unreachable at once and they can be cached for hours,
+also in the memory of processes. A response missing or expiring in the cache is computed by one request
+while the others wait for it or get the expired response.
+
+The cached responses don't depend on the user, so they are shared by anonymous and authenticated users,
+and the data of the user, like the rating of a product, is added to them for every request.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+CATEGORY_VERSION_KEY = 'product:version:category:{category_id}'
+CATEGORIES_VERSION_KEY = 'product:version:categories'
+PRODUCT_VERSION_KEY = 'product:version:product:{product_id}'
+# Version of the data shown with every product, like titles of categories and features
+CATALOG_VERSION_KEY = 'product:version:catalog'
+WAIT_POLL_INTERVAL = 0.05
+
+# The events of the keys whose responses are computed by requests of the process, set when they are computed
+_computing_events = {}
+_computing_events_lock = threading.Lock()
+
+
+def get_version_cache():
+    return caches[settings.PRODUCT_VERSION_CACHE]
+
+
+def get_new_version():
+    """
+    Get a version for a key missing in the cache, different from the versions before the key was evicted.
+    """
+    return time.time_ns() // 1000
+
+
+def get_versions(version_keys) -> list:
+    """
+    Get the current versions of version keys, setting new ones for the keys which aren't in the cache.
+    """
+    cache = get_version_cache()
+    versions = cache.get_many(version_keys)
+    missing_version_keys = [version_key for version_key in version_keys if version_key not in versions]
+    if missing_version_keys:
+        for version_key in missing_version_keys:
+            cache.add(version_key, get_new_version(), timeout=None)
+        versions.update(cache.get_many(missing_version_keys))
+
+    return [versions[version_key] for version_key in version_keys]
+
+
+def bump_versions(version_keys):
+    """
+    Bump the versions of version keys, making the responses cached with the previous versions unreachable.
+    """
+    cache = get_version_cache()
+    for version_key in version_keys:
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, get_new_version(), timeout=None)
+
+
+def bump_category_versions(category_ids):
+    """
+    Bump the versions of categories whose products changed.
+    """
+    bump_versions({
+        CATEGORY_VERSION_KEY.format(category_id=category_id) for category_id in category_ids if category_id is not None
+    })
+
+
+def bump_product_versions(product_ids):
+    """
+    Bump the versions of changed products.
+    """
+    bump_versions({
+        PRODUCT_VERSION_KEY.format(product_id=product_id) for product_id in product_ids if product_id is not None
+    })
+
+
+def bump_versions_on_commit(category_ids=(), product_ids=()):
+    """
+    Bump the versions of categories and products when the current transaction is committed,
+    or at once outside of a transaction, so requests reading the rows before the commit don't cache them
+    with the new versions.
+    """
+    category_ids, product_ids = list(category_ids), list(product_ids)
+
+    def bump():
+        bump_category_versions(category_ids)
+        bump_product_versions(product_ids)
+
+    transaction.on_commit(bump)
+
+
+def bump_categories_version():
+    """
+    Bump the version of the list of categories.
+    """
+    bump_versions([CATEGORIES_VERSION_KEY])
+
+
+def bump_catalog_version():
+    """
+    Bump the version of the data shown with every product.
+    """
+    bump_versions([CATALOG_VERSION_KEY])
+
+
+def category_version_keys(request, category_id, **kwargs):
+    return [CATEGORY_VERSION_KEY.format(category_id=category_id)]
+
+
+def categories_version_keys(request, **kwargs):
+    return [CATEGORIES_VERSION_KEY]
+
+
+def product_version_keys(product_id):
+    return [PRODUCT_VERSION_KEY.format(product_id=product_id), CATALOG_VERSION_KEY]
+
+
+def normalize_query_params(query_params, list_params=(), defaults=None) -> dict:
+    """
+    Get the query parameters in the same form for the same result: with sorted unique values of the parameters
+    whose order doesn't matter and with defaults of the missing parameters.
+    """
+    normalized_query_params = {name: query_params.getlist(name) for name in query_params}
+    for name in list_params:
+        if name in normalized_query_params:
+            normalized_query_params[name] = sorted(set(normalized_query_params[name]))
+    for name, value in (defaults or {}).items():
+        normalized_query_params.setdefault(name, [value])
+
+    return normalized_query_params
+
+
+def normalize_product_list_query_params(query_params) -> dict:
+    """
+    Normalize the query parameters of the list of products, `sort_dict` is descending only for `desc`.
+    """
+    normalized_query_params = normalize_query_params(query_params, ('filter',), {'sort_by': 'title'})
+    normalized_query_params['sort_dict'] = ['desc' if query_params.get('sort_dict') == 'desc' else 'asc']
+
+    return normalized_query_params
+
+
+def normalize_facets_query_params(query_params) -> dict:
+    return normalize_query_params(query_params, ('filter',))
+
+
+def get_page_cache_key(request, version_keys, versions, normalize=normalize_query_params) -> str:
+    """
+    Get the cache key of a response for the versions and the requested url, normalized query and media type.
+    """
+    request_hash = hashlib.md5('|'.join([
+        request.get_host(),
+        request.path,
+        urlencode(sorted(normalize(request.GET).items()), doseq=True),
+        request.META.get('HTTP_ACCEPT', ''),
+    ]).encode('utf-8')).hexdigest()
+    version_hash = ':'.join(f'{version_key}:{version}' for version_key, version in zip(version_keys, versions))
+
+    return f'product:page:{version_hash}:{request_hash}'
+
+
+def get_validated_access_token(request):
+    """
+    Get the access token of a request with checked signature and expiration without loading the user,
+    None if the request has no access token.
+    Raises InvalidToken or TokenError exception if the token is invalid.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+
+    return authentication.get_validated_token(raw_token)
+
+
+def is_authorization_valid(request) -> bool:
+    """
+    Check the access token of a request, so requests with invalid tokens aren't answered from the cache
+    but rejected by the view.
+    """
+    try:
+        get_validated_access_token(request)
+    except (InvalidToken, TokenError):
+        return False
+
+    return True
+
+
+def is_early_refresh(entry: dict, beta: float) -> bool:
+    """
+    Decide whether to recompute a fresh entry before it expires, with the probability growing as the expiration
+    gets closer and faster for entries computed slower (XFetch), so the entries of hot keys are recomputed
+    by one request before they expire instead of by all requests after.
+    """
+    return time.time() - entry['delta'] * beta * math.log(random.random() or 1e-12) >= entry['expires_at']
+
+
+def wait_for_entry(page_cache, cache_key: str, event: threading.Event, timeout: float):
+    """
+    Wait until the entry of a key computed by another request is cached, None if it isn't cached in time.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if event.wait(timeout=WAIT_POLL_INTERVAL):
+            return page_cache.get(cache_key)
+
+        entry = page_cache.get(cache_key)
+        if entry is not None:
+            return entry
+
+    return None
+
+
+def get_or_compute(page_cache, cache_key: str, compute, timeout: int):
+    """
+    Get a value from the cache, computing it with `compute` if it's missing or expired.
+
+    Only one request computes the value of a key at a time, the other requests of the key wait for it
+    for up to `PRODUCT_CACHE_LOCK_TIMEOUT` seconds when there is no cached value, or get the expired value
+    for up to `PRODUCT_CACHE_STALE_TIMEOUT` seconds after the expiration. Fresh values are recomputed early
+    with a probability set by `PRODUCT_CACHE_EARLY_REFRESH_BETA`.
+
+    Arguments:
+        page_cache (BaseCache): The cache of values.
+        cache_key (str): The key of the value.
+        compute (callable): A function returning the value and whether it can be cached.
+        timeout (int): Seconds to keep the value fresh.
+
+    Returns:
+        The cached or the computed value.
+    """
+    lock_key = f'{cache_key}:lock'
+
+    entry = page_cache.get(cache_key)
+    if entry is not None and (
+            entry['expires_at'] > time.time()
+            and not is_early_refresh(entry, settings.PRODUCT_CACHE_EARLY_REFRESH_BETA)):
+        return entry['value']
+
+    with _computing_events_lock:
+        event = _computing_events.get(cache_key)
+        is_computing_in_process = event is not None
+        if not is_computing_in_process:
+            event = _computing_events[cache_key] = threading.Event()
+
+    if is_computing_in_process:
+        if entry is None:
+            entry = wait_for_entry(page_cache, cache_key, event, settings.PRODUCT_CACHE_LOCK_TIMEOUT)
+
+        return compute()[0] if entry is None else entry['value']
+
+    is_locked = False
+    try:
+        is_locked = page_cache.add(lock_key, True, timeout=settings.PRODUCT_CACHE_LOCK_TIMEOUT)
+        if not is_locked:
+            if entry is None:
+                entry = wait_for_entry(page_cache, cache_key, threading.Event(), settings.PRODUCT_CACHE_LOCK_TIMEOUT)
+            if entry is not None:
+                return entry['value']
+
+        started_at = time.monotonic()
+        value, is_cacheable = compute()
+        if is_cacheable:
+            page_cache.set(cache_key, {
+                'value': value,
+                'expires_at': time.time() + timeout,
+                'delta': time.monotonic() - started_at,
+            }, timeout + settings.PRODUCT_CACHE_STALE_TIMEOUT)
+    finally:
+        if is_locked:
+            page_cache.delete(lock_key)
+        with _computing_events_lock:
+            _computing_events.pop(cache_key, None)
+        event.set()
+
+    return value
+
+
+def get_versioned_data(version_keys, name: str, compute, timeout=None, cache=None):
+    """
+    Get data independent of the user cached under the versions of the version keys,
+    by default for `PRODUCT_CACHE_TIMEOUT` seconds in `PRODUCT_CACHE`.
+
+    Arguments:
+        version_keys (list): The version keys invalidating the data.
+        name (str): The name of the data.
+        compute (callable): A function returning the data and whether it can be cached.
+
+    Returns:
+        The cached or the computed data.
+    """
+    version_hash = ':'.join(
+        f'{version_key}:{version}' for version_key, version in zip(version_keys, get_versions(version_keys)))
+
+    return get_or_compute(
+        caches[cache or settings.PRODUCT_CACHE],
+        f'product:data:{version_hash}:{name}',
+        compute,
+        settings.PRODUCT_CACHE_TIMEOUT if timeout is None else timeout,
+    )
+
+
+def cache_versioned_page(get_version_keys, normalize=normalize_query_params, timeout=None, cache=None):
+    """
+    Cache successful GET responses of a view independent of the user under the versions of the keys returned
+    by `get_version_keys` for the arguments of the view, by default for `PRODUCT_CACHE_TIMEOUT` seconds
+    in `PRODUCT_CACHE`, for the query parameters normalized by `normalize`.
+    Requests with invalid access tokens skip the cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def cached_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not is_authorization_valid(request):
+                return view(request, *args, **kwargs)
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and hasattr(response, 'render') and callable(response.render):
+                    response.render()
+
+                return response, response.status_code == 200
+
+            version_keys = get_version_keys(request, *args, **kwargs)
+            cache_key = get_page_cache_key(request, version_keys, get_versions(version_keys), normalize)
+
+            return get_or_compute(
+                caches[cache or settings.PRODUCT_CACHE],
+                cache_key,
+                compute,
+                settings.PRODUCT_CACHE_TIMEOUT if timeout is None else timeout,
+            )
+
+        return cached_view
+
+    return decorator
@@ -0,0 +1,222 @@
+"""
+Cache backends of the catalog.
+
+`TwoLevelCache` keeps recently used entries in a bounded LRU in the memory of the process in front of
+a shared cache alias (memcached in production), so hot keys are read without a network round trip
+and cold keys are still shared between processes.
+
+`LockedFileBasedCache` is the shared cache of the processes of a host without memcached, with `add` and `incr`
+atomic across the processes, as the versions of responses and the locks of their computation need.
+"""
+import os
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+_MISSING = object()
+
+# The local levels by the shared alias, common to the instances of the backend in all threads of the process
+_local_levels = {}
+_local_levels_lock = threading.Lock()
+
+
+class LocalLevel:
+    """
+    Entries of the local level of a cache with the counts of hits, misses and evictions.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+
+
+class TwoLevelCache(BaseCache):
+    """
+    Cache with a per-process LRU of at most `LOCAL_MAX_ENTRIES` entries kept for at most `LOCAL_TIMEOUT` seconds
+    in front of the cache alias given as `LOCATION`. The LRU is shared by the threads of the process.
+
+    Writes go to both levels and drop the local entry of the key, but entries cached locally by other
+    processes are dropped only by their local timeout, so the cache is meant for values that don't change
+    under the same key, like responses cached under versioned keys, or can be `LOCAL_TIMEOUT` seconds old.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        with _local_levels_lock:
+            self._local_level = _local_levels.setdefault(location, LocalLevel())
+
+    @property
+    def shared_cache(self):
+        return caches[self._shared_alias]
+
+    def get_local_key(self, key, version=None):
+        return self.shared_cache.make_and_validate_key(key, version=version)
+
+    def get_local(self, local_key):
+        """
+        Get a value from the local level, or `_MISSING` if it isn't cached or expired.
+        """
+        with self._local_level.lock:
+            entry = self._local_level.entries.get(local_key)
+            if entry is None:
+                return _MISSING
+
+            expires_at, pickled_value = entry
+            if expires_at <= time.monotonic():
+                del self._local_level.entries[local_key]
+                return _MISSING
+
+            self._local_level.entries.move_to_end(local_key)
+
+        return pickle.loads(pickled_value)
+
+    def set_local(self, local_key, value, timeout=DEFAULT_TIMEOUT):
+        """
+        Put a value to the local level for the shorter of the timeout and `LOCAL_TIMEOUT`,
+        evicting the least recently used entries above `LOCAL_MAX_ENTRIES`.
+        """
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        local_timeout = self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+        if local_timeout <= 0 or self._local_max_entries <= 0:
+            self.delete_local(local_key)
+            return
+
+        pickled_value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._local_level.lock:
+            self._local_level.entries[local_key] = (time.monotonic() + local_timeout, pickled_value)
+            self._local_level.entries.move_to_end(local_key)
+            while len(self._local_level.entries) > self._local_max_entries:
+                self._local_level.entries.popitem(last=False)
+                self._local_level.stats['evictions'] += 1
+
+    def delete_local(self, local_key):
+        with self._local_level.lock:
+            self._local_level.entries.pop(local_key, None)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.get_local_key(key, version)
+        value = self.get_local(local_key)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+
+        value = self.shared_cache.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+
+        self._count('shared_hits')
+        self.set_local(local_key, value)
+
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared_cache.set(key, value, timeout, version=version)
+        self.set_local(self.get_local_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.get_local_key(key, version)
+        if not self.shared_cache.add(key, value, timeout, version=version):
+            self.delete_local(local_key)
+            return False
+
+        self.set_local(local_key, value, timeout)
+
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.delete_local(self.get_local_key(key, version))
+
+        return self.shared_cache.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.delete_local(self.get_local_key(key, version))
+
+        return self.shared_cache.delete(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.delete_local(self.get_local_key(key, version))
+
+        return self.shared_cache.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.delete_local(self.get_local_key(key, version))
+
+        return self.shared_cache.decr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        with self._local_level.lock:
+            self._local_level.entries.clear()
+        self.shared_cache.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Get the counts of hits of both levels, misses and evictions from the local level since the start
+        of the process, and the number of entries in the local level.
+        """
+        with self._local_level.lock:
+            return {**self._local_level.stats, 'local_entries': len(self._local_level.entries)}
+
+    def reset_stats(self):
+        with self._local_level.lock:
+            self._local_level.stats = dict.fromkeys(self._local_level.stats, 0)
+
+    def _count(self, stat):
+        with self._local_level.lock:
+            self._local_level.stats[stat] += 1
+
+
+class LockedFileBasedCache(FileBasedCache):
+    """
+    File-based cache whose `add` and `incr` hold an exclusive lock on a file of the cache directory, so they are
+    atomic across the processes sharing the directory, unlike the check then set of `FileBasedCache`.
+    `incr` keeps the expiration of the key.
+    """
+    lock_filename = 'cache.lock'
+
+    @contextmanager
+    def lock(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.lock_filename), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.lock():
+            return super().add(key, value, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        with self.lock():
+            try:
+                with open(self._key_to_file(key, version), 'rb') as cache_file:
+                    expiry = pickle.load(cache_file)
+                    if expiry is not None and expiry <= time.time():
+                        raise FileNotFoundError
+                    value = pickle.loads(zlib.decompress(cache_file.read()))
+            except FileNotFoundError:
+                raise ValueError(f"Key '{key}' not found")
+
+            value += delta
+            self.set(key, value, None if expiry is None else expiry - time.time(), version=version)
+
+        return value
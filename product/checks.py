@@ -0,0 +1,51 @@
+"""
+System checks of the settings of the catalog.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.utils.module_loading import import_string
+
+from product.cache_backends import TwoLevelCache
+
+# Backends whose `add` and `incr` are atomic for all processes sharing the cache, LocMemCache only has one process
+ATOMIC_CACHE_BACKENDS = (
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'product.cache_backends.LockedFileBasedCache',
+)
+
+
+def get_shared_cache_backend(alias):
+    """
+    Get the class of the backend of a cache alias, or of its shared alias for `TwoLevelCache`.
+    """
+    backend = import_string(settings.CACHES[alias]['BACKEND'])
+    if issubclass(backend, TwoLevelCache):
+        return get_shared_cache_backend(settings.CACHES[alias]['LOCATION'])
+
+    return backend
+
+
+@register(Tags.caches)
+def check_atomic_caches(app_configs, **kwargs):
+    """
+    Check the caches of versions and of locks of responses are atomic, since a lost bump of a version keeps
+    responses of the previous data cached and a lock added twice lets two processes compute the same response.
+    """
+    errors = []
+    atomic_backends = tuple(import_string(backend) for backend in ATOMIC_CACHE_BACKENDS)
+    for setting_name in ('PRODUCT_VERSION_CACHE', 'PRODUCT_CACHE'):
+        alias = getattr(settings, setting_name)
+        if alias not in settings.CACHES:
+            errors.append(Error(f'{setting_name} is not in CACHES.', obj=alias, id='product.E001'))
+        elif not issubclass(get_shared_cache_backend(alias), atomic_backends):
+            errors.append(Error(
+                f'The cache {alias!r} of {setting_name} has no atomic add and incr.',
+                hint=f'Use one of the backends {", ".join(ATOMIC_CACHE_BACKENDS)}.',
+                obj=alias,
+                id='product.E002',
+            ))
+
+    return errors
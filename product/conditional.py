@@ -0,0 +1,109 @@
+"""
+Validators of conditional GET requests of catalog views, used with `django.views.decorators.http.condition`.
+
+The validators are computed before the view, so a request with a matching `If-None-Match` gets 304 without
+serializing the response. The ETags are strong: they are hashes of everything the response depends on,
+including the requested url and media type. Only products have `Last-Modified`, their update time, set by signals
+also when their features, images, ratings or category change. Lists have none, since a deleted category
+or product changes no update time of the remaining rows.
+"""
+import hashlib
+
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import (
+    get_versions,
+    product_version_keys,
+    category_version_keys,
+    categories_version_keys,
+    get_validated_access_token,
+)
+from .models import Product, Category
+
+
+def get_etag(request, *values) -> str:
+    """
+    Get the strong ETag of the response for the values it depends on.
+    """
+    return hashlib.md5('|'.join(map(str, [
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        *values,
+    ])).encode('utf-8')).hexdigest()
+
+
+def get_product_validators(request, pk):
+    """
+    Get the values the product depends on for the user of the access token with the `user_id`,
+    memoized in the request, so the view takes the grade of the user from them.
+    Returns None for requests with invalid access tokens and for missing products, so the view rejects them.
+    """
+    if not hasattr(request, '_product_validators'):
+        try:
+            access_token = get_validated_access_token(request)
+        except (InvalidToken, TokenError):
+            request._product_validators = None
+        else:
+            user_id = access_token[api_settings.USER_ID_CLAIM] if access_token is not None else None
+            validators = Product.get_validators(pk, user_id)
+            request._product_validators = None if validators is None else {**validators, 'user_id': user_id}
+
+    return request._product_validators
+
+
+def product_etag(request, pk, **kwargs):
+    """
+    Get the ETag of a product from its update time, rating counters, the grade of the user
+    and the versions of the product and the catalog, which change with its features and images.
+    """
+    validators = get_product_validators(request, pk)
+    if validators is None:
+        return None
+
+    return get_etag(request, *validators.values(), *get_versions(product_version_keys(pk)))
+
+
+def product_last_modified(request, pk, **kwargs):
+    """
+    Get the last time a product changed.
+    """
+    validators = get_product_validators(request, pk)
+    if validators is None:
+        return None
+
+    return validators['update_time']
+
+
+def get_categories_validators(request):
+    """
+    Get the values the list of categories depends on, memoized in the request.
+    """
+    if not hasattr(request, '_categories_validators'):
+        request._categories_validators = Category.get_list_validators()
+
+    return request._categories_validators
+
+
+def categories_etag(request, **kwargs):
+    """
+    Get the ETag of the list of categories from the last update time and the count of categories
+    and the version of the list of categories, which changes when a category is deleted.
+    """
+    validators = get_categories_validators(request)
+
+    return get_etag(
+        request, validators['last_update_time'], validators['count'], *get_versions(categories_version_keys(request)))
+
+
+def category_etag(request, category_id, **kwargs):
+    """
+    Get the ETag of a list of products or features of a category from the version of the category,
+    without queries. Requests with invalid access tokens get no ETag, so the view rejects them.
+    """
+    try:
+        get_validated_access_token(request)
+    except (InvalidToken, TokenError):
+        return None
+
+    return get_etag(request, *get_versions(category_version_keys(request, category_id)))
@@ -1,5 +1,23 @@
 """
 Provide errors for web servers.
 """
+from http import HTTPStatus as HttpStatusCode
+
+from rest_framework.exceptions import APIException
+
 BAD_DATA_IN_REQUEST = 'Bad request.'
 NOT_FOUND = 'Not found.'
+RATINGS_BUSY = 'Ratings are busy, retry later.'
+
+
+class RatingBufferFull(APIException):
+    """
+    The buffer of ratings stayed full, the client retries the rating after `wait` seconds from `Retry-After`.
+    """
+    status_code = HttpStatusCode.SERVICE_UNAVAILABLE.value
+    default_detail = RATINGS_BUSY
+    default_code = 'ratings_busy'
+
+    def __init__(self, wait: int):
+        super().__init__()
+        self.wait = wait
@@ -0,0 +1,187 @@
+"""
+Factories of catalog data for tests and benchmarks.
+
+Categories, features and users are created with `bulk_create`. Products are written with `COPY` together with
+their features, ratings and images: their IDs are reserved from the sequence of products before, so the rows
+referencing them are written in the same pass, and the rating counters of products are counted while
+the ratings are generated. Images are rows referencing `PLACEHOLDER_IMAGE` without files, and
+`get_placeholder_image` makes an image in memory for tests uploading images.
+
+The rows are written without signals, so the facets of the categories are refreshed and the versions of
+the categories are bumped when the products are created.
+"""
+import csv
+import io
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from .cache import bump_category_versions
+from .models import Category, CategoryFacet, Features, Product, ProductImage, ProductRating
+
+PLACEHOLDER_IMAGE = 'image/product_images/placeholder.png'
+
+
+def get_placeholder_image(name: str = 'placeholder.png', size: tuple = (1, 1)) -> SimpleUploadedFile:
+    """
+    Get a PNG image of the size made in memory, to upload as an image of a product.
+    """
+    image_file = io.BytesIO()
+    Image.new('RGB', size, (255, 255, 255)).save(image_file, 'PNG')
+
+    return SimpleUploadedFile(name, image_file.getvalue(), content_type='image/png')
+
+
+def create_categories(count: int, prefix: str = 'Category') -> list:
+    """
+    Create categories titled with the prefix and their numbers.
+    """
+    return Category.objects.bulk_create([Category(title=f'{prefix} {number}') for number in range(count)])
+
+
+def create_features(keys: int, values: int, prefix: str = 'Feature') -> list:
+    """
+    Create features with `values` values of every of `keys` keys.
+
+    Returns:
+        The lists of features of keys.
+    """
+    features = Features.objects.bulk_create([
+        Features(key=f'{prefix} key {key}', value=f'{prefix} {key} {value}')
+        for key in range(keys)
+        for value in range(values)
+    ])
+
+    return [features[key * values:(key + 1) * values] for key in range(keys)]
+
+
+def create_users(count: int, prefix: str = 'user') -> list:
+    """
+    Create users with unusable passwords named with the prefix and their numbers.
+    """
+    password = make_password(None)
+
+    return User.objects.bulk_create([
+        User(username=f'{prefix}_{number}', password=password) for number in range(count)
+    ])
+
+
+def reserve_ids(model, count: int) -> range:
+    """
+    Reserve `count` consecutive IDs from the sequence of the table of the model.
+    """
+    if count <= 0:
+        return range(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT setval(pg_get_serial_sequence(%(table)s, %(column)s), '
+            'nextval(pg_get_serial_sequence(%(table)s, %(column)s)) + %(count)s - 1)',
+            {'table': model._meta.db_table, 'column': model._meta.pk.column, 'count': count},
+        )
+        last_id = cursor.fetchone()[0]
+
+    return range(last_id - count + 1, last_id + 1)
+
+
+class CopyWriter:
+    """
+    Writer of rows of a model to its table with `COPY`, buffering the rows until they are flushed.
+    None is written as NULL, and empty strings are written as NULL too.
+    """
+
+    def __init__(self, model, fields: list):
+        columns = ', '.join(connection.ops.quote_name(model._meta.get_field(field).column) for field in fields)
+        self.sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)'
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def flush(self):
+        if not self.buffer.tell():
+            return
+
+        self.buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(self.sql, self.buffer)
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+
+def create_products(categories: list, count: int, features_by_keys: list = (), users: list = (),
+                    max_ratings: int = 0, max_images: int = 0, random_generator: random.Random = None,
+                    prefix: str = 'Product', batch_size: int = 50000) -> list:
+    """
+    Create products spread over the categories in turn with one random feature of every key, up to `max_ratings`
+    ratings of random users and up to `max_images` placeholder images, titled with the prefix and their IDs.
+
+    Arguments:
+        categories (list): Categories of the products.
+        count (int): Number of products.
+        features_by_keys (list): Lists of features of keys, like from `create_features`.
+        users (list): Users rating the products.
+        max_ratings (int): Maximum number of ratings of a product.
+        max_images (int): Maximum number of images of a product.
+        random_generator (Random, optional): Generator of random prices, features, ratings and images.
+        prefix (str): Prefix of titles of the products.
+        batch_size (int): Number of products written with their rows with one `COPY` of every table,
+            the products first.
+
+    Returns:
+        The IDs of the products.
+    """
+    random_generator = random_generator or random.Random(0)
+    random_number = random_generator.random
+    now = timezone.now().isoformat()
+    category_ids = [category.id for category in categories]
+    features_ids_by_keys = [[feature.id for feature in features] for features in features_by_keys]
+    users_ids = [user.id for user in users]
+    max_ratings = min(max_ratings, len(users_ids))
+
+    products_writer = CopyWriter(Product, [
+        'id', 'title', 'text', 'price', 'description', 'category', 'like_count', 'dislike_count',
+        'created_time', 'update_time',
+    ])
+    features_writer = CopyWriter(Product.features.through, ['product', 'features'])
+    ratings_writer = CopyWriter(ProductRating, ['user', 'product', 'grade', 'created_time'])
+    images_writer = CopyWriter(ProductImage, ['title', 'image', 'product', 'renditions'])
+
+    with transaction.atomic():
+        product_ids = reserve_ids(Product, count)
+        for number, product_id in enumerate(product_ids):
+            grades = [
+                (user_id, random_number() < 0.7)
+                for user_id in (
+                    random_generator.sample(users_ids, int(random_number() * (max_ratings + 1))) if max_ratings else ()
+                )
+            ]
+            like_count = sum(grade for _, grade in grades)
+            products_writer.write([
+                product_id, f'{prefix} {product_id}', None, 1 + int(random_number() * 100000),
+                f'{prefix} description', category_ids[number % len(category_ids)],
+                like_count, len(grades) - like_count, now, now,
+            ])
+            for features_ids in features_ids_by_keys:
+                features_writer.write([product_id, features_ids[int(random_number() * len(features_ids))]])
+            for user_id, grade in grades:
+                ratings_writer.write([user_id, product_id, grade, now])
+            for image_number in range(int(random_number() * (max_images + 1))):
+                images_writer.write([f'{prefix} {product_id} {image_number}', PLACEHOLDER_IMAGE, product_id, '{}'])
+
+            if (number + 1) % batch_size == 0 or number + 1 == count:
+                for writer in (products_writer, features_writer, ratings_writer, images_writer):
+                    writer.flush()
+
+        if features_ids_by_keys:
+            CategoryFacet.refresh_facets(category_ids)
+
+    bump_category_versions(category_ids)
+
+    return list(product_ids)
@@ -0,0 +1,113 @@
+import json
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from product.benchmark import (
+    REQUEST_MIX,
+    compare_results,
+    delete_catalog,
+    get_catalog,
+    run_benchmark,
+    seed_catalog,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Send a weighted mix of requests to the list of products, products, facets and ratings through '
+        'the test client and report percentiles of the latency, queries per request and allocations. '
+        'Seeds a synthetic catalog in the configured database if it is missing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=10, help='Number of categories.')
+        parser.add_argument('--products', type=int, default=100000, help='Number of products.')
+        parser.add_argument('--keys', type=int, default=10, help='Number of feature keys.')
+        parser.add_argument('--values', type=int, default=10, help='Number of values of every feature key.')
+        parser.add_argument('--ratings', type=int, default=5, help='Maximum number of ratings of a product.')
+        parser.add_argument('--images', type=int, default=3, help='Maximum number of images of a product.')
+        parser.add_argument('--users', type=int, default=100, help='Number of users rating products.')
+        parser.add_argument('--requests', type=int, default=1000, help='Number of measured requests.')
+        parser.add_argument('--warmup', type=int, default=100, help='Number of requests before measuring.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator.')
+        parser.add_argument('--reseed', action='store_true', help='Recreate the benchmark catalog.')
+        parser.add_argument('--clear-cache', action='store_true', help='Clear the cache of the catalog first.')
+        parser.add_argument('--allocations', action='store_true', help='Trace the memory allocated by requests.')
+        parser.add_argument(
+            '--endpoint',
+            choices=list(REQUEST_MIX),
+            action='append',
+            help='Endpoint of the request mix, can be repeated. Default is all endpoints.',
+        )
+        parser.add_argument('--output', help='File to save the results to as JSON.')
+        parser.add_argument('--compare', help='File with the JSON results of a previous run to compare with.')
+
+    def handle(self, *args, **options):
+        random_generator = random.Random(options['seed'])
+
+        if options['reseed']:
+            delete_catalog()
+
+        catalog = get_catalog()
+        if catalog is None:
+            self.stdout.write(f'Seeding {options["products"]} products...')
+            catalog = seed_catalog(
+                options['categories'], options['products'], options['keys'], options['values'],
+                options['ratings'], options['images'], options['users'], random_generator,
+            )
+        if not catalog['product_ids'] or not catalog['feature_ids'] or not catalog['user_ids']:
+            raise CommandError('The benchmark catalog has no products, features or users, seed it with --reseed.')
+
+        if options['clear_cache']:
+            caches[settings.PRODUCT_CACHE].clear()
+
+        request_mix = {endpoint: REQUEST_MIX[endpoint] for endpoint in options['endpoint'] or REQUEST_MIX}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            results = run_benchmark(
+                catalog, options['requests'], options['warmup'], random_generator,
+                options['allocations'], request_mix,
+            )
+
+        self.write_results(results)
+
+        report = {
+            'options': {
+                name: options[name]
+                for name in ('categories', 'products', 'keys', 'values', 'ratings', 'images', 'users',
+                             'requests', 'warmup', 'seed', 'allocations')
+            },
+            'results': results,
+        }
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                changes = compare_results(json.load(baseline_file)['results'], results)
+            report['changes'] = changes
+            self.write_changes(changes)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results are saved to {options["output"]}'))
+
+    def write_results(self, results):
+        self.stdout.write(
+            f'{"endpoint":>14} {"requests":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} '
+            f'{"queries":>8} {"p95 KiB":>9}'
+        )
+        for endpoint, endpoint_results in results.items():
+            allocated = endpoint_results.get('p95_allocated_kib')
+            self.stdout.write(
+                f'{endpoint:>14} {endpoint_results["requests"]:>8} {endpoint_results["p50_ms"]:>9.2f} '
+                f'{endpoint_results["p95_ms"]:>9.2f} {endpoint_results["p99_ms"]:>9.2f} '
+                f'{endpoint_results["mean_queries"]:>8.2f} {"-" if allocated is None else allocated:>9}'
+            )
+
+    def write_changes(self, changes):
+        self.stdout.write('Changes from the baseline, %:')
+        for endpoint, endpoint_changes in changes.items():
+            self.stdout.write(f'{endpoint:>14} ' + ' '.join(
+                f'{name} {change:+.1f}' for name, change in endpoint_changes.items()))
@@ -0,0 +1,119 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from product.bitmap_index import get_category_index
+from product.factories import create_features, create_products
+from product.models import Category, CategoryFacet, Features, Product
+
+BENCHMARK_CATEGORY_TITLE = 'Benchmark category'
+BENCHMARK_FEATURE_PREFIX = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the time of filtering products by features and counting facets with 1 to N active filters '
+        'on a seeded benchmark category with the ORM and the bitmap engines. '
+        'Seeds the category in the configured database if it is missing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Number of products in the category.')
+        parser.add_argument('--keys', type=int, default=10, help='Number of feature keys.')
+        parser.add_argument('--values', type=int, default=10, help='Number of values of every feature key.')
+        parser.add_argument('--max-filters', type=int, default=10, help='Maximum number of active filters.')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of runs of every query.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator.')
+        parser.add_argument('--reseed', action='store_true', help='Recreate the benchmark category.')
+        parser.add_argument(
+            '--engine',
+            choices=['orm', 'bitmap'],
+            action='append',
+            help='Engine to measure, can be repeated. Default is both engines.',
+        )
+
+    def handle(self, *args, **options):
+        random_generator = random.Random(options['seed'])
+
+        if options['reseed']:
+            Category.objects.filter(title=BENCHMARK_CATEGORY_TITLE).delete()
+            Features.objects.filter(key__startswith=f'{BENCHMARK_FEATURE_PREFIX} key ').delete()
+
+        category = Category.objects.filter(title=BENCHMARK_CATEGORY_TITLE).first()
+        if category is None:
+            category = self.seed_category(options, random_generator)
+
+        features_by_keys = {}
+        for feature_id, key in Features.objects.filter(product__category=category).values_list('id', 'key').distinct():
+            features_by_keys.setdefault(key, []).append(feature_id)
+        keys = sorted(features_by_keys)
+
+        engines = options['engine'] or ['orm', 'bitmap']
+
+        if 'bitmap' in engines:
+            started_at = time.perf_counter()
+            get_category_index(category.id)
+            self.stdout.write(f'Bitmap index loaded in {(time.perf_counter() - started_at) * 1000:.2f} ms')
+
+        self.stdout.write(f'{"filters":>8} {"engine":>8} {"count":>8} {"list ms":>10} {"facets ms":>10}')
+        for filters_count in range(1, options['max_filters'] + 1):
+            filter_params = [
+                str(random_generator.choice(features_by_keys[keys[number % len(keys)]]))
+                for number in range(filters_count)
+            ]
+            for engine in engines:
+                with override_settings(PRODUCT_FILTER_ENGINE=engine):
+                    list_timings, products_count = self.measure(options['repeat'], self.get_first_page, category.id,
+                                                                filter_params)
+                    facets_timings, _ = self.measure(options['repeat'], CategoryFacet.get_facets_by_category,
+                                                     category.id, filter_params)
+
+                self.stdout.write(
+                    f'{filters_count:>8} {engine:>8} {products_count:>8} '
+                    f'{statistics.median(list_timings):>10.2f} {statistics.median(facets_timings):>10.2f}'
+                )
+
+    @staticmethod
+    def measure(repeat, function, *args):
+        """
+        Run the function several times and return the durations of runs in milliseconds and the last result.
+        """
+        timings = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            result = function(*args)
+            timings.append((time.perf_counter() - started_at) * 1000)
+
+        return timings, result
+
+    @staticmethod
+    def get_first_page(category_id, filter_params):
+        """
+        Count the filtered products and fetch the first page of them, as the list of products does.
+        """
+        products_list = Product.get_filtered_and_sorted_list_of_product_by_category(
+            category_id, '', 'title', filter_params)
+        list(products_list[:5])
+
+        products_count = Product.get_count_of_filtered_products(category_id, filter_params)
+        return products_list.count() if products_count is None else products_count
+
+    def seed_category(self, options, random_generator):
+        """
+        Create the benchmark category with products having one value of every feature key.
+        """
+        self.stdout.write(f'Seeding {options["products"]} products...')
+
+        category = Category.objects.create(title=BENCHMARK_CATEGORY_TITLE)
+        create_products(
+            [category],
+            options['products'],
+            create_features(options['keys'], options['values'], BENCHMARK_FEATURE_PREFIX),
+            random_generator=random_generator,
+            prefix='Benchmark product',
+        )
+
+        return category
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from product.cache import bump_category_versions, bump_product_versions
+from product.models import Product, ProductImage
+from product.renditions import create_renditions
+
+
+class Command(BaseCommand):
+    help = 'Create the renditions of images of products, uploaded before or with other widths and formats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='*', type=int, help='IDs of products. Default is all products.')
+        parser.add_argument('--missing', action='store_true', help='Only images without renditions.')
+
+    def handle(self, *args, **options):
+        product_images = ProductImage.objects.select_related('product__category').order_by('id')
+        if options['product_ids']:
+            product_images = product_images.filter(product_id__in=options['product_ids'])
+        if options['missing']:
+            product_images = product_images.filter(renditions={})
+
+        product_ids, category_ids = set(), set()
+        for product_image in product_images.iterator():
+            ProductImage.objects.filter(pk=product_image.pk).update(renditions=create_renditions(product_image))
+            product_ids.add(product_image.product_id)
+            category_ids.add(product_image.product.category_id)
+
+        Product.touch(product_ids)
+        bump_category_versions(category_ids)
+        bump_product_versions(product_ids)
+
+        self.stdout.write(self.style.SUCCESS(f'Created renditions of images of {len(product_ids)} products.'))
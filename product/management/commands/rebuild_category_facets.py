@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from product.models import Category, CategoryFacet
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the facets of categories from the features of products.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('category_ids', nargs='*', type=int, help='IDs of categories. Default is all categories.')
+
+    def handle(self, *args, **options):
+        category_ids = options['category_ids'] or list(Category.objects.values_list('id', flat=True))
+
+        for category_id in category_ids:
+            CategoryFacet.refresh_facets([category_id])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt facets of {len(category_ids)} categories.'))
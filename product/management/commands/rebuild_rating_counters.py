@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from product.models import ProductRating
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the like and dislike counters of products from the ratings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report products whose counters differ from their ratings, without rebuilding them.',
+        )
+
+    def handle(self, *args, **options):
+        inconsistent_products = list(ProductRating.get_products_with_inconsistent_rating_counters())
+
+        for product in inconsistent_products:
+            self.stdout.write(
+                f'Product {product.id}: '
+                f'like_count {product.like_count} != {product.rating_like_count} or '
+                f'dislike_count {product.dislike_count} != {product.rating_dislike_count}'
+            )
+
+        if options['check']:
+            if inconsistent_products:
+                raise CommandError(f'{len(inconsistent_products)} products have inconsistent rating counters.')
+            self.stdout.write(self.style.SUCCESS('Rating counters are consistent.'))
+            return
+
+        updated_count = ProductRating.rebuild_rating_counters()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating counters of {updated_count} products.'))
@@ -0,0 +1,84 @@
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from product.benchmark import compare_results
+from product.replay import HTTPTransport, InProcessTransport, get_authorizations, read_records, replay
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay requests from a file of JSON lines with the method, path, query, user and body of every request, '
+        'like performance.log, in the process or over HTTP with --url, and report the latency and throughput '
+        'of every endpoint. Users are found by ID or username, and their access tokens are signed with '
+        'the SECRET_KEY of the settings, so the server of --url must have the same key.'
+    )
+    stealth_options = ('stdin', )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='File with JSON lines of requests, or - for the standard input.')
+        parser.add_argument('--url', help='Base URL of the server to send requests to over HTTP.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Number of threads sending requests.')
+        parser.add_argument('--repeat', type=int, default=1, help='Number of times the requests are sent.')
+        parser.add_argument('--limit', type=int, help='Maximum number of requests read from the file.')
+        parser.add_argument('--timeout', type=float, default=30, help='Timeout of HTTP requests in seconds.')
+        parser.add_argument('--output', help='File to save the report to as JSON.')
+        parser.add_argument('--compare', help='File with the JSON report of a previous replay to compare with.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+
+        if options['file'] == '-':
+            records = read_records(options.get('stdin', sys.stdin))
+        else:
+            try:
+                with open(options['file']) as records_file:
+                    records = read_records(records_file)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Failed to read requests from {options["file"]}: {error}')
+        records = records[:options['limit']] * options['repeat']
+        if not records:
+            raise CommandError('There are no requests to replay.')
+
+        authorizations, missing_users = get_authorizations(records)
+        if missing_users:
+            self.stderr.write(
+                f'Requests of missing users are sent without authorization: {sorted(map(str, missing_users))}')
+
+        if options['url']:
+            report = replay(records, HTTPTransport(options['url'], options['timeout']), options['concurrency'],
+                            authorizations)
+        else:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                report = replay(records, InProcessTransport(), options['concurrency'], authorizations)
+
+        self.write_report(report)
+
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                changes = compare_results(json.load(baseline_file)['results'], report['results'])
+            report['changes'] = changes
+            self.stdout.write('Changes from the baseline, %:')
+            for endpoint, endpoint_changes in changes.items():
+                self.stdout.write(f'{endpoint} ' + ' '.join(
+                    f'{name} {change:+.1f}' for name, change in endpoint_changes.items()))
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Report is saved to {options["output"]}'))
+
+    def write_report(self, report):
+        self.stdout.write(
+            f'{report["requests"]} requests in {report["wall_time_s"]} s, {report["throughput_rps"]} requests/s')
+        self.stdout.write(
+            f'{"requests":>8} {"errors":>6} {"rps":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}  endpoint')
+        for endpoint, results in report['results'].items():
+            self.stdout.write(
+                f'{results["requests"]:>8} {results["errors"]:>6} {results["throughput_rps"]:>8} '
+                f'{results["p50_ms"]:>9.2f} {results["p95_ms"]:>9.2f} {results["p99_ms"]:>9.2f}  {endpoint}'
+            )
@@ -0,0 +1,54 @@
+"""
+Metrics of the request being handled, collected by `RequestMetricsMiddleware`.
+
+The metrics are kept in a context variable, so the code handling the request measures its parts with `measure`
+without access to the request, and nothing is measured outside of requests.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+request_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Number and time of SQL queries and durations of the measured parts of a request, in seconds.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.durations = {}
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """
+        Count a query and its time, for `connection.execute_wrapper`.
+        """
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - started_at
+
+    def add_duration(self, name, duration):
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+
+@contextmanager
+def measure(name):
+    """
+    Add the time of the block to the duration `name` of the metrics of the current request.
+    The time includes the queries of the block, like of lazy querysets evaluated by serializers.
+    """
+    metrics = request_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_duration(name, time.perf_counter() - started_at)
@@ -0,0 +1,100 @@
+"""
+Middleware of the API.
+
+`RequestMetricsMiddleware` records the number and time of SQL queries, the time of serialization and rendering
+and the size of every response. It adds them to the `Server-Timing` header when `REQUEST_METRICS_SERVER_TIMING`
+is enabled and logs them as a JSON line to the `performance` logger, with WARNING for requests exceeding
+`REQUEST_METRICS_MAX_QUERIES`, `REQUEST_METRICS_MAX_DURATION` or `REQUEST_METRICS_MAX_RESPONSE_SIZE`.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import RequestMetrics, request_metrics
+
+logger = logging.getLogger('performance')
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware measuring the database cost, the serialization time and the size of responses.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        started_at = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        duration = time.perf_counter() - started_at
+
+        response_size = None if response.streaming else len(response.content)
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            response['Server-Timing'] = self.get_server_timing(metrics, duration)
+        self.log_metrics(request, response, metrics, duration, response_size)
+
+        return response
+
+    @staticmethod
+    def get_server_timing(metrics, duration) -> str:
+        """
+        Get the value of the `Server-Timing` header with the durations in milliseconds.
+        """
+        server_timing = [f'db;desc="{metrics.queries} queries";dur={metrics.sql_time * 1000:.1f}']
+        server_timing.extend(
+            f'{name};dur={name_duration * 1000:.1f}' for name, name_duration in metrics.durations.items())
+        server_timing.append(f'total;dur={duration * 1000:.1f}')
+
+        return ', '.join(server_timing)
+
+    @staticmethod
+    def get_exceeded_thresholds(metrics, duration, response_size) -> list:
+        """
+        Get the names of the thresholds of the settings exceeded by the request.
+        """
+        exceeded_thresholds = []
+        if metrics.queries > settings.REQUEST_METRICS_MAX_QUERIES:
+            exceeded_thresholds.append('queries')
+        if duration > settings.REQUEST_METRICS_MAX_DURATION:
+            exceeded_thresholds.append('duration')
+        if response_size is not None and response_size > settings.REQUEST_METRICS_MAX_RESPONSE_SIZE:
+            exceeded_thresholds.append('response_size')
+
+        return exceeded_thresholds
+
+    def log_metrics(self, request, response, metrics, duration, response_size):
+        """
+        Log the metrics of the request as a JSON line, with WARNING if it exceeds a threshold.
+        """
+        resolver_match = request.resolver_match
+        exceeded_thresholds = self.get_exceeded_thresholds(metrics, duration, response_size)
+        level = logging.WARNING if exceeded_thresholds else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+
+        logger.log(level, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'route': resolver_match.route if resolver_match else None,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'sql_ms': round(metrics.sql_time * 1000, 1),
+            **{f'{name}_ms': round(name_duration * 1000, 1) for name, name_duration in metrics.durations.items()},
+            'duration_ms': round(duration * 1000, 1),
+            'response_size': response_size,
+            'exceeded': exceeded_thresholds,
+        }))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_counters(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    ProductRating = apps.get_model('product', 'ProductRating')
+
+    def count_of_ratings(grade):
+        return Coalesce(Subquery(
+            ProductRating.objects.filter(
+                product_id=OuterRef('pk'),
+                grade=grade
+            ).order_by().values('product_id').annotate(count=Count('id')).values('count')
+        ), 0)
+
+    Product.objects.update(like_count=count_of_ratings(True), dislike_count=count_of_ratings(False))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0003_productimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='dislike_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='dislike_count'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='like_count'),
+        ),
+        migrations.RunPython(fill_rating_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+import psqlextra.indexes.unique_index
+
+
+def fill_category_facets(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    CategoryFacet = apps.get_model('product', 'CategoryFacet')
+
+    CategoryFacet.objects.bulk_create([
+        CategoryFacet(
+            category_id=facet['product__category_id'],
+            feature_id=facet['features_id'],
+            key=facet['features__key'],
+            value=facet['features__value'],
+            product_count=facet['product_count'],
+        )
+        for facet in Product.features.through.objects.values(
+            'product__category_id', 'features_id', 'features__key', 'features__value'
+        ).annotate(product_count=Count('product_id')).order_by()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_product_rating_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200)),
+                ('value', models.CharField(max_length=200)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.category')),
+                ('feature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.features')),
+            ],
+            options={
+                'indexes': [psqlextra.indexes.unique_index.UniqueIndex(fields=['category', 'feature'], name='product_cat_categor_620f20_idx'), models.Index(fields=['category', 'key', 'value'], name='product_cat_categor_be55db_idx')],
+            },
+        ),
+        migrations.RunPython(fill_category_facets, migrations.RunPython.noop),
+    ]
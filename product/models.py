@@ -1,11 +1,15 @@
 import os
 from typing import Optional
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import QuerySet
+from django.db import models, transaction, connection, IntegrityError
+from django.db.models import QuerySet, Prefetch, Count, Q, Subquery, OuterRef, Value, BooleanField, F, Max, Lookup
+from django.db.models.functions import Coalesce, Greatest, Now
 from psqlextra.indexes import UniqueIndex
 
+from .cache import bump_versions_on_commit
+
 
 class Category(models.Model):
     title = models.CharField(max_length=150, verbose_name='title', unique=True)
@@ -13,6 +17,16 @@ class Category(models.Model):
     created_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def get_list_validators(cls):
+        """
+        Get the values changing with the list of categories, to validate cached lists of categories.
+
+        Returns:
+            A dictionary with the `last_update_time` of categories and the `count` of categories.
+        """
+        return cls.objects.aggregate(last_update_time=Max('update_time'), count=Count('id'))
+
     def __str__(self):
         return f'{self.title}'
 
@@ -38,6 +52,23 @@ class Features(models.Model):
         except cls.DoesNotExist:
             return None
 
+    @classmethod
+    def get_features_ids_grouped_by_keys(cls, features_ids) -> dict:
+        """
+        Get the IDs of features grouped by the keys of the features.
+
+        Arguments:
+            features_ids (list): list ids features
+
+        Returns:
+            A dictionary with the keys of the existing features and lists of their ids.
+        """
+        features_groups = {}
+        for feature_id, key in cls.objects.filter(id__in=features_ids).values_list('id', 'key').order_by('id'):
+            features_groups.setdefault(key, []).append(feature_id)
+
+        return features_groups
+
     @classmethod
     def get_unique_features_keys_by_category(cls, category_id: int):
         """
@@ -77,7 +108,37 @@ class Features(models.Model):
         return f'{self.key}: {self.value}'
 
 
+class AnyLookup(Lookup):
+    """
+    `field = ANY(%s)` lookup sending a list of values as one array parameter instead of a parameter per value.
+    """
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+
+        return f'{lhs} = ANY({rhs})', [*lhs_params, *rhs_params]
+
+
 class Product(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'title', 'id']),
+            models.Index(fields=['category', 'price', 'id']),
+            models.Index(fields=['category', 'created_time', 'id']),
+            models.Index(fields=['category', 'like_count', 'id']),
+        ]
+
+    # Sort keys of the list of products and the fields they sort by, each backed by an index of the category
+    SORT_FIELDS = {
+        'title': 'title',
+        'price': 'price',
+        'created_time': 'created_time',
+        'popularity': 'like_count',
+    }
+
     title = models.CharField(max_length=100, verbose_name='title', unique=True)
     text = models.CharField(max_length=200, verbose_name='text', null=True, blank=True)
     price = models.BigIntegerField('price')
@@ -87,6 +148,9 @@ class Product(models.Model):
 
     features = models.ManyToManyField(Features, )
 
+    like_count = models.PositiveIntegerField(default=0, verbose_name='like_count')
+    dislike_count = models.PositiveIntegerField(default=0, verbose_name='dislike_count')
+
     created_time = models.DateTimeField(auto_now_add=True, verbose_name='created_time')
     update_time = models.DateTimeField(auto_now=True, verbose_name='update_time')
 
@@ -104,30 +168,307 @@ class Product(models.Model):
         Arguments:
             category_id (int): category ID of the products.
             sort_dict (str): sorting direction, either '+' for ascending or '-' for descending.
-            sort_by (str): The field to sort the products by.
+            sort_by (str): The field to sort the products by, one of the values of `SORT_FIELDS`.
             filter_params (list): A list of filter parameters for features.
 
         Returns:
             A filtered and sorted QuerySet of products matching the specified criteria.
         """
-        products_list = cls.objects.filter(category_id=category_id).order_by(sort_dict + sort_by)
+        products_list = cls.objects.filter(category_id=category_id).order_by(sort_dict + sort_by, sort_dict + 'id')
 
         if not filter_params:
             return products_list
 
-        features_list = Features.get_features_list_by_id_in(filter_params)
-        keys = features_list.values_list('key', flat=True)
-        values = features_list.values_list('value', flat=True)
+        if settings.PRODUCT_FILTER_ENGINE == 'bitmap':
+            from .bitmap_index import get_filtered_product_ids
+
+            product_ids = get_filtered_product_ids(category_id, filter_params)
+            return products_list if product_ids is None else products_list.filter(id__any=product_ids)
+
+        features_groups = Features.get_features_ids_grouped_by_keys(filter_params)
+        if not features_groups:
+            return products_list
+
+        return products_list.filter(id__in=cls.get_ids_by_features_groups(features_groups))
 
-        for value in values:
-            products_list = products_list.filter(features__key__in=keys, features__value=value)
+    @classmethod
+    def get_count_of_filtered_products(cls, category_id: int, filter_params: list) -> Optional[int]:
+        """
+        Get the count of the products of `get_filtered_and_sorted_list_of_product_by_category` if it is known
+        without a query, from the bitmap of the filtered products of the bitmap engine.
 
-        return products_list
+        Arguments:
+            category_id (int): category ID of the products.
+            filter_params (list): A list of filter parameters for features.
+
+        Returns:
+            The count of the filtered products. Otherwise, None if the count has to be queried.
+        """
+        if settings.PRODUCT_FILTER_ENGINE != 'bitmap' or not filter_params:
+            return None
+
+        from .bitmap_index import count_filtered_products
+
+        return count_filtered_products(category_id, filter_params)
+
+    @classmethod
+    def get_ids_by_features_groups(cls, features_groups: dict) -> QuerySet:
+        """
+        Get the IDs of products having any feature of every group of features.
+
+        Arguments:
+            features_groups (dict): keys of features and lists of ids of the selected features with the key.
+
+        Returns:
+            A subquery with the IDs of products matching any of the features within a key and all the keys,
+            as a single `GROUP BY product_id HAVING count(DISTINCT key) = n` query on the features of products.
+        """
+        features_ids = [feature_id for features_ids in features_groups.values() for feature_id in features_ids]
+
+        return cls.features.through.objects.filter(
+            features_id__in=features_ids
+        ).values('product_id').annotate(
+            matched_keys_count=Count('features__key', distinct=True)
+        ).filter(matched_keys_count=len(features_groups)).values('product_id')
+
+    @classmethod
+    def get_list_with_category_features_and_images(cls, products_list: QuerySet['Product']) -> QuerySet['Product']:
+        """
+        Get a list of products with the category, features and images loaded in a fixed number of queries.
+
+        Arguments:
+            products_list (QuerySet): products to load the related entities for.
+
+        Returns:
+            A QuerySet of products whose category is joined and whose features and images are prefetched,
+            so the serializers read them from the prefetched caches instead of querying them per product.
+        """
+        return products_list.select_related('category').prefetch_related(
+            Prefetch('features', queryset=Features.objects.order_by('id')),
+            Prefetch('productimage_set', queryset=ProductImage.objects.order_by('id')),
+        )
+
+    @classmethod
+    def get_features_and_images_by_products(cls, product_ids: list):
+        """
+        Get the features and the images of products in two queries, without building model instances.
+
+        Arguments:
+            product_ids (list): IDs of the products.
+
+        Returns:
+            A tuple of two dictionaries by product ID: a list of (id, key, value) of the features
+            and a list of (name, renditions) of the images, both in the order of their IDs.
+        """
+        features_by_products = {}
+        for product_id, feature_id, key, value in cls.features.through.objects.filter(
+                product_id__in=product_ids).order_by('features_id').values_list(
+                'product_id', 'features_id', 'features__key', 'features__value'):
+            features_by_products.setdefault(product_id, []).append((feature_id, key, value))
+
+        images_by_products = {}
+        for product_id, image, renditions in ProductImage.objects.filter(
+                product_id__in=product_ids).order_by('id').values_list('product_id', 'image', 'renditions'):
+            images_by_products.setdefault(product_id, []).append((image, renditions))
+
+        return features_by_products, images_by_products
+
+    @classmethod
+    def get_rating_counters(cls, product_id):
+        """
+        Get the count of likes and dislikes of a product.
+
+        Arguments:
+            product_id (int): ID of the product.
+
+        Returns:
+            A dictionary with `like_count` and `dislike_count` of the product if it exists.
+            Otherwise, None.
+        """
+        return cls.objects.filter(id=product_id).values('like_count', 'dislike_count').first()
+
+    @classmethod
+    def get_validators(cls, product_id, user_id=None):
+        """
+        Get the values changing with the product, to validate cached products in one indexed lookup.
+
+        Arguments:
+            product_id (int): ID of the product.
+            user_id (int): ID of the user who requests the product, or None for an anonymous user.
+
+        Returns:
+            A dictionary with `update_time`, `like_count`, `dislike_count` of the product,
+            `category__update_time` and the `current_user_grade` if the product exists.
+            Otherwise, None.
+        """
+        products_list = cls.objects.filter(id=product_id)
+        if user_id is None:
+            products_list = products_list.annotate(current_user_grade=Value(None, output_field=BooleanField()))
+        else:
+            products_list = products_list.annotate(current_user_grade=Subquery(
+                ProductRating.objects.filter(product_id=OuterRef('pk'), user_id=user_id).values('grade')[:1]
+            ))
+
+        return products_list.values(
+            'update_time', 'like_count', 'dislike_count', 'category__update_time', 'current_user_grade').first()
+
+    @classmethod
+    def touch(cls, product_ids):
+        """
+        Set the update time of products whose features or images changed.
+
+        Arguments:
+            product_ids (list): IDs of the products.
+        """
+        cls.objects.filter(id__in=list(product_ids)).update(update_time=Now())
+
+    @classmethod
+    def touch_filtered(cls, **lookups):
+        """
+        Set the update time of the products matching the lookups, like the products of a renamed category
+        or having a renamed feature, in one query.
+        """
+        cls.objects.filter(**lookups).update(update_time=Now())
+
+    @classmethod
+    def change_rating_counters(cls, product_id, like_count=0, dislike_count=0):
+        """
+        Add to the like and dislike counters of a product whose rating is written with the ORM,
+        and set the update time of the product.
+
+        Arguments:
+            product_id (int): ID of the product.
+            like_count (int): The change of the like counter.
+            dislike_count (int): The change of the dislike counter.
+        """
+        cls.objects.filter(id=product_id).update(
+            update_time=Now(),
+            like_count=Greatest(F('like_count') + like_count, 0),
+            dislike_count=Greatest(F('dislike_count') + dislike_count, 0),
+        )
 
     def __str__(self):
         return f'{self.id} | {self.title} | {self.category.title}'
 
 
+Product._meta.pk.register_lookup(AnyLookup)
+
+
+UPSERT_RATING_SQL = """
+    WITH upserted_rating AS (
+        INSERT INTO {rating_table} (user_id, product_id, grade, created_time)
+        VALUES (%(user_id)s, %(product_id)s, %(grade)s, NOW())
+        ON CONFLICT (user_id, product_id) DO UPDATE SET grade = EXCLUDED.grade
+        WHERE {rating_table}.grade IS DISTINCT FROM EXCLUDED.grade
+        RETURNING (xmax = 0) AS is_created
+    ), updated_product AS (
+        UPDATE {product_table} SET
+            update_time = NOW(),
+            like_count = CASE
+                WHEN %(grade)s THEN {product_table}.like_count + 1
+                WHEN upserted_rating.is_created THEN {product_table}.like_count
+                ELSE GREATEST({product_table}.like_count - 1, 0)
+            END,
+            dislike_count = CASE
+                WHEN NOT %(grade)s THEN {product_table}.dislike_count + 1
+                WHEN upserted_rating.is_created THEN {product_table}.dislike_count
+                ELSE GREATEST({product_table}.dislike_count - 1, 0)
+            END
+        FROM upserted_rating
+        WHERE {product_table}.id = %(product_id)s
+        RETURNING {product_table}.like_count, {product_table}.dislike_count, {product_table}.category_id
+    )
+    SELECT like_count, dislike_count, category_id FROM updated_product
+    UNION ALL
+    SELECT like_count, dislike_count, NULL FROM {product_table}
+    WHERE id = %(product_id)s AND NOT EXISTS (SELECT 1 FROM updated_product)
+"""
+
+DELETE_RATING_SQL = """
+    WITH deleted_rating AS (
+        DELETE FROM {rating_table}
+        WHERE user_id = %(user_id)s AND product_id = %(product_id)s AND grade = %(grade)s
+        RETURNING grade
+    ), updated_product AS (
+        UPDATE {product_table} SET
+            update_time = NOW(),
+            like_count = CASE
+                WHEN deleted_rating.grade THEN GREATEST({product_table}.like_count - 1, 0)
+                ELSE {product_table}.like_count
+            END,
+            dislike_count = CASE
+                WHEN NOT deleted_rating.grade THEN GREATEST({product_table}.dislike_count - 1, 0)
+                ELSE {product_table}.dislike_count
+            END
+        FROM deleted_rating
+        WHERE {product_table}.id = %(product_id)s
+        RETURNING {product_table}.like_count, {product_table}.dislike_count, {product_table}.category_id
+    )
+    SELECT like_count, dislike_count, category_id FROM updated_product
+    UNION ALL
+    SELECT like_count, dislike_count, NULL FROM {product_table}
+    WHERE id = %(product_id)s AND NOT EXISTS (SELECT 1 FROM updated_product)
+"""
+
+BATCH_RATING_SQL = """
+    WITH operation AS (
+        SELECT operation.user_id, operation.product_id, operation.grade, operation.deleted_grade, operation.position
+        FROM unnest(
+            %(user_ids)s::integer[], %(product_ids)s::bigint[], %(grades)s::boolean[], %(deleted_grades)s::boolean[]
+        ) WITH ORDINALITY AS operation(user_id, product_id, grade, deleted_grade, position)
+        WHERE EXISTS (SELECT 1 FROM {product_table} WHERE {product_table}.id = operation.product_id)
+            AND EXISTS (SELECT 1 FROM {user_table} WHERE {user_table}.id = operation.user_id)
+    ), deleted_rating AS (
+        DELETE FROM {rating_table}
+        USING operation
+        WHERE operation.grade IS NULL
+            AND {rating_table}.user_id = operation.user_id
+            AND {rating_table}.product_id = operation.product_id
+            AND (operation.deleted_grade IS NULL OR {rating_table}.grade = operation.deleted_grade)
+        RETURNING {rating_table}.product_id, {rating_table}.grade
+    ), upserted_rating AS (
+        INSERT INTO {rating_table} (user_id, product_id, grade, created_time)
+        SELECT user_id, product_id, grade, NOW() FROM operation WHERE grade IS NOT NULL
+        ON CONFLICT (user_id, product_id) DO UPDATE SET grade = EXCLUDED.grade
+        WHERE {rating_table}.grade IS DISTINCT FROM EXCLUDED.grade
+        RETURNING {rating_table}.product_id, {rating_table}.grade, (xmax = 0) AS is_created
+    ), counter_change AS (
+        SELECT product_id, SUM(like_change) AS like_change, SUM(dislike_change) AS dislike_change
+        FROM (
+            SELECT product_id,
+                CASE WHEN grade THEN -1 ELSE 0 END AS like_change,
+                CASE WHEN grade THEN 0 ELSE -1 END AS dislike_change
+            FROM deleted_rating
+            UNION ALL
+            SELECT product_id,
+                CASE WHEN grade THEN 1 WHEN is_created THEN 0 ELSE -1 END,
+                CASE WHEN NOT grade THEN 1 WHEN is_created THEN 0 ELSE -1 END
+            FROM upserted_rating
+        ) AS rating_change
+        GROUP BY product_id
+    ), updated_product AS (
+        UPDATE {product_table} SET
+            update_time = NOW(),
+            like_count = GREATEST({product_table}.like_count + counter_change.like_change, 0),
+            dislike_count = GREATEST({product_table}.dislike_count + counter_change.dislike_change, 0)
+        FROM counter_change
+        WHERE {product_table}.id = counter_change.product_id
+        RETURNING {product_table}.id, {product_table}.like_count, {product_table}.dislike_count,
+            {product_table}.category_id
+    ), product_position AS (
+        SELECT product_id, MIN(position) AS position FROM operation GROUP BY product_id
+    )
+    SELECT product_position.product_id,
+        COALESCE(updated_product.like_count, {product_table}.like_count),
+        COALESCE(updated_product.dislike_count, {product_table}.dislike_count),
+        updated_product.category_id
+    FROM product_position
+    JOIN {product_table} ON {product_table}.id = product_position.product_id
+    LEFT JOIN updated_product ON updated_product.id = product_position.product_id
+    ORDER BY product_position.position
+"""
+
+
 class ProductRating(models.Model):
     class Meta:
         indexes = [
@@ -159,6 +500,44 @@ class ProductRating(models.Model):
         except cls.DoesNotExist:
             return None
 
+    @classmethod
+    def annotate_rating_counters(cls, products_list: QuerySet['Product']) -> QuerySet['Product']:
+        """
+        Annotate products with the count of likes and dislikes, counted in the same query as the products.
+
+        Arguments:
+            products_list (QuerySet): products to annotate.
+
+        Returns:
+            A QuerySet of products with `rating_like_count` and `rating_dislike_count` annotations.
+        """
+        return products_list.annotate(
+            rating_like_count=Count('productrating', filter=Q(productrating__grade=True), distinct=True),
+            rating_dislike_count=Count('productrating', filter=Q(productrating__grade=False), distinct=True),
+        )
+
+    @classmethod
+    def annotate_rating_from_user(cls, products_list: QuerySet['Product'], user) -> QuerySet['Product']:
+        """
+        Annotate products with the grade given by a specific user, selected by a subquery.
+
+        Arguments:
+            products_list (QuerySet): products to annotate.
+            user (User): The user who gave the rating, or None for an anonymous user.
+
+        Returns:
+            A QuerySet of products with the `current_user_grade` annotation,
+            which is None if the user didn't rate the product.
+        """
+        if user is None:
+            return products_list.annotate(current_user_grade=Value(None, output_field=BooleanField()))
+
+        return products_list.annotate(
+            current_user_grade=Subquery(
+                cls.objects.filter(product_id=OuterRef('pk'), user=user).values('grade')[:1]
+            )
+        )
+
     @classmethod
     def get_rating_from_user(cls, product_id, user):
         """
@@ -177,10 +556,134 @@ class ProductRating(models.Model):
         except cls.DoesNotExist:
             return None
 
+    @classmethod
+    def execute_rating_statement(cls, sql, grade, product_id, user):
+        """
+        Execute a statement writing a rating, which returns the like and dislike counters of the product
+        and the category of the product if the counters changed, to bump the versions of the category
+        and the product.
+
+        Arguments:
+            sql (str): The statement with `rating_table` and `product_table` placeholders.
+            grade (bool): The grade value.
+            product_id (int): ID of the product.
+            user (User): The user who gave the rating.
+
+        Returns:
+            A dictionary with `like_count` and `dislike_count` of the product.
+            Otherwise, None if the product doesn't exist.
+        """
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    sql.format(rating_table=cls._meta.db_table, product_table=Product._meta.db_table),
+                    {'user_id': user.id, 'product_id': product_id, 'grade': grade}
+                )
+                rating_counters = cursor.fetchone()
+                if rating_counters is None:
+                    # The product doesn't exist, so the rating inserted with the deferred foreign key is
+                    # rolled back here instead of failing the commit of an outer transaction
+                    transaction.set_rollback(True)
+        except IntegrityError:
+            return None
+
+        if rating_counters is None:
+            return None
+
+        like_count, dislike_count, changed_category_id = rating_counters
+        if changed_category_id is not None:
+            bump_versions_on_commit([changed_category_id], [product_id])
+
+        return {'like_count': like_count, 'dislike_count': dislike_count}
+
+    @staticmethod
+    def combine_rating_operations(previous_operation, operation):
+        """
+        Combine two operations of a user on a product into one with the same result.
+
+        Arguments:
+            previous_operation (tuple): (grade, deleted grade) of the previous operation, or None.
+            operation (tuple): (grade, deleted grade) of the next operation.
+
+        Returns:
+            (grade, deleted grade) of the combined operation.
+        """
+        grade, deleted_grade = operation
+        if grade is not None or deleted_grade is None or previous_operation is None:
+            return operation
+
+        previous_grade, previous_deleted_grade = previous_operation
+        if previous_grade is not None:
+            return (None, None) if previous_grade == deleted_grade else previous_operation
+        if previous_deleted_grade is None or previous_deleted_grade != deleted_grade:
+            return None, None
+
+        return operation
+
+    @classmethod
+    def apply_rating_operations(cls, operations):
+        """
+        Create, update and delete ratings of products and update the like and dislike counters of the products
+        in a single statement, in one transaction.
+
+        Arguments:
+            operations (list): (user ID, product ID, grade, deleted grade) of the ratings in the order
+                they were given. The grade is None to delete the rating, only if it has the deleted grade
+                or any rating if the deleted grade is None. The operations of a user on a product are combined
+                into one. The operations of missing users and products are skipped.
+
+        Returns:
+            A list of dictionaries with `product_id`, `like_count` and `dislike_count` of the existing products,
+            in the order of the first operations on them.
+            Otherwise, None if a user is deleted while the operations are written.
+        """
+        combined_operations = {}
+        first_positions = {}
+        for position, (user_id, product_id, grade, deleted_grade) in enumerate(operations):
+            combined_operations[(user_id, product_id)] = cls.combine_rating_operations(
+                combined_operations.get((user_id, product_id)), (grade, deleted_grade))
+            first_positions.setdefault(product_id, position)
+        if not combined_operations:
+            return []
+
+        ordered_operations = sorted(
+            combined_operations.items(), key=lambda operation: first_positions[operation[0][1]])
+
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    BATCH_RATING_SQL.format(
+                        rating_table=cls._meta.db_table,
+                        product_table=Product._meta.db_table,
+                        user_table=User._meta.db_table,
+                    ),
+                    {
+                        'user_ids': [user_id for (user_id, _), _ in ordered_operations],
+                        'product_ids': [product_id for (_, product_id), _ in ordered_operations],
+                        'grades': [grade for _, (grade, _) in ordered_operations],
+                        'deleted_grades': [deleted_grade for _, (_, deleted_grade) in ordered_operations],
+                    }
+                )
+                rating_counters = cursor.fetchall()
+        except IntegrityError:
+            return None
+
+        changed_counters = [counters for counters in rating_counters if counters[3] is not None]
+        bump_versions_on_commit(
+            {category_id for _, _, _, category_id in changed_counters},
+            [product_id for product_id, _, _, _ in changed_counters]
+        )
+
+        return [
+            {'product_id': product_id, 'like_count': like_count, 'dislike_count': dislike_count}
+            for product_id, like_count, dislike_count, _ in rating_counters
+        ]
+
     @classmethod
     def create_or_update_rating(cls, grade, product_id, user):
         """
-       Create or update a rating object for a product and user.
+       Create or update a rating object for a product and user, and update the like and dislike counters
+       of the product in a single `INSERT ... ON CONFLICT (user_id, product_id) DO UPDATE` statement.
 
        Arguments:
            grade (int): The grade value.
@@ -188,24 +691,16 @@ class ProductRating(models.Model):
            user (User): The user who gave the rating.
 
        Returns:
-           True if the rating object is created or updated successfully.
-           Otherwise, None.
+           A dictionary with the updated `like_count` and `dislike_count` of the product.
+           Otherwise, None if the product doesn't exist.
        """
-        try:
-            rating_for_product_from_user = cls.objects.filter(product_id=product_id, user=user)
-
-            if rating_for_product_from_user:
-                rating_for_product_from_user.update(grade=grade)
-            else:
-                cls.objects.create(product_id=product_id, user=user, grade=grade)
-
-        except cls.DoesNotExist:
-            return None
+        return cls.execute_rating_statement(UPSERT_RATING_SQL, grade, product_id, user)
 
     @classmethod
     def delete_rating(cls, grade, product_id, user):
         """
-        Deletes an object with the specified grade, product ID, and user.
+        Deletes an object with the specified grade, product ID, and user,
+        and decrements the counter of the product for the grade in a single statement.
 
         Arguments:
             grade (bool): The grade value.
@@ -213,13 +708,59 @@ class ProductRating(models.Model):
             user (User): The user associated with the object.
 
         Returns:
-            True if the object was deleted successfully.
-            Otherwise, None.
+            A dictionary with the updated `like_count` and `dislike_count` of the product.
+            Otherwise, None if the product doesn't exist.
         """
-        try:
-            cls.objects.get(product_id=product_id, user=user, grade=grade).delete()
-        except cls.DoesNotExist:
-            return None
+        return cls.execute_rating_statement(DELETE_RATING_SQL, grade, product_id, user)
+
+    @classmethod
+    def get_count_subquery(cls, grade):
+        """
+        Get a subquery counting the ratings of the outer product with a specific grade.
+
+        Arguments:
+            grade (bool): The grade value.
+
+        Returns:
+            A subquery expression with the count of ratings, 0 if there are no ratings.
+        """
+        count_of_ratings = cls.objects.filter(
+            product_id=OuterRef('pk'),
+            grade=grade
+        ).order_by().values('product_id').annotate(count=Count('id')).values('count')
+
+        return Coalesce(Subquery(count_of_ratings), 0)
+
+    @classmethod
+    def rebuild_rating_counters(cls, product_ids=None):
+        """
+        Recount the like and dislike counters of products from the ratings in a single update query.
+
+        Arguments:
+            product_ids (list, optional): IDs of the products to rebuild. Default is all products.
+
+        Returns:
+            The number of updated products.
+        """
+        products_list = Product.objects.all() if product_ids is None else Product.objects.filter(id__in=product_ids)
+
+        return products_list.update(
+            like_count=cls.get_count_subquery(True),
+            dislike_count=cls.get_count_subquery(False),
+        )
+
+    @classmethod
+    def get_products_with_inconsistent_rating_counters(cls) -> QuerySet['Product']:
+        """
+        Get products whose like or dislike counters differ from the count of their ratings.
+
+        Returns:
+            A QuerySet of products annotated with `rating_like_count` and `rating_dislike_count`.
+        """
+        return cls.annotate_rating_counters(Product.objects.all()).exclude(
+            like_count=F('rating_like_count'),
+            dislike_count=F('rating_dislike_count'),
+        ).order_by('id')
 
     def __str__(self):
         if bool(self.grade):
@@ -239,6 +780,8 @@ class ProductImage(models.Model):
     title = models.CharField(max_length=100)
     image = models.ImageField(upload_to=image_upload_path)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Lists of (width, name) of the renditions of the image by format, made by `product.renditions`
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     @classmethod
     def get_all_images_urls_for_one_product(cls, product_id):
@@ -246,3 +789,252 @@ class ProductImage(models.Model):
 
     def __str__(self):
         return f'{self.title}'
+
+
+CHANGE_FACET_COUNTS_SQL = """
+    WITH facet_change AS (
+        SELECT category_id, feature_id, product_count
+        FROM unnest(%(category_ids)s::bigint[], %(feature_ids)s::bigint[], %(product_counts)s::integer[])
+            AS facet_change(category_id, feature_id, product_count)
+    ), updated_facet AS (
+        UPDATE {facet_table} SET
+            product_count = GREATEST({facet_table}.product_count + facet_change.product_count, 0)
+        FROM facet_change
+        WHERE {facet_table}.category_id = facet_change.category_id
+            AND {facet_table}.feature_id = facet_change.feature_id
+        RETURNING {facet_table}.category_id, {facet_table}.feature_id
+    )
+    INSERT INTO {facet_table} (category_id, feature_id, key, value, product_count)
+    SELECT facet_change.category_id, facet_change.feature_id, {features_table}.key, {features_table}.value,
+        facet_change.product_count
+    FROM facet_change
+    JOIN {features_table} ON {features_table}.id = facet_change.feature_id
+    WHERE facet_change.product_count > 0 AND NOT EXISTS (
+        SELECT 1 FROM updated_facet
+        WHERE updated_facet.category_id = facet_change.category_id
+            AND updated_facet.feature_id = facet_change.feature_id
+    )
+    ON CONFLICT (category_id, feature_id) DO UPDATE SET
+        product_count = {facet_table}.product_count + EXCLUDED.product_count
+"""
+
+
+FILTERED_FACET_COUNTS_SQL = """
+    WITH selected_feature AS (
+        SELECT feature_id, key_position
+        FROM unnest(%(features_ids)s::bigint[], %(key_positions)s::integer[])
+            AS selected_feature(feature_id, key_position)
+    ), matched_key AS (
+        SELECT DISTINCT {features_of_products_table}.product_id, selected_feature.key_position
+        FROM {features_of_products_table}
+        JOIN selected_feature ON selected_feature.feature_id = {features_of_products_table}.features_id
+    ), matched_product AS (
+        SELECT product_id,
+            (%(keys_count)s * (%(keys_count)s + 1) / 2 - SUM(key_position))::integer AS missing_key_position
+        FROM matched_key
+        GROUP BY product_id
+        HAVING COUNT(*) >= %(min_keys_count)s
+    )
+    SELECT {features_of_products_table}.features_id, COUNT(*)
+    FROM matched_product
+    JOIN {product_table} ON {product_table}.id = matched_product.product_id
+    JOIN {features_of_products_table} ON {features_of_products_table}.product_id = matched_product.product_id
+    JOIN {features_table} ON {features_table}.id = {features_of_products_table}.features_id
+    WHERE {product_table}.category_id = %(category_id)s AND (
+        matched_product.missing_key_position = 0
+        OR {features_table}.key = (%(keys)s::varchar[])[matched_product.missing_key_position]
+    )
+    GROUP BY {features_of_products_table}.features_id
+"""
+
+
+class CategoryFacet(models.Model):
+    class Meta:
+        indexes = [
+            UniqueIndex(fields=['category', 'feature']),
+            models.Index(fields=['category', 'key', 'value']),
+        ]
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    feature = models.ForeignKey(Features, on_delete=models.CASCADE)
+
+    key = models.CharField(max_length=200)
+    value = models.CharField(max_length=200)
+    product_count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def refresh_facets(cls, category_ids, features_ids=None):
+        """
+        Recount the products of categories having features from the features of products,
+        to build the facets of categories. Changes of products change the counts with `change_product_counts`.
+
+        Arguments:
+            category_ids (list): IDs of the categories to refresh.
+            features_ids (list, optional): IDs of the features to refresh. Default is all features.
+        """
+        category_ids = list(category_ids)
+        stale_facets = cls.objects.filter(category_id__in=category_ids)
+        products_features = Product.features.through.objects.filter(product__category_id__in=category_ids)
+
+        if features_ids is not None:
+            features_ids = list(features_ids)
+            stale_facets = stale_facets.filter(feature_id__in=features_ids)
+            products_features = products_features.filter(features_id__in=features_ids)
+
+        with transaction.atomic():
+            facets = [
+                cls(
+                    category_id=facet['product__category_id'],
+                    feature_id=facet['features_id'],
+                    key=facet['features__key'],
+                    value=facet['features__value'],
+                    product_count=facet['product_count'],
+                )
+                for facet in products_features.values(
+                    'product__category_id', 'features_id', 'features__key', 'features__value'
+                ).annotate(product_count=Count('product_id')).order_by()
+            ]
+
+            stale_facets.delete()
+            cls.objects.bulk_create(
+                facets,
+                update_conflicts=True,
+                unique_fields=['category', 'feature'],
+                update_fields=['key', 'value', 'product_count'],
+            )
+
+    @classmethod
+    def change_product_counts(cls, product_counts: dict):
+        """
+        Add to the counts of products of facets in a single statement, creating the missing facets
+        and deleting the facets left without products, instead of recounting the products of the categories.
+
+        Arguments:
+            product_counts (dict): Changes of the counts of products by (category ID, feature ID),
+                positive for added links of products and features, negative for removed links.
+        """
+        product_counts = sorted(
+            (facet, product_count) for facet, product_count in product_counts.items() if product_count)
+        if not product_counts:
+            return
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                CHANGE_FACET_COUNTS_SQL.format(facet_table=cls._meta.db_table, features_table=Features._meta.db_table),
+                {
+                    'category_ids': [category_id for (category_id, _), _ in product_counts],
+                    'feature_ids': [feature_id for (_, feature_id), _ in product_counts],
+                    'product_counts': [product_count for _, product_count in product_counts],
+                }
+            )
+            if any(product_count < 0 for _, product_count in product_counts):
+                cls.objects.filter(
+                    category_id__in={category_id for (category_id, _), _ in product_counts},
+                    feature_id__in={feature_id for (_, feature_id), _ in product_counts},
+                    product_count=0,
+                ).delete()
+
+    @classmethod
+    def get_facets_by_category(cls, category_id: int, filter_params=None) -> list:
+        """
+        Get the keys of features of products by category ID with the values and the count of products.
+
+        Arguments:
+            category_id (int): category ID of the products.
+            filter_params (list, optional): A list of filter parameters for features.
+
+        Returns:
+            A list of dictionaries with the key and the options of the key, sorted by keys and values.
+            With filter parameters, an option counts the products matching the filters of the other keys
+            and the option itself, as the list of products would have after selecting the option.
+        """
+        if settings.PRODUCT_FILTER_ENGINE == 'bitmap':
+            from .bitmap_index import get_facets_by_category
+
+            return get_facets_by_category(category_id, filter_params)
+
+        facets = list(cls.objects.filter(category_id=category_id, product_count__gt=0).values(
+            'key', 'value', 'feature_id', 'product_count').order_by('key', 'value'))
+
+        features_groups = cls.get_features_groups(facets, filter_params) if filter_params else None
+        if features_groups:
+            product_counts = cls.get_filtered_product_counts(category_id, features_groups)
+            for facet in facets:
+                # Options of the only selected key aren't filtered, so they keep the counts of the facets
+                if set(features_groups) != {facet['key']}:
+                    facet['product_count'] = product_counts.get(facet['feature_id'], 0)
+
+        facets_by_keys = {}
+        for facet in facets:
+            facets_by_keys.setdefault(facet['key'], []).append({
+                'value': facet['value'],
+                'id': facet['feature_id'],
+                'product_count': facet['product_count'],
+            })
+
+        return [{'key': key, 'options': options} for key, options in facets_by_keys.items()]
+
+    @staticmethod
+    def get_features_groups(facets: list, features_ids) -> dict:
+        """
+        Get the IDs of the selected features grouped by the keys of the features, taking the keys from the facets
+        of the category and only the keys of features without products in the category from the database.
+        """
+        features_ids = sorted({int(feature_id) for feature_id in features_ids})
+        features_keys = {facet['feature_id']: facet['key'] for facet in facets}
+        missing_features_ids = [feature_id for feature_id in features_ids if feature_id not in features_keys]
+        if missing_features_ids:
+            features_keys.update(Features.objects.filter(id__in=missing_features_ids).values_list('id', 'key'))
+
+        features_groups = {}
+        for feature_id in features_ids:
+            if feature_id in features_keys:
+                features_groups.setdefault(features_keys[feature_id], []).append(feature_id)
+
+        return features_groups
+
+    @classmethod
+    def get_filtered_product_counts(cls, category_id: int, features_groups: dict) -> dict:
+        """
+        Count the products having the features of a category, which match the selected features, in one query.
+        The selected keys matched by every product are found once from the links of the selected features,
+        numbered from 1, so the sum of the numbers of the matched keys of a product matching all the keys but one
+        gives the missing key. Only the features of the products matching at least all the keys but one are counted.
+
+        Arguments:
+            category_id (int): category ID of the products.
+            features_groups (dict): keys of features and lists of ids of the selected features with the key.
+
+        Returns:
+            A dictionary of the counts of products by feature ID: the products having all the selected features
+            for the options of unselected keys, and the products having the selected features of the other keys
+            for the options of selected keys. The options of the only selected key aren't counted.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                FILTERED_FACET_COUNTS_SQL.format(
+                    features_of_products_table=Product.features.through._meta.db_table,
+                    features_table=Features._meta.db_table,
+                    product_table=Product._meta.db_table,
+                ),
+                {
+                    'category_id': category_id,
+                    'features_ids': [
+                        feature_id for features_ids in features_groups.values() for feature_id in features_ids],
+                    'key_positions': [
+                        position
+                        for position, features_ids in enumerate(features_groups.values(), 1)
+                        for _ in features_ids
+                    ],
+                    'keys': list(features_groups),
+                    'keys_count': len(features_groups),
+                    # With one key only the products matching it are counted, for the options of unselected keys
+                    'min_keys_count': max(len(features_groups) - 1, 1),
+                }
+            )
+
+            return dict(cursor.fetchall())
+
+    def __str__(self):
+        return f'{self.category} | {self.key}: {self.value} ({self.product_count})'
+
@@ -0,0 +1,200 @@
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, F, Func, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class RowComparison(Func):
+    """
+    Comparison of a row of fields with a row of values, as `(field, ...) > (value, ...)`.
+    Postgres uses it as the condition of a scan of an index on the fields, starting at the values.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, fields, operator, values):
+        self.operator = operator
+        super().__init__(*fields, *values)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql_parts, params = [], []
+        for expression in self.source_expressions:
+            sql, expression_params = compiler.compile(expression)
+            sql_parts.append(sql)
+            params.extend(expression_params)
+
+        size = len(sql_parts) // 2
+
+        return f'({", ".join(sql_parts[:size])}) {self.operator} ({", ".join(sql_parts[size:])})', params
+
+
+class ProductListPagination(LimitOffsetPagination):
+    """
+    Pagination of products by limit and offset, or by keyset when the `cursor` query parameter is given.
+
+    A cursor has the value of the sort field and the id of a product on the edge of a page, so the next page
+    is selected with `(sort_by, id) > (value, id)` from the index instead of skipping `offset` products.
+    An empty `cursor` selects the first page. How the total count is computed is set by `PRODUCT_LIST_COUNT`,
+    unless the view knows the count of products without a query in `products_count`.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.known_count = getattr(view, 'products_count', None)
+        self.is_keyset = self.cursor_query_param in request.query_params
+
+        if not self.is_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        self.sort_dict, self.sort_by = view.get_query_params_for_sort()
+        self.model = queryset.model
+        position = self.decode_cursor(request.query_params[self.cursor_query_param])
+
+        page_queryset = queryset
+        if position is not None:
+            page_queryset = page_queryset.filter(self.get_position_filter(position))
+            if position['reverse']:
+                page_queryset = page_queryset.reverse()
+
+        products = list(page_queryset[:self.limit + 1])
+        has_more = len(products) > self.limit
+        products = products[:self.limit]
+
+        if position is not None and position['reverse']:
+            products.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self.get_position(products[-1], False) if products and has_next else None
+        self.previous_position = self.get_position(products[0], True) if products and has_previous else None
+        self.count = self.get_keyset_count(queryset)
+
+        return products
+
+    def get_paginated_response(self, data):
+        if not self.is_keyset:
+            return super().get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_cursor_link(self.next_position)),
+            ('previous', self.get_cursor_link(self.previous_position)),
+            ('results', data),
+        ]))
+
+    def get_position(self, product, reverse):
+        """
+        Get the position of a product in the sorted list, as the value of the sort field and the id.
+        """
+        value = product[self.sort_by] if isinstance(product, dict) else getattr(product, self.sort_by)
+        product_id = product['id'] if isinstance(product, dict) else product.id
+
+        return {
+            'value': value.isoformat() if hasattr(value, 'isoformat') else value,
+            'id': product_id,
+            'reverse': reverse,
+        }
+
+    def get_position_filter(self, position) -> RowComparison:
+        """
+        Get the condition selecting the products after the position in the direction of the page.
+        """
+        operator = '<' if (self.sort_dict == '-') != position['reverse'] else '>'
+
+        return RowComparison(
+            [F(self.sort_by), F('id')],
+            operator,
+            [
+                Value(position['value'], output_field=self.model._meta.get_field(self.sort_by)),
+                Value(position['id'], output_field=self.model._meta.pk),
+            ],
+        )
+
+    def decode_cursor(self, encoded_cursor):
+        """
+        Get the position from the `cursor` query parameter, None for the first page, with the value converted
+        to the type of the sort field and the id to the type of the primary key.
+        Raises NotFound exception if the cursor is invalid.
+        """
+        if not encoded_cursor:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded_cursor.encode('ascii')))
+            if not isinstance(position, dict) or set(position) != {'value', 'id', 'reverse'}:
+                raise ValueError
+            if not isinstance(position['reverse'], bool) or isinstance(position['id'], bool):
+                raise ValueError
+
+            return {
+                'value': self.model._meta.get_field(self.sort_by).clean(position['value'], None),
+                'id': self.model._meta.pk.clean(position['id'], None),
+                'reverse': position['reverse'],
+            }
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_cursor_link(self, position):
+        if position is None:
+            return None
+
+        encoded_cursor = base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+
+        return replace_query_param(url, self.cursor_query_param, encoded_cursor)
+
+    def get_count(self, queryset):
+        """
+        Get the count of products for limit and offset pages, which need it to build the links.
+        """
+        if self.known_count is not None:
+            return self.known_count
+        if settings.PRODUCT_LIST_COUNT == 'cached':
+            return self.get_cached_count(queryset)
+        if settings.PRODUCT_LIST_COUNT == 'estimate':
+            return self.get_estimated_count(queryset)
+
+        return super().get_count(queryset)
+
+    def get_keyset_count(self, queryset):
+        """
+        Get the count of products for keyset pages, None if the count is skipped.
+        """
+        if settings.PRODUCT_LIST_COUNT == 'none':
+            return None
+
+        return self.get_count(queryset)
+
+    @staticmethod
+    def get_cached_count(queryset):
+        """
+        Get the count of products from the cache, counting them if the count isn't cached.
+        """
+        query_hash = hashlib.md5(str(queryset.query).encode('utf-8')).hexdigest()
+
+        return caches[settings.PRODUCT_LIST_COUNT_CACHE].get_or_set(
+            f'product_list_count:{query_hash}',
+            queryset.count,
+            settings.PRODUCT_LIST_COUNT_CACHE_TIMEOUT,
+        )
+
+    @staticmethod
+    def get_estimated_count(queryset):
+        """
+        Get the count of products estimated by the query planner, without running the query.
+        """
+        plan = json.loads(queryset.order_by().explain(format='json'))
+
+        return int(plan[0]['Plan']['Plan Rows'])
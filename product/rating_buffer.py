@@ -0,0 +1,143 @@
+"""
+Write-behind buffer of ratings of products.
+
+With `PRODUCT_RATING_WRITE_BEHIND` the rating views put the operations of users into a bounded in-process queue
+instead of writing them, and a background thread writes them in batches with `ProductRating.apply_rating_operations`,
+which combines the operations of a user on a product into one. Votes on hot products no longer wait for
+the locks of their rows. When the queue is full, the views wait for a place in it for up to
+`PRODUCT_RATING_BUFFER_PUT_TIMEOUT` seconds and then answer 503 with `Retry-After`, instead of writing the rating
+themselves: a rating written by the view could be overwritten by an older operation of the user in the queue.
+The queue is written before the process exits.
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+from .models import ProductRating
+
+logger = logging.getLogger('main')
+
+
+class RatingBuffer:
+    """
+    Bounded queue of rating operations written by a background thread in batches of up to `batch_size` operations.
+    """
+    _stop = object()
+
+    def __init__(self, max_size: int, batch_size: int, put_timeout: float):
+        self.operations = queue.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.worker = None
+        self.worker_lock = threading.Lock()
+
+    def put(self, user_id: int, product_id: int, grade, deleted_grade=None) -> bool:
+        """
+        Put a rating operation to the queue, waiting for a place for up to `put_timeout` seconds,
+        so the operations of a user are written in the order they were given.
+        Returns False if the queue stays full, when the writer is stalled.
+        """
+        self.start()
+        try:
+            self.operations.put((user_id, product_id, grade, deleted_grade), timeout=self.put_timeout)
+        except queue.Full:
+            return False
+
+        return True
+
+    def start(self):
+        """
+        Start the background thread writing the operations if it isn't running.
+        """
+        with self.worker_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.write_operations, name='rating-buffer', daemon=True)
+                self.worker.start()
+
+    def write_operations(self):
+        """
+        Write the operations from the queue in batches until the buffer is stopped.
+        """
+        is_stopped = False
+        try:
+            while not is_stopped:
+                operations = [self.operations.get()]
+                while len(operations) < self.batch_size:
+                    try:
+                        operations.append(self.operations.get_nowait())
+                    except queue.Empty:
+                        break
+
+                is_stopped = any(operation is self._stop for operation in operations)
+                self.write_batch([operation for operation in operations if operation is not self._stop])
+                for _ in operations:
+                    self.operations.task_done()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def write_batch(operations):
+        if not operations:
+            return
+
+        try:
+            if ProductRating.apply_rating_operations(operations) is None:
+                logger.error('Rating operations of users deleted while they were written are dropped: %s', operations)
+        except Exception:
+            logger.exception('Failed to write %s rating operations', len(operations))
+            connection.close()
+
+    def flush(self):
+        """
+        Wait until the operations put to the queue are written.
+        """
+        self.operations.join()
+
+    def stop(self, timeout=None):
+        """
+        Write the operations in the queue and stop the background thread.
+        """
+        with self.worker_lock:
+            worker = self.worker
+            self.worker = None
+        if worker is None or not worker.is_alive():
+            return
+
+        self.operations.put(self._stop)
+        worker.join(timeout)
+
+
+_rating_buffer = None
+_rating_buffer_lock = threading.Lock()
+
+
+def get_rating_buffer() -> RatingBuffer:
+    """
+    Get the rating buffer of the process, created with the settings on the first call.
+    """
+    global _rating_buffer
+    with _rating_buffer_lock:
+        if _rating_buffer is None:
+            _rating_buffer = RatingBuffer(
+                settings.PRODUCT_RATING_BUFFER_SIZE,
+                settings.PRODUCT_RATING_BUFFER_BATCH_SIZE,
+                settings.PRODUCT_RATING_BUFFER_PUT_TIMEOUT,
+            )
+            atexit.register(_rating_buffer.stop, settings.PRODUCT_RATING_BUFFER_STOP_TIMEOUT)
+
+    return _rating_buffer
+
+
+def put_rating_operation(user_id: int, product_id: int, grade, deleted_grade=None) -> bool:
+    """
+    Put a rating operation to the buffer of the process if the write-behind of ratings is enabled.
+    Returns False if it's disabled or the buffer stays full.
+    """
+    if not settings.PRODUCT_RATING_WRITE_BEHIND:
+        return False
+
+    return get_rating_buffer().put(user_id, product_id, grade, deleted_grade)
@@ -0,0 +1,45 @@
+"""
+Renderers of responses.
+
+`FastJSONRenderer` encodes with `orjson` if it's installed, which is several times faster than `json`
+for large lists of products, with the same bytes as `JSONRenderer` for the data of the API, which has
+no floats. Without `orjson` it is `JSONRenderer`.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .metrics import measure
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer encoding compact responses with `orjson` when it's installed.
+    Indented responses, non-UTF-8 responses and data `orjson` can't encode are rendered by `JSONRenderer`.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure('render'):
+            return self.render_json(data, accepted_media_type, renderer_context)
+
+    def render_json(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+                orjson is None
+                or data is None
+                or not api_settings.COMPACT_JSON
+                or not api_settings.UNICODE_JSON
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            rendered = orjson.dumps(
+                data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return rendered.replace('\u2028'.encode('utf-8'), b'\\u2028').replace('\u2029'.encode('utf-8'), b'\\u2029')
@@ -0,0 +1,100 @@
+"""
+Renditions of images of products.
+
+When an image of a product is uploaded, it is resized with Pillow to every width of
+`PRODUCT_IMAGE_RENDITION_WIDTHS` narrower than the image, or to its own width if it is narrower than all of them,
+and saved in every format of `PRODUCT_IMAGE_RENDITION_FORMATS` next to the image, as `<name>-<width>w.<format>`.
+The names of the renditions are kept in `ProductImage.renditions` by format, so the media of products
+are returned with their `srcset` from the rows of the images, without more queries.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import ProductImage, image_upload_path
+
+logger = logging.getLogger('main')
+
+# Formats of Pillow and extensions of the renditions
+RENDITION_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def get_rendition_widths(image_width: int) -> list:
+    """
+    Get the widths of the renditions of an image, without upscaling it.
+    """
+    return sorted({min(width, image_width) for width in settings.PRODUCT_IMAGE_RENDITION_WIDTHS})
+
+
+def delete_renditions(product_image: ProductImage):
+    """
+    Delete the files of the renditions of an image of a product.
+    """
+    for renditions in product_image.renditions.values():
+        for _, name in renditions:
+            product_image.image.storage.delete(name)
+
+
+def create_renditions(product_image: ProductImage) -> dict:
+    """
+    Create the renditions of an image of a product, replacing its previous renditions.
+
+    Arguments:
+        product_image (ProductImage): The saved image of a product.
+
+    Returns:
+        A dictionary of lists of (width, name) of the renditions by format, in the order of widths.
+        Empty if there is no image or it can't be read.
+    """
+    delete_renditions(product_image)
+    if not product_image.image:
+        return {}
+
+    try:
+        with product_image.image.open('rb') as image_file, Image.open(image_file) as image:
+            image = ImageOps.exif_transpose(image).convert('RGBA')
+    except (OSError, ValueError):
+        logger.warning(f'Cannot read the image {product_image.image.name} of the product {product_image.product_id}')
+        return {}
+
+    name = os.path.splitext(os.path.basename(product_image.image.name))[0]
+    renditions = {rendition_format: [] for rendition_format in settings.PRODUCT_IMAGE_RENDITION_FORMATS}
+
+    for width in get_rendition_widths(image.width):
+        resized_image = image.resize((width, max(round(image.height * width / image.width), 1)), Image.LANCZOS)
+        # JPEG has no transparency, so transparent pixels are white instead of black
+        opaque_image = Image.new('RGB', resized_image.size, (255, 255, 255))
+        opaque_image.paste(resized_image, mask=resized_image.getchannel('A'))
+
+        for rendition_format in renditions:
+            pillow_format, extension = RENDITION_FORMATS[rendition_format]
+            rendition_file = io.BytesIO()
+            (opaque_image if pillow_format == 'JPEG' else resized_image).save(
+                rendition_file, pillow_format, quality=settings.PRODUCT_IMAGE_RENDITION_QUALITY)
+
+            renditions[rendition_format].append([width, product_image.image.storage.save(
+                image_upload_path(product_image, f'{name}-{width}w.{extension}'),
+                ContentFile(rendition_file.getvalue())
+            )])
+
+    return renditions
+
+
+def get_media(image: str, renditions: dict) -> dict:
+    """
+    Get the media of an image of a product: the url of the image and the `srcset` of its renditions by format.
+    """
+    return {
+        'src': settings.MEDIA_URL + image,
+        'srcset': {
+            rendition_format: ', '.join(f'{settings.MEDIA_URL}{name} {width}w' for width, name in format_renditions)
+            for rendition_format, format_renditions in renditions.items()
+        },
+    }
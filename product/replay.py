@@ -0,0 +1,218 @@
+"""
+Replay of captured traffic, used by the `replay_traffic` command.
+
+Records are JSON lines with the `method`, the `path`, the `query` as a string or a dictionary, the `user`
+as a username or an ID and the JSON `body`, so lines of `performance.log` are records too. They are sent
+in-process through the test client or over HTTP by a pool of threads, and the report has the latency and
+the throughput of every endpoint, named by the method and the route of the path.
+"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import Resolver404, resolve
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .benchmark import PERCENTILES, get_percentile
+
+
+def read_records(lines) -> list:
+    """
+    Read the records of requests from JSON lines, skipping empty lines and lines without a path.
+
+    Returns:
+        Records with the upper case `method`, the `path`, the `query` string, the `user` and the `body`.
+    """
+    records = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        record = json.loads(line)
+        if not record.get('path'):
+            continue
+
+        query = record.get('query') or ''
+        if isinstance(query, dict):
+            query = urlencode(query, doseq=True)
+        records.append({
+            'method': record.get('method', 'GET').upper(),
+            'path': record['path'],
+            'query': query,
+            'user': record.get('user', record.get('user_id')),
+            'body': record.get('body'),
+        })
+
+    return records
+
+
+def get_endpoint(record: dict) -> str:
+    """
+    Get the name of the endpoint of a record from the method and the route of the path.
+    """
+    try:
+        route = '/' + resolve(record['path']).route
+    except Resolver404:
+        route = record['path']
+
+    return f'{record["method"]} {route}'
+
+
+def get_authorizations(records: list) -> tuple:
+    """
+    Get the authorization headers of the users of the records by the users, with access tokens
+    for the users found by ID or username.
+
+    Returns:
+        A tuple of the authorization headers by the users and the users which aren't found.
+    """
+    users = {record['user'] for record in records if record['user'] not in (None, '')}
+    user_ids = {user for user in users if isinstance(user, int) or str(user).isdigit()}
+    found_user_ids = {
+        str(user_id): user_id
+        for user_id in User.objects.filter(id__in=[int(user_id) for user_id in user_ids]).values_list('id', flat=True)
+    }
+    found_user_ids.update(User.objects.filter(username__in=[str(user) for user in users - user_ids]).values_list(
+        'username', 'id'))
+
+    authorizations = {}
+    missing_users = []
+    for user in users:
+        user_id = found_user_ids.get(str(user))
+        if user_id is None:
+            missing_users.append(user)
+            continue
+        authorizations[user] = 'Bearer ' + str(RefreshToken.for_user(User(id=user_id)).access_token)
+
+    return authorizations, missing_users
+
+
+class InProcessTransport:
+    """
+    Transport sending requests to the application in the process through a test client of every thread.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def send(self, record: dict, headers: dict) -> int:
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+
+        path = f'{record["path"]}?{record["query"]}' if record['query'] else record['path']
+        body = '' if record['body'] is None else json.dumps(record['body'])
+        response = self.local.client.generic(
+            record['method'], path, body, content_type='application/json', headers=headers)
+
+        return response.status_code
+
+    def close(self):
+        """
+        Close the database connection of the thread.
+        """
+        connection.close()
+
+
+class HTTPTransport:
+    """
+    Transport sending requests over HTTP to the server at `base_url`.
+    """
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, record: dict, headers: dict) -> int:
+        url = self.base_url + record['path'] + (f'?{record["query"]}' if record['query'] else '')
+        body = None if record['body'] is None else json.dumps(record['body']).encode('utf-8')
+        request = urllib.request.Request(url, data=body, method=record['method'], headers={
+            'Content-Type': 'application/json', **headers})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def close(self):
+        pass
+
+
+def replay(records: list, transport, concurrency: int, authorizations: dict) -> dict:
+    """
+    Send the records with `concurrency` threads, each taking the next record until they are sent.
+
+    Returns:
+        The report with the total number of requests, the wall time in seconds, the throughput in requests
+        per second and the results of endpoints by their names with the number of requests, statuses, errors,
+        the throughput and percentiles of the latency in milliseconds.
+    """
+    records_iterator = iter(records)
+    records_lock = threading.Lock()
+    measurements = []
+
+    def send_records():
+        try:
+            while True:
+                with records_lock:
+                    record = next(records_iterator, None)
+                if record is None:
+                    return
+
+                headers = {}
+                if record['user'] in authorizations:
+                    headers['Authorization'] = authorizations[record['user']]
+                started_at = time.perf_counter()
+                try:
+                    status = transport.send(record, headers)
+                except Exception as error:
+                    status = type(error).__name__
+                measurements.append((get_endpoint(record), status, (time.perf_counter() - started_at) * 1000))
+        finally:
+            transport.close()
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(send_records) for _ in range(concurrency)]:
+            future.result()
+    wall_time = time.perf_counter() - started_at
+
+    return {
+        'requests': len(measurements),
+        'wall_time_s': round(wall_time, 3),
+        'throughput_rps': round(len(measurements) / wall_time, 2) if wall_time else None,
+        'results': get_results(measurements, wall_time),
+    }
+
+
+def get_results(measurements: list, wall_time: float) -> dict:
+    """
+    Get the results of endpoints from the measurements of requests.
+    """
+    measurements_by_endpoints = {}
+    for endpoint, status, duration in measurements:
+        measurements_by_endpoints.setdefault(endpoint, []).append((status, duration))
+
+    results = {}
+    for endpoint in sorted(measurements_by_endpoints):
+        durations = sorted(duration for _, duration in measurements_by_endpoints[endpoint])
+        statuses = {}
+        for status, _ in measurements_by_endpoints[endpoint]:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        results[endpoint] = {
+            'requests': len(durations),
+            'statuses': statuses,
+            'errors': sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500),
+            'throughput_rps': round(len(durations) / wall_time, 2) if wall_time else None,
+            **{f'p{percentile}_ms': round(get_percentile(durations, percentile), 3) for percentile in PERCENTILES},
+        }
+
+    return results
@@ -1,6 +1,54 @@
 from rest_framework import serializers
 
-from product.models import Product, Features, Category, ProductRating, ProductImage
+from product.models import Product, Features, Category, ProductRating
+from product.renditions import get_media
+
+
+def get_media_urls(product):
+    """
+    Get the urls of the product images with the `srcset` of their renditions,
+    read from the prefetched images of the product if they are loaded.
+    """
+    return [
+        get_media(str(product_image.image), product_image.renditions)
+        for product_image in product.productimage_set.all()
+    ]
+
+
+def get_current_user_rating(current_user_grade):
+    """
+    Get the rating of the product by the current user from the grade, None if the user didn't rate the product.
+    """
+    if current_user_grade is None:
+        return None
+
+    return 'like' if current_user_grade else 'dislike'
+
+
+def get_product_list_rows(products_values) -> list:
+    """
+    Get the products of a list of products from the values of products, with the features and the images
+    selected in two queries. The rows are the same as the data of `ProductListSerializer`, without the cost
+    of the fields of the serializer for every product.
+    """
+    features_by_products, images_by_products = Product.get_features_and_images_by_products(
+        [product['id'] for product in products_values])
+
+    return [
+        {
+            'id': product['id'],
+            'title': product['title'],
+            'price': product['price'],
+            'category': product['category__title'],
+            'category_id': product['category_id'],
+            'features': [
+                {'id': feature_id, 'key': key, 'value': value}
+                for feature_id, key, value in features_by_products.get(product['id'], [])
+            ],
+            'media': [get_media(image, renditions) for image, renditions in images_by_products.get(product['id'], [])],
+        }
+        for product in products_values
+    ]
 
 
 class FeaturesSerializerForProduct(serializers.ModelSerializer):
@@ -24,16 +72,21 @@ class ProductRatingSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class FeaturesSerializer(serializers.ModelSerializer):
-    key = serializers.CharField()
-    options = serializers.SerializerMethodField()
+class RatingOperationSerializer(serializers.Serializer):
+    # IDs of products are bigint
+    product_id = serializers.IntegerField(min_value=1, max_value=9223372036854775807)
+    grade = serializers.BooleanField(allow_null=True)
 
-    class Meta:
-        model = Features
-        fields = ('key', 'options')
 
-    def get_options(self, obj):
-        return Features.get_unique_features_value_by_keys(self.context['view'].kwargs['category_id'], obj.get('key'))
+class CategoryFacetOptionSerializer(serializers.Serializer):
+    value = serializers.CharField()
+    id = serializers.IntegerField()
+    product_count = serializers.IntegerField()
+
+
+class CategoryFacetSerializer(serializers.Serializer):
+    key = serializers.CharField()
+    options = CategoryFacetOptionSerializer(many=True)
 
 
 class ProductListSerializer(serializers.ModelSerializer):
@@ -56,8 +109,7 @@ class ProductListSerializer(serializers.ModelSerializer):
         )
 
     def get_media(self, obj):
-        list_images_urls = list(ProductImage.get_all_images_urls_for_one_product(obj.id))
-        return list(map(lambda image_url: '/media/' + str(image_url), list_images_urls))
+        return get_media_urls(obj)
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -82,25 +134,18 @@ class ProductSerializer(serializers.ModelSerializer):
         )
 
     def get_media(self, obj):
-        list_images_urls = list(ProductImage.get_all_images_urls_for_one_product(obj.id))
-        return list(map(lambda image_url: '/media/' + str(image_url), list_images_urls))
+        return get_media_urls(obj)
 
     def get_rating(self, obj):
-        rating_counters = {
-            'like_count': ProductRating.get_count_rating_for_one_product(obj.id, True),
-            'dislike_count': ProductRating.get_count_rating_for_one_product(obj.id, False),
-        }
-
-        current_user = self.context['request'].user if self.context['request'].user.is_authenticated else None
+        if hasattr(obj, 'current_user_grade'):
+            current_user_grade = obj.current_user_grade
+        else:
+            current_user = self.context['request'].user if self.context['request'].user.is_authenticated else None
+            current_user_rating_for_product = ProductRating.get_rating_from_user(obj.id, current_user)
+            current_user_grade = current_user_rating_for_product.grade if current_user_rating_for_product else None
 
-        current_user_rating_for_product = ProductRating.get_rating_from_user(obj.id, current_user)
-        if current_user_rating_for_product:
-            current_user_rating = 'like' if current_user_rating_for_product.grade else 'dislike'
-            return {
-                **rating_counters,
-                'current_user_rating': current_user_rating
-            }
         return {
-            **rating_counters,
-            'current_user_rating': None
+            'like_count': obj.like_count,
+            'dislike_count': obj.dislike_count,
+            'current_user_rating': get_current_user_rating(current_user_grade)
         }
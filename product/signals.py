@@ -0,0 +1,334 @@
+"""
+Keep the denormalized data, the in-process indexes, the cache versions and the renditions of images of products
+up to date with the changes of products, features, images and ratings.
+
+The denormalized data is written in the transaction of the change, while the bitmap indexes are dropped and
+the versions are bumped after the transaction is committed: a concurrent request reading the rows before
+the commit would otherwise cache the old data under the new versions.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .bitmap_index import invalidate_category_indexes
+from .cache import bump_category_versions, bump_categories_version, bump_product_versions, bump_catalog_version
+from .models import Product, Features, CategoryFacet, Category, ProductImage, ProductRating
+from .renditions import create_renditions, delete_renditions
+
+
+def invalidate_on_commit(category_ids=(), product_ids=(), categories=False, catalog=False):
+    """
+    Drop the bitmap indexes of categories and bump the versions of categories and products
+    when the current transaction is committed, or at once outside of a transaction.
+
+    Arguments:
+        category_ids (iterable): IDs of the changed categories, None is ignored.
+        product_ids (iterable): IDs of the changed products.
+        categories (bool): Whether the list of categories changed.
+        catalog (bool): Whether the data of all products changed.
+    """
+    category_ids = [category_id for category_id in category_ids if category_id is not None]
+    product_ids = list(product_ids)
+
+    def invalidate():
+        invalidate_category_indexes(category_ids)
+        bump_category_versions(category_ids)
+        bump_product_versions(product_ids)
+        if categories:
+            bump_categories_version()
+        if catalog:
+            bump_catalog_version()
+
+    transaction.on_commit(invalidate)
+
+
+def get_links_of_features(instance, reverse, pk_set=None) -> list:
+    """
+    Get (product ID, category ID, feature ID) of the links of products and features changed by `m2m_changed`,
+    all links of the instance if `pk_set` is None.
+    """
+    links = Product.features.through.objects.filter(**{'features_id' if reverse else 'product_id': instance.id})
+    if pk_set is not None:
+        links = links.filter(**{'product_id__in' if reverse else 'features_id__in': list(pk_set)})
+
+    return list(links.values_list('product_id', 'product__category_id', 'features_id'))
+
+
+def change_facets_of_links(links, product_count):
+    """
+    Add the count of products to the facets of the links of products and features.
+    """
+    product_counts = Counter()
+    for _, category_id, features_id in links:
+        product_counts[category_id, features_id] += product_count
+
+    CategoryFacet.change_product_counts(product_counts)
+
+
+@receiver(m2m_changed, sender=Product.features.through)
+def refresh_facets_on_features_of_product_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Change the counts of products of the facets of the features added to or removed from products,
+    set the update time of the products, drop the bitmap indexes and bump the versions of the categories
+    and the products.
+    For `product.features` the instance is a product and `pk_set` has ids of features,
+    for `feature.product_set` the instance is a feature and `pk_set` has ids of products.
+    The links are read before they are removed, since `pk_set` of removed links may have ids which aren't linked.
+    """
+    if action in ('pre_remove', 'pre_clear'):
+        instance._facets_links = get_links_of_features(instance, reverse, pk_set)
+        return
+
+    if action == 'post_add' and pk_set:
+        links = get_links_of_features(instance, reverse, pk_set)
+        change_facets_of_links(links, 1)
+    elif action in ('post_remove', 'post_clear'):
+        links = instance._facets_links
+        change_facets_of_links(links, -1)
+    else:
+        return
+
+    product_ids = {product_id for product_id, _, _ in links}
+    Product.touch(product_ids)
+    invalidate_on_commit({category_id for _, category_id, _ in links}, product_ids)
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_category_of_product(sender, instance, raw, **kwargs):
+    """
+    Remember the category of a product before the product is saved, to detect moving it to another category.
+    """
+    if raw or instance.pk is None:
+        instance._previous_category_id = None
+        return
+
+    instance._previous_category_id = Product.objects.filter(
+        pk=instance.pk).values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def refresh_facets_on_product_moved(sender, instance, created, raw, **kwargs):
+    """
+    Drop the bitmap indexes, bump the versions of the saved product and its category, and move the counts
+    of the features of a product moved to another category from the facets of the previous category to the new one.
+    """
+    previous_category_id = getattr(instance, '_previous_category_id', None)
+    invalidate_on_commit([instance.category_id, previous_category_id], [instance.id])
+
+    if raw or created or previous_category_id in (None, instance.category_id):
+        return
+
+    product_counts = {}
+    for features_id in instance.features.values_list('id', flat=True):
+        product_counts[previous_category_id, features_id] = -1
+        product_counts[instance.category_id, features_id] = 1
+
+    CategoryFacet.change_product_counts(product_counts)
+
+
+# Deletions of products in progress by the object whose deletion deletes them, a product, a queryset or an object
+# deleting products by cascade: the count of products not deleted yet, the ids of the products and their categories,
+# and the features of the first product. A deletion failed before its last product is started again
+# when the object deletes one of its products again
+_deleted_products = {}
+
+
+@receiver(pre_delete, sender=Product)
+def remember_features_of_deleted_product(sender, instance, origin=None, **kwargs):
+    """
+    Remember a product before the product and its links to the features are deleted, with the other products
+    deleted by the same deletion, and the features of the first product, in case it is the only one.
+    """
+    deletion = _deleted_products.get(id(origin))
+    if deletion is None or instance.id in deletion['product_ids']:
+        deletion = _deleted_products[id(origin)] = {
+            'origin': origin,
+            'pending_count': 0,
+            'product_ids': set(),
+            'category_ids': set(),
+            'features_ids': list(instance.features.values_list('id', flat=True)),
+        }
+    deletion['pending_count'] += 1
+    deletion['product_ids'].add(instance.id)
+    deletion['category_ids'].add(instance.category_id)
+
+
+@receiver(post_delete, sender=Product)
+def refresh_facets_on_product_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Once the last product of a deletion is deleted, decrement the counts of products of the facets
+    of the features of a single product, or recount the facets of the categories of many products at once,
+    then drop the bitmap indexes and bump the versions of the products and their categories.
+    """
+    deletion = _deleted_products.get(id(origin))
+    if deletion is None:
+        return
+
+    deletion['pending_count'] -= 1
+    if deletion['pending_count']:
+        return
+
+    del _deleted_products[id(origin)]
+    if len(deletion['product_ids']) == 1:
+        CategoryFacet.change_product_counts({
+            (instance.category_id, features_id): -1 for features_id in deletion['features_ids']
+        })
+    else:
+        CategoryFacet.refresh_facets(deletion['category_ids'])
+    invalidate_on_commit(deletion['category_ids'], deletion['product_ids'])
+
+
+def is_product_deleted(product_id, origin) -> bool:
+    """
+    Check whether a product is deleted by the deletion of an object, which invalidates the product itself.
+    """
+    deletion = _deleted_products.get(id(origin))
+
+    return deletion is not None and product_id in deletion['product_ids']
+
+
+@receiver(post_save, sender=Features)
+def update_facets_on_feature_changed(sender, instance, created, raw, **kwargs):
+    """
+    Copy the key and the value of a changed feature to its facets, set the update time of the products having it,
+    drop the bitmap indexes and bump the versions of the categories having it and of the data of all products.
+    """
+    if raw or created:
+        return
+
+    CategoryFacet.objects.filter(feature=instance).update(key=instance.key, value=instance.value)
+    Product.touch_filtered(features=instance)
+
+    category_ids = CategoryFacet.objects.filter(feature=instance).values_list('category_id', flat=True)
+    invalidate_on_commit(category_ids, catalog=True)
+
+
+@receiver(pre_delete, sender=Features)
+def remember_categories_and_products_of_deleted_feature(sender, instance, **kwargs):
+    """
+    Remember the categories and the products having a feature before the feature, its facets
+    and its links to the products are deleted, which doesn't send `m2m_changed`.
+    """
+    instance._facets_category_ids = list(
+        CategoryFacet.objects.filter(feature=instance).values_list('category_id', flat=True))
+    instance._product_ids = list(
+        Product.features.through.objects.filter(features=instance).values_list('product_id', flat=True))
+
+
+@receiver(post_delete, sender=Features)
+def invalidate_on_feature_deleted(sender, instance, **kwargs):
+    """
+    Set the update time of the products having a deleted feature, drop the bitmap indexes and bump the versions
+    of the categories having it and of the data of all products.
+    """
+    Product.touch(instance._product_ids)
+    invalidate_on_commit(instance._facets_category_ids, catalog=True)
+
+
+@receiver(pre_save, sender=ProductImage)
+def remember_previous_image(sender, instance, raw, **kwargs):
+    """
+    Remember the name of the image before an image of a product is saved, to detect uploading another image.
+    """
+    if raw or instance.pk is None:
+        instance._previous_image = None
+        return
+
+    instance._previous_image = ProductImage.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=ProductImage)
+def create_renditions_on_image_uploaded(sender, instance, created, raw, **kwargs):
+    """
+    Create the renditions of an uploaded image of a product, before the versions of the product are bumped.
+    """
+    if raw or (not created and instance.image.name == getattr(instance, '_previous_image', None)):
+        return
+
+    instance.renditions = create_renditions(instance)
+    ProductImage.objects.filter(pk=instance.pk).update(renditions=instance.renditions)
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_renditions_on_image_deleted(sender, instance, **kwargs):
+    """
+    Delete the files of the renditions of a deleted image of a product.
+    """
+    delete_renditions(instance)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def bump_versions_on_image_changed(sender, instance, origin=None, **kwargs):
+    """
+    Set the update time and bump the versions of a product whose image is saved or deleted and of its category,
+    unless the product is deleted with it.
+    """
+    if is_product_deleted(instance.product_id, origin):
+        return
+
+    Product.touch([instance.product_id])
+    invalidate_on_commit(
+        Product.objects.filter(id=instance.product_id).values_list('category_id', flat=True), [instance.product_id])
+
+
+@receiver(pre_save, sender=ProductRating)
+def remember_previous_grade(sender, instance, raw, **kwargs):
+    """
+    Remember the grade of a rating before the rating is saved, to detect changing the grade.
+    """
+    if raw or instance.pk is None:
+        instance._previous_grade = None
+        return
+
+    instance._previous_grade = ProductRating.objects.filter(pk=instance.pk).values_list('grade', flat=True).first()
+
+
+@receiver(post_save, sender=ProductRating)
+@receiver(post_delete, sender=ProductRating)
+def change_rating_counters_on_rating_changed(sender, instance, origin=None, **kwargs):
+    """
+    Change the like and dislike counters and the update time of a product whose rating is saved or deleted
+    with the ORM, by the admin or by deleting the user, and bump the versions of the product and its category,
+    unless the product is deleted with it.
+    Ratings written by `ProductRating.create_or_update_rating` change the counters and bump the versions themselves.
+    """
+    if kwargs.get('raw') or is_product_deleted(instance.product_id, origin):
+        return
+
+    if 'created' in kwargs:
+        previous_grade, grade = getattr(instance, '_previous_grade', None), instance.grade
+    else:
+        previous_grade, grade = instance.grade, None
+
+    Product.change_rating_counters(
+        instance.product_id,
+        like_count=(grade is not None and bool(grade)) - (previous_grade is not None and bool(previous_grade)),
+        dislike_count=(grade is not None and not grade) - (previous_grade is not None and not previous_grade),
+    )
+    invalidate_on_commit(
+        Product.objects.filter(id=instance.product_id).values_list('category_id', flat=True), [instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def touch_products_on_category_changed(sender, instance, created, raw, **kwargs):
+    """
+    Set the update time of the products of a changed category, which have its title.
+    """
+    if raw or created:
+        return
+
+    Product.touch_filtered(category=instance)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_versions_on_category_changed(sender, instance, **kwargs):
+    """
+    Bump the versions of a saved or deleted category, of the list of categories
+    and of the data of all products, which have titles of categories.
+    """
+    invalidate_on_commit([instance.id], categories=True, catalog=True)
+
@@ -0,0 +1,44 @@
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from product import bitmap_index
+
+# Media of tests is kept in memory instead of the media directory
+TEST_STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.InMemoryStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+
+class CatalogTestMixin:
+    """
+    Mixin of test cases of the catalog clearing the caches and the bitmap indexes before every test.
+    Changes rolled back at the end of a test don't bump the versions of cached responses,
+    so responses and indexes cached by a test would be stale for the next one.
+    """
+
+    def setUp(self):
+        super().setUp()
+        caches['catalog'].clear()
+        with bitmap_index._category_indexes_lock:
+            bitmap_index._category_indexes.clear()
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CatalogTestCase(CatalogTestMixin, TestCase):
+    """
+    Test case of the catalog running every test in a transaction rolled back after it,
+    with the data of `setUpTestData` created once for the test case.
+    """
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CatalogTransactionTestCase(CatalogTestMixin, TransactionTestCase):
+    """
+    Test case of the catalog committing the data of tests, for tests using other connections to the database,
+    like from other threads. The tables are truncated after every test.
+    """
@@ -0,0 +1,92 @@
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from product.benchmark import get_percentile, get_request
+from product.models import Category, Product, ProductRating
+from product.tests.base import CatalogTestCase
+
+
+class BenchmarkAPICommandTestCase(CatalogTestCase):
+    """
+    Benchmark of the product API test case implementation.
+    """
+
+    def setUp(self):
+        """
+        Set up data for tests.
+        """
+        super().setUp()
+        self.test_directory = tempfile.TemporaryDirectory()
+        self.test_output_path = os.path.join(self.test_directory.name, 'results.json')
+        self.test_options = [
+            '--categories', '2', '--products', '30', '--keys', '3', '--values', '4', '--users', '5',
+            '--requests', '60', '--warmup', '5',
+        ]
+
+    def tearDown(self):
+        self.test_directory.cleanup()
+
+    def test_benchmark_api(self):
+        """
+        Case: run the benchmark on an empty database with the output to a file.
+        Expect: the catalog is seeded with consistent rating counters, the results of all endpoints are saved.
+        """
+        call_command('benchmark_api', *self.test_options, '--allocations', '--output', self.test_output_path,
+                     stdout=StringIO())
+
+        with open(self.test_output_path) as output_file:
+            report = json.load(output_file)
+
+        assert 2 == Category.objects.count()
+        assert 30 == Product.objects.count()
+        assert not ProductRating.get_products_with_inconsistent_rating_counters().exists()
+        assert 60 == sum(endpoint_results['requests'] for endpoint_results in report['results'].values())
+        assert {'list', 'list_filtered', 'item', 'facets', 'rating'} == set(report['results'])
+        assert {'200'} == set(report['results']['item']['statuses'])
+        assert 0 < report['results']['item']['mean_queries']
+        assert 'p95_allocated_kib' in report['results']['list']
+
+    def test_benchmark_api_compare(self):
+        """
+        Case: run the benchmark of the products twice, comparing the second run with the first one.
+        Expect: the changes of the latency and queries of the products from the first run.
+        """
+        call_command('benchmark_api', *self.test_options, '--endpoint', 'item', '--output', self.test_output_path,
+                     stdout=StringIO())
+        stdout = StringIO()
+        call_command('benchmark_api', *self.test_options, '--endpoint', 'item', '--compare', self.test_output_path,
+                     stdout=stdout)
+
+        assert 'Changes from the baseline' in stdout.getvalue()
+        assert 'p95_ms' in stdout.getvalue()
+
+    def test_get_percentile(self):
+        """
+        Case: get percentiles of sorted values.
+        Expect: the nearest-rank percentiles.
+        """
+        test_values = list(range(1, 101))
+
+        assert 50 == get_percentile(test_values, 50)
+        assert 99 == get_percentile(test_values, 99)
+        assert 1 == get_percentile([1], 95)
+        assert get_percentile([], 50) is None
+
+    def test_get_request_of_list_pages(self):
+        """
+        Case: get requests of the list of products of a category.
+        Expect: the pages are requested by limit and offset, which the pagination of the list reads.
+        """
+        test_catalog = {'category_ids': [1], 'feature_ids': [[1]], 'product_ids': [1], 'user_ids': [1]}
+        test_random_generator = random.Random(1)
+
+        query_params = [get_request('list', test_catalog, test_random_generator)[2] for _ in range(50)]
+
+        assert {5} == {params['limit'] for params in query_params}
+        assert {0, 5, 10} == {params['offset'] for params in query_params}
+        assert not [params for params in query_params if 'page' in params]
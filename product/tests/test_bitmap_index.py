@@ -0,0 +1,125 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from http import HTTPStatus as HttpStatusCode
+
+from product.models import Features, Category, Product, CategoryFacet
+from product.tests.base import CatalogTestCase
+
+
+class BitmapIndexEngineTestCase(CatalogTestCase):
+    """
+    Bitmap index engine test case implementation, comparing the responses with the ORM engine.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_category = Category.objects.create(
+            title='Test title'
+        )
+        cls.test_features = {
+            value: Features.objects.create(key=key, value=value)
+            for key, value in (('color', 'red'), ('color', 'blue'), ('size', 'big'), ('size', 'small'))
+        }
+        cls.test_other_features = Features.objects.create(key='color', value='green')
+
+        for number, features in enumerate((
+                ('red', 'big'),
+                ('blue', 'big'),
+                ('red', 'small'),
+                ('blue', ),
+                (),
+        )):
+            Product.objects.create(
+                title=f'title test{number}',
+                text=None,
+                price=500 - number,
+                description='test description test',
+                category=cls.test_category,
+            ).features.add(*[cls.test_features[value] for value in features])
+
+    def get_filter_params(self, filter_values):
+        """Get the filter parameters selecting the features with the values"""
+        return [
+            str(self.test_features[value].id if value in self.test_features else self.test_other_features.id)
+            for value in filter_values
+        ]
+
+    def get_products_of_both_engines(self, filter_values):
+        """Get the lists of products of the ORM and the bitmap engines for the selected features"""
+        products_lists = []
+        for engine in ('orm', 'bitmap'):
+            with override_settings(PRODUCT_FILTER_ENGINE=engine):
+                products_lists.append(list(Product.get_filtered_and_sorted_list_of_product_by_category(
+                    self.test_category.id, '-', 'price', self.get_filter_params(filter_values))))
+
+        return products_lists
+
+    def test_get_list_of_product_by_category_with_both_engines(self):
+        """
+        Case: get list product with selected features with the ORM and the bitmap engines.
+        Expect: the same list of products.
+        """
+        for filter_values in ((), ('red', ), ('red', 'blue'), ('red', 'big'), ('blue', 'small'), ('green', 'big')):
+            orm_products_list, bitmap_products_list = self.get_products_of_both_engines(filter_values)
+
+            assert orm_products_list == bitmap_products_list
+
+    @override_settings(PRODUCT_FILTER_ENGINE='bitmap')
+    def test_get_list_of_product_by_category_with_bitmap_engine_counted_from_bitmap(self):
+        """
+        Case: get list product with selected features with the bitmap engine.
+        Expect: the count of products from the bitmap without a count query, the IDs of products in one parameter.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                path=f'/api/v1/category/{self.test_category.id}/',
+                data={'filter': self.get_filter_params(('red', 'blue')), 'limit': 1},
+            )
+        products_queries = [query['sql'] for query in queries if 'FROM "product_product"' in query['sql']]
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert 4 == response.json()['count']
+        assert 1 == len(response.json()['results'])
+        assert not [sql for sql in products_queries if 'COUNT(' in sql or 'EXISTS' in sql.upper()]
+        assert '"product_product"."id" = ANY(ARRAY[' in products_queries[-1]
+
+    def test_get_unique_features_products_by_category_with_both_engines(self):
+        """
+        Case: get list of unique features products by category with selected features with both engines.
+        Expect: the same options and counts of products.
+        """
+        for filter_values in (
+                (), ('red', ), ('red', 'blue'), ('red', 'big'), ('red', 'blue', 'small'), ('green', 'big'),
+        ):
+            responses = []
+            for engine in ('orm', 'bitmap'):
+                with override_settings(PRODUCT_FILTER_ENGINE=engine):
+                    responses.append(self.client.get(
+                        path=f'/api/v1/feature/category/{self.test_category.id}/',
+                        data={'filter': self.get_filter_params(filter_values)},
+                    ))
+
+            assert HttpStatusCode.OK.value == responses[1].status_code
+            assert responses[0].json() == responses[1].json()
+
+    def test_bitmap_index_invalidated_on_features_of_product_changed(self):
+        """
+        Case: add a feature to a product after the bitmap index of the category is loaded.
+        Expect: the bitmap engine selects the product and counts it in the facets.
+        """
+        with override_settings(PRODUCT_FILTER_ENGINE='bitmap'):
+            assert 1 == len(self.get_products_of_both_engines(('small', ))[1])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.get(title='title test4').features.add(self.test_features['small'])
+
+            assert 2 == len(self.get_products_of_both_engines(('small', ))[1])
+            assert {'value': 'small', 'id': self.test_features['small'].id, 'product_count': 2} in [
+                option
+                for facet in CategoryFacet.get_facets_by_category(self.test_category.id)
+                for option in facet['options']
+            ]
@@ -0,0 +1,333 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from http import HTTPStatus as HttpStatusCode
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from product.models import Category, Product, Features, ProductRating
+from product.tests.base import CatalogTestCase, CatalogTransactionTestCase
+
+
+class VersionedPageCacheTestCase(CatalogTestCase):
+    """
+    Cache of catalog views invalidated by versions of categories test case implementation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_category = Category.objects.create(
+            title='Test Category'
+        )
+        cls.test_other_category = Category.objects.create(
+            title='Test Other Category'
+        )
+        cls.test_features = Features.objects.create(
+            key='Test key',
+            value='Test value'
+        )
+        cls.test_user = User.objects.create(
+            username='test_user',
+            password='test_password'
+        )
+        cls.test_product = Product.objects.create(
+            title='title test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=cls.test_category,
+        )
+        cls.test_other_product = Product.objects.create(
+            title='title other test',
+            text=None,
+            price=700,
+            description='test description test',
+            category=cls.test_other_category,
+        )
+        cls.test_path = f'/api/v1/category/{cls.test_category.id}/'
+        cls.test_other_path = f'/api/v1/category/{cls.test_other_category.id}/'
+
+    def get_products(self, path):
+        """Get the products of the list of products by category"""
+        response = self.client.get(path=path)
+        assert HttpStatusCode.OK.value == response.status_code
+
+        return response.json()['results']
+
+    def test_get_list_of_product_by_category_from_cache(self):
+        """
+        Case: get the list of products by category twice without changes of products.
+        Expect: the second response is taken from the cache without queries of products.
+        """
+        expected_products = self.get_products(self.test_path)
+
+        with CaptureQueriesContext(connection) as queries:
+            products = self.get_products(self.test_path)
+
+        assert expected_products == products
+        assert not [query for query in queries.captured_queries if 'product_product' in query['sql']]
+
+    def test_get_list_of_product_by_category_after_product_changed(self):
+        """
+        Case: change the price of a product, add a product and a feature after the list of products is cached.
+        Expect: the changes are in the list of products at once, the cached list of another category is kept.
+        """
+        self.get_products(self.test_path)
+        expected_other_products = self.get_products(self.test_other_path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_product.price = 600
+            self.test_product.save()
+        assert [600] == [product['price'] for product in self.get_products(self.test_path)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                title='title new test',
+                text=None,
+                price=800,
+                description='test description test',
+                category=self.test_category,
+            )
+        assert 2 == len(self.get_products(self.test_path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_product.features.add(self.test_features)
+        assert [[], [self.test_features.id]] == [
+            [feature['id'] for feature in product['features']] for product in self.get_products(self.test_path)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            assert expected_other_products == self.get_products(self.test_other_path)
+        assert not [query for query in queries.captured_queries if 'product_product' in query['sql']]
+
+    def test_get_list_of_product_by_category_changed_in_transaction(self):
+        """
+        Case: get the cached list of products while a product is changed in a transaction, then after the commit.
+        Expect: the cached list before the commit, so the old rows aren't cached with a new version,
+        the changed list after it.
+        """
+        self.get_products(self.test_path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_product.price = 600
+            self.test_product.save()
+            assert [500] == [product['price'] for product in self.get_products(self.test_path)]
+
+        assert [600] == [product['price'] for product in self.get_products(self.test_path)]
+
+    def test_get_list_of_product_by_category_after_feature_deleted(self):
+        """
+        Case: delete a feature of a product after the list of products and the product are cached.
+        Expect: the product without the feature in the list and the item at once, with a new update time.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_product.features.add(self.test_features)
+        test_product_path = f'/api/v1/product/{self.test_product.id}/'
+        assert [[self.test_features.id]] == [
+            [feature['id'] for feature in product['features']] for product in self.get_products(self.test_path)
+        ]
+        assert 1 == len(self.client.get(path=test_product_path).json()['features'])
+        update_time = Product.objects.get(id=self.test_product.id).update_time
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_features.delete()
+
+        assert [[]] == [product['features'] for product in self.get_products(self.test_path)]
+        assert [] == self.client.get(path=test_product_path).json()['features']
+        assert update_time < Product.objects.get(id=self.test_product.id).update_time
+
+    def test_get_list_of_product_by_category_after_rating_changed(self):
+        """
+        Case: like a product and remove the like after the list of products sorted by popularity is cached.
+        Expect: the order of products follows the likes at once.
+        """
+        test_new_product = Product.objects.create(
+            title='title new test',
+            text=None,
+            price=800,
+            description='test description test',
+            category=self.test_category,
+        )
+        test_path = f'{self.test_path}?sort_by=popularity&sort_dict=desc'
+        assert [test_new_product.id, self.test_product.id] == [
+            product['id'] for product in self.get_products(test_path)
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductRating.create_or_update_rating(True, self.test_product.id, self.test_user)
+        assert [self.test_product.id, test_new_product.id] == [
+            product['id'] for product in self.get_products(test_path)
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductRating.delete_rating(True, self.test_product.id, self.test_user)
+        assert [test_new_product.id, self.test_product.id] == [
+            product['id'] for product in self.get_products(test_path)
+        ]
+
+    def test_get_list_of_category_after_category_created(self):
+        """
+        Case: create a category after the list of categories is cached.
+        Expect: the new category is in the list of categories at once.
+        """
+        response = self.client.get(path='/api/v1/category/')
+        assert HttpStatusCode.OK.value == response.status_code
+        assert 2 == response.json()['count']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(title='Test New Category')
+
+        response = self.client.get(path='/api/v1/category/')
+        assert HttpStatusCode.OK.value == response.status_code
+        assert ['Test Category', 'Test Other Category', 'Test New Category'] == [
+            category['title'] for category in response.json()['results']
+        ]
+
+    def test_get_list_of_product_by_category_by_authenticated_user_from_cache(self):
+        """
+        Case: get the list of products by an anonymous user, then by an authenticated user
+        with the filter and the sort parameters in another order and with the default sort.
+        Expect: the authenticated user gets the response cached for the anonymous user without queries of products.
+        """
+        test_other_features = Features.objects.create(
+            key='Test key',
+            value='Test other value'
+        )
+        self.test_product.features.add(self.test_features)
+        expected_products = self.get_products(
+            f'{self.test_path}?filter={test_other_features.id}&filter={self.test_features.id}&sort_dict=asc')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                path=f'{self.test_path}?sort_by=title&filter={self.test_features.id}&filter={test_other_features.id}',
+                headers={'Authorization': 'Bearer ' + str(RefreshToken.for_user(self.test_user).access_token)},
+            )
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert expected_products == response.json()['results']
+        assert not [query for query in queries.captured_queries if 'product_product' in query['sql']]
+
+    def test_get_list_of_product_by_category_with_invalid_token_from_cache(self):
+        """
+        Case: get the cached list of products with an invalid access token.
+        Expect: the request isn't answered from the cache, but rejected.
+        """
+        self.get_products(self.test_path)
+
+        response = self.client.get(path=self.test_path, headers={'Authorization': 'Bearer invalid'})
+
+        assert HttpStatusCode.UNAUTHORIZED.value == response.status_code
+
+    def test_get_product_from_cache_with_rating_from_user(self):
+        """
+        Case: get a product by an anonymous user, then by an authenticated user who liked it.
+        Expect: the cached product is returned with the rating of the user, selected with the values
+        validating the product.
+        """
+        test_path = f'/api/v1/product/{self.test_product.id}/'
+        anonymous_response = self.client.get(path=test_path)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductRating.create_or_update_rating(True, self.test_product.id, self.test_user)
+        self.client.get(path=test_path)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                path=test_path,
+                headers={'Authorization': 'Bearer ' + str(RefreshToken.for_user(self.test_user).access_token)},
+            )
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert {
+            **anonymous_response.json(),
+            'rating': {'like_count': 1, 'dislike_count': 0, 'current_user_rating': 'like'},
+        } == response.json()
+        assert None is self.client.get(path=test_path).json()['rating']['current_user_rating']
+
+
+@override_settings(PRODUCT_CACHE_EARLY_REFRESH_BETA=0)
+class VersionedPageCacheStampedeTestCase(CatalogTransactionTestCase):
+    """
+    Computing of cached responses by one of concurrent requests test case implementation.
+    """
+
+    clients_count = 200
+
+    def setUp(self):
+        """
+        Set up data for tests.
+        """
+        super().setUp()
+        self.test_category = Category.objects.create(
+            title='Test Category'
+        )
+        Product.objects.create(
+            title='title test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=self.test_category,
+        )
+        self.test_path = f'/api/v1/category/{self.test_category.id}/'
+        self.computing_count = 0
+        self.computing_count_lock = threading.Lock()
+
+    def get_list_by_concurrent_clients(self):
+        """Get the list of products by concurrent clients starting at once, counting the slowed computing"""
+        barrier = threading.Barrier(self.clients_count)
+        get_list_of_product = Product.get_filtered_and_sorted_list_of_product_by_category
+
+        def get_list_of_product_slowly(*args):
+            with self.computing_count_lock:
+                self.computing_count += 1
+            time.sleep(0.5)
+
+            return get_list_of_product(*args)
+
+        def get_list():
+            barrier.wait()
+            try:
+                response = Client().get(path=self.test_path)
+                return response.status_code, response.json()
+            finally:
+                connection.close()
+
+        with mock.patch.object(Product, 'get_filtered_and_sorted_list_of_product_by_category',
+                               get_list_of_product_slowly):
+            with ThreadPoolExecutor(max_workers=self.clients_count) as executor:
+                futures = [executor.submit(get_list) for _ in range(self.clients_count)]
+                return [future.result() for future in futures]
+
+    def test_get_list_of_product_by_category_by_concurrent_clients_without_cached_response(self):
+        """
+        Case: get the list of products without a cached response by 200 concurrent clients.
+        Expect: the list of products is computed once, every client gets it.
+        """
+        responses = self.get_list_by_concurrent_clients()
+
+        assert 1 == self.computing_count
+        assert {HttpStatusCode.OK.value} == {status_code for status_code, _ in responses}
+        assert [['title test']] == list({
+            str(result): [product['title'] for product in result['results']] for _, result in responses
+        }.values())
+
+    def test_get_list_of_product_by_category_by_concurrent_clients_with_expired_response(self):
+        """
+        Case: get the list of products with an expired cached response by 200 concurrent clients.
+        Expect: the list of products is computed once, the other clients get the expired response.
+        """
+        with override_settings(PRODUCT_CACHE_TIMEOUT=0):
+            expected_result = self.client.get(path=self.test_path).json()
+
+        responses = self.get_list_by_concurrent_clients()
+
+        assert 1 == self.computing_count
+        assert [(HttpStatusCode.OK.value, expected_result)] * self.clients_count == responses
@@ -0,0 +1,194 @@
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from django.test import SimpleTestCase, override_settings
+
+from product.cache_backends import LockedFileBasedCache, TwoLevelCache
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'test_shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test_shared',
+    },
+})
+class TwoLevelCacheTestCase(SimpleTestCase):
+    """
+    Cache with a local LRU in front of a shared cache test case implementation.
+    """
+
+    def setUp(self):
+        """
+        Set up data for tests.
+        """
+        self.test_cache = TwoLevelCache('test_shared', {'OPTIONS': {'LOCAL_MAX_ENTRIES': 2, 'LOCAL_TIMEOUT': 10}})
+        self.test_cache.clear()
+        self.test_cache.reset_stats()
+        self.test_shared_cache = caches['test_shared']
+
+    def test_get_from_local_and_shared_level(self):
+        """
+        Case: get a key set by another process twice and a missing key.
+        Expect: the first get hits the shared level, the second one the local level, the missing key is a miss.
+        """
+        self.test_shared_cache.set('test_key', 'test value')
+
+        assert 'test value' == self.test_cache.get('test_key')
+        self.test_shared_cache.delete('test_key')
+        assert 'test value' == self.test_cache.get('test_key')
+        assert self.test_cache.get('test_missing_key') is None
+
+        assert {
+            'local_hits': 1, 'shared_hits': 1, 'misses': 1, 'evictions': 0, 'local_entries': 1,
+        } == self.test_cache.get_stats()
+
+    def test_evict_least_recently_used(self):
+        """
+        Case: set three keys with two local entries, reading the first key before setting the third one.
+        Expect: the second key is evicted from the local level, but is still in the shared level.
+        """
+        self.test_cache.set('test_key_1', 1)
+        self.test_cache.set('test_key_2', 2)
+        self.test_cache.get('test_key_1')
+        self.test_cache.set('test_key_3', 3)
+
+        assert 1 == self.test_cache.get_stats()['evictions']
+        assert 2 == self.test_cache.get('test_key_2')
+        assert 1 == self.test_cache.get_stats()['shared_hits']
+
+    def test_local_entry_expired(self):
+        """
+        Case: get a key changed in the shared level after the local timeout.
+        Expect: the local entry is expired and the new value is read from the shared level.
+        """
+        self.test_cache.set('test_key', 'test value')
+        self.test_shared_cache.set('test_key', 'test new value')
+
+        assert 'test value' == self.test_cache.get('test_key')
+        with mock.patch('product.cache_backends.time.monotonic', return_value=10 ** 9):
+            assert 'test new value' == self.test_cache.get('test_key')
+
+    def test_local_entry_dropped_on_write(self):
+        """
+        Case: delete, increment and add keys cached locally.
+        Expect: the local entries are dropped with the writes to the shared level.
+        """
+        self.test_cache.set('test_key', 'test value')
+        self.test_cache.delete('test_key')
+        assert self.test_cache.get('test_key') is None
+
+        self.test_cache.set('test_counter', 1)
+        assert 2 == self.test_cache.incr('test_counter')
+        assert 2 == self.test_cache.get('test_counter')
+
+        self.test_cache.set('test_key', 'test value')
+        self.test_shared_cache.set('test_key', 'test new value')
+        assert not self.test_cache.add('test_key', 'test other value')
+        assert 'test new value' == self.test_cache.get('test_key')
+
+
+class LockedFileBasedCacheTestCase(SimpleTestCase):
+    """
+    File-based cache with atomic add and incr test case implementation.
+    """
+
+    def setUp(self):
+        """
+        Set up data for tests.
+        """
+        self.test_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.test_directory.cleanup)
+        self.test_cache = LockedFileBasedCache(self.test_directory.name, {})
+
+    def run_in_threads(self, target, threads_count=8):
+        threads = [threading.Thread(target=target) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_incr_at_once(self):
+        """
+        Case: increment a key 50 times in each of 8 threads at once.
+        Expect: no increment is lost, the key keeps having no expiration.
+        """
+        self.test_cache.set('test_counter', 0, timeout=None)
+
+        def increment():
+            for _ in range(50):
+                self.test_cache.incr('test_counter')
+
+        self.run_in_threads(increment)
+
+        assert 400 == self.test_cache.get('test_counter')
+        with mock.patch('django.core.cache.backends.filebased.time.time', return_value=10 ** 12):
+            assert 400 == self.test_cache.get('test_counter')
+
+    def test_incr_missing_key(self):
+        """
+        Case: increment a missing key and an expired key.
+        Expect: ValueError is raised for both keys.
+        """
+        self.test_cache.set('test_expired_counter', 1, timeout=-1)
+
+        for key in ('test_missing_counter', 'test_expired_counter'):
+            with self.assertRaises(ValueError):
+                self.test_cache.incr(key)
+
+    def test_add_at_once(self):
+        """
+        Case: add the same key in 8 threads at once.
+        Expect: only one thread adds the key.
+        """
+        added = []
+        barrier = threading.Barrier(8)
+
+        def add():
+            barrier.wait()
+            added.append(self.test_cache.add('test_lock', True))
+
+        self.run_in_threads(add)
+
+        assert 1 == sum(added)
+
+
+class AtomicCachesCheckTestCase(SimpleTestCase):
+    """
+    Check of the atomic caches of versions and locks test case implementation.
+    """
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.gettempdir(),
+        },
+        'catalog': {
+            'BACKEND': 'product.cache_backends.TwoLevelCache',
+            'LOCATION': 'default',
+        },
+    })
+    def test_check_non_atomic_caches(self):
+        """
+        Case: check the settings with the versions and the responses in a file-based cache.
+        Expect: the check fails for both caches.
+        """
+        with self.assertRaisesMessage(SystemCheckError, 'product.E002') as error:
+            call_command('check', stdout=StringIO())
+
+        assert 2 == str(error.exception).count('product.E002')
+
+    def test_check_atomic_caches(self):
+        """
+        Case: check the settings of the tests with the versions and the responses in the local memory cache.
+        Expect: the check passes.
+        """
+        call_command('check', stdout=StringIO())
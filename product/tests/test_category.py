@@ -1,21 +1,20 @@
-from django.test import TransactionTestCase
 from http import HTTPStatus as HttpStatusCode
 
 from product.models import Category
+from product.tests.base import CatalogTestCase
 
 
-class CategoryModelViewGetMethodTestCase(TransactionTestCase):
+class CategoryModelViewGetMethodTestCase(CatalogTestCase):
     """
    Category collection view get method test case implementation.
    """
 
-    reset_sequences = True
-
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
         Set up data for tests.
         """
-        self.test_category = Category.objects.create(
+        cls.test_category = Category.objects.create(
             title='Test Category'
         )
 
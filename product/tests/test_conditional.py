@@ -0,0 +1,183 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from http import HTTPStatus as HttpStatusCode
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from product.models import Category, Features, Product, ProductRating
+from product.tests.base import CatalogTestCase
+
+
+class ConditionalGETTestCase(CatalogTestCase):
+    """
+    Conditional get of products, lists of products and categories test case implementation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_category = Category.objects.create(
+            title='Test Category'
+        )
+        cls.test_user = User.objects.create(
+            username='test_user',
+            password='test_password'
+        )
+        cls.test_product = Product.objects.create(
+            title='title test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=cls.test_category,
+        )
+        cls.test_product_path = f'/api/v1/product/{cls.test_product.id}/'
+        cls.test_authorization = 'Bearer ' + str(RefreshToken.for_user(cls.test_user).access_token)
+
+    def test_get_product_not_modified(self):
+        """
+        Case: get a product with the ETag and the last modified time of the previous response.
+        Expect: 304 without the product after one query.
+        """
+        response = self.client.get(path=self.test_product_path)
+        assert HttpStatusCode.OK.value == response.status_code
+
+        with self.assertNumQueries(1):
+            not_modified_response = self.client.get(
+                path=self.test_product_path, headers={'If-None-Match': response.headers['ETag']})
+        modified_since_response = self.client.get(
+            path=self.test_product_path, headers={'If-Modified-Since': response.headers['Last-Modified']})
+
+        assert HttpStatusCode.NOT_MODIFIED.value == not_modified_response.status_code
+        assert b'' == not_modified_response.content
+        assert HttpStatusCode.NOT_MODIFIED.value == modified_since_response.status_code
+
+    def test_get_product_modified_since_feature_and_category_renamed(self):
+        """
+        Case: get a product with the last modified time of the previous response after a feature of the product
+        and the category of the product are renamed.
+        Expect: the renamed feature and category with a later last modified time.
+        """
+        test_features = Features.objects.create(key='Test key', value='Test value')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_product.features.add(test_features)
+
+
+        for instance, field_name, new_value in (
+                (test_features, 'value', 'Test new value'),
+                (self.test_category, 'title', 'Test New Category'),
+        ):
+            Product.objects.filter(id=self.test_product.id).update(update_time=timezone.now() - timedelta(minutes=1))
+            response = self.client.get(path=self.test_product_path)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                setattr(instance, field_name, new_value)
+                instance.save()
+            modified_response = self.client.get(
+                path=self.test_product_path, headers={'If-Modified-Since': response.headers['Last-Modified']})
+
+            assert HttpStatusCode.OK.value == modified_response.status_code
+            assert modified_response.headers['Last-Modified'] != response.headers['Last-Modified']
+
+        assert ['Test new value'] == [feature['value'] for feature in modified_response.json()['features']]
+        assert 'Test New Category' == modified_response.json()['category']
+
+    def test_get_product_modified_by_feature_changed(self):
+        """
+        Case: get a product with the ETag of the previous response after a feature of the product changed.
+        Expect: the product with the changed feature.
+        """
+        test_features = Features.objects.create(key='Test key', value='Test value')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_product.features.add(test_features)
+        response = self.client.get(path=self.test_product_path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            test_features.value = 'Test changed value'
+            test_features.save()
+        modified_response = self.client.get(
+            path=self.test_product_path, headers={'If-None-Match': response.headers['ETag']})
+
+        assert HttpStatusCode.OK.value == modified_response.status_code
+        assert ['Test changed value'] == [feature['value'] for feature in modified_response.json()['features']]
+
+    def test_get_product_modified_by_rating(self):
+        """
+        Case: get a product with the ETag of the previous response after the user liked the product.
+        Expect: the product with a new ETag for the user and another user.
+        """
+        response = self.client.get(path=self.test_product_path, headers={'Authorization': self.test_authorization})
+        anonymous_response = self.client.get(path=self.test_product_path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductRating.create_or_update_rating(True, self.test_product.id, self.test_user)
+
+        modified_response = self.client.get(
+            path=self.test_product_path,
+            headers={'Authorization': self.test_authorization, 'If-None-Match': response.headers['ETag']},
+        )
+        modified_anonymous_response = self.client.get(
+            path=self.test_product_path, headers={'If-None-Match': anonymous_response.headers['ETag']})
+
+        assert HttpStatusCode.OK.value == modified_response.status_code
+        assert 'like' == modified_response.json()['rating']['current_user_rating']
+        assert HttpStatusCode.OK.value == modified_anonymous_response.status_code
+        assert 1 == modified_anonymous_response.json()['rating']['like_count']
+        assert response.headers['ETag'] != anonymous_response.headers['ETag']
+
+    def test_get_list_of_product_by_category_not_modified(self):
+        """
+        Case: get the list of products with the ETag of the previous response, before and after a product changed.
+        Expect: 304 without queries before the change, the changed list of products after it.
+        """
+        test_path = f'/api/v1/category/{self.test_category.id}/'
+        response = self.client.get(path=test_path)
+
+        with self.assertNumQueries(0):
+            not_modified_response = self.client.get(path=test_path, headers={'If-None-Match': response.headers['ETag']})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_product.price = 600
+            self.test_product.save()
+        modified_response = self.client.get(path=test_path, headers={'If-None-Match': response.headers['ETag']})
+
+        assert HttpStatusCode.NOT_MODIFIED.value == not_modified_response.status_code
+        assert HttpStatusCode.OK.value == modified_response.status_code
+        assert [600] == [product['price'] for product in modified_response.json()['results']]
+
+    def test_get_list_of_category_not_modified(self):
+        """
+        Case: get the list of categories with the ETag of the previous response, before and after a category is created.
+        Expect: 304 before the category is created, the list with the new category after it.
+        """
+        response = self.client.get(path='/api/v1/category/')
+        not_modified_response = self.client.get(
+            path='/api/v1/category/', headers={'If-None-Match': response.headers['ETag']})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(title='Test New Category')
+        modified_response = self.client.get(
+            path='/api/v1/category/', headers={'If-None-Match': response.headers['ETag']})
+
+        assert HttpStatusCode.NOT_MODIFIED.value == not_modified_response.status_code
+        assert HttpStatusCode.OK.value == modified_response.status_code
+        assert 2 == modified_response.json()['count']
+
+    def test_get_list_of_category_modified_by_category_deleted(self):
+        """
+        Case: get the list of categories with the ETag of the previous response after a category is deleted.
+        Expect: the list without the deleted category.
+        """
+        test_other_category = Category.objects.create(title='Test Other Category')
+        response = self.client.get(path='/api/v1/category/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            test_other_category.delete()
+        modified_response = self.client.get(
+            path='/api/v1/category/', headers={'If-None-Match': response.headers['ETag']})
+
+        assert HttpStatusCode.OK.value == modified_response.status_code
+        assert ['Test Category'] == [category['title'] for category in modified_response.json()['results']]
@@ -0,0 +1,77 @@
+import random
+
+from product.factories import (
+    PLACEHOLDER_IMAGE,
+    create_categories,
+    create_features,
+    create_products,
+    create_users,
+    get_placeholder_image,
+)
+from product.models import CategoryFacet, Product, ProductImage, ProductRating
+from product.tests.base import CatalogTestCase
+
+
+class FactoriesTestCase(CatalogTestCase):
+    """
+    Factories of catalog data test case implementation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_categories = create_categories(2)
+        cls.test_features_by_keys = create_features(3, 4)
+        cls.test_users = create_users(5)
+
+    def test_create_products(self):
+        """
+        Case: create products with features, ratings and images, with batches smaller than the rows.
+        Expect: products of both categories with a feature of every key, consistent counters, images and facets.
+        """
+        product_ids = create_products(
+            self.test_categories, 20, self.test_features_by_keys, self.test_users, max_ratings=5, max_images=2,
+            random_generator=random.Random(1), batch_size=7,
+        )
+
+        assert list(Product.objects.order_by('id').values_list('id', flat=True)) == product_ids
+        assert {10} == {
+            Product.objects.filter(category=category).count() for category in self.test_categories
+        }
+        assert 20 * 3 == Product.features.through.objects.count()
+        assert ProductRating.objects.exists()
+        assert not ProductRating.get_products_with_inconsistent_rating_counters().exists()
+        assert {PLACEHOLDER_IMAGE} == set(ProductImage.objects.values_list('image', flat=True))
+        assert 20 * 3 == sum(
+            CategoryFacet.objects.values_list('product_count', flat=True))
+
+    def test_create_products_after_existing_products(self):
+        """
+        Case: create products after a product created with the ORM, then create another product with the ORM.
+        Expect: the IDs of products continue the sequence without conflicts.
+        """
+        first_product = Product.objects.create(
+            title='title test', price=500, description='test description test', category=self.test_categories[0])
+
+        product_ids = create_products(self.test_categories, 3)
+        last_product = Product.objects.create(
+            title='title test 2', price=500, description='test description test', category=self.test_categories[0])
+
+        assert [first_product.id + 1, first_product.id + 2, first_product.id + 3] == product_ids
+        assert product_ids[-1] + 1 == last_product.id
+
+    def test_get_placeholder_image(self):
+        """
+        Case: upload a placeholder image as the image of a product.
+        Expect: the image is saved with its name.
+        """
+        product_id, = create_products(self.test_categories, 1)
+
+        product_image = ProductImage.objects.create(
+            title='test image', image=get_placeholder_image('test_placeholder.png'), product_id=product_id)
+
+        assert product_image.image.name.endswith('.png')
+        assert 0 < product_image.image.size
+        product_image.image.delete()
@@ -1,32 +1,33 @@
-from django.test import TransactionTestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from http import HTTPStatus as HttpStatusCode
 
-from product.models import Features, Category, Product
+from product.models import Features, Category, Product, CategoryFacet
+from product.tests.base import CatalogTestCase
 
 
-class FeaturesModelViewGETMethodTestCase(TransactionTestCase):
+class FeaturesModelViewGETMethodTestCase(CatalogTestCase):
 
-    reset_sequences = True
-
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
         Set up data for tests.
         """
-        self.test_features = Features.objects.create(
+        cls.test_features = Features.objects.create(
             key='Test key',
             value='Test value'
         )
-        self.test_category = Category.objects.create(
+        cls.test_category = Category.objects.create(
             title='Test title'
         )
-        self.test_product = Product.objects.create(
+        cls.test_product = Product.objects.create(
             title='title test',
             text=None,
             price=500,
             description='test description test',
-            category=self.test_category,
+            category=cls.test_category,
         )
-        self.test_product.features.add(self.test_features)
+        cls.test_product.features.add(cls.test_features)
 
     def test_get_unique_features_products_by_category(self):
         """
@@ -44,6 +45,7 @@ class FeaturesModelViewGETMethodTestCase(TransactionTestCase):
                         {
                             'value': self.test_features.value,
                             'id': self.test_features.id,
+                            'product_count': 1,
                         }
                     ]
                 },
@@ -67,8 +69,189 @@ class FeaturesModelViewGETMethodTestCase(TransactionTestCase):
         }
 
         response = self.client.get(
-            path=f'/api/v1/feature/category/{Category.objects.count()+1}/',
+            path=f'/api/v1/feature/category/{self.test_category.id + 1}/',
         )
 
         assert HttpStatusCode.NOT_FOUND.value == response.status_code
         assert expected_result == response.json()
+
+    def test_get_unique_features_products_by_category_with_invalid_filter(self):
+        """
+        Case: get list of unique features products by category and list of products with filters which aren't IDs.
+        Expect: bad request errors' messages.
+        """
+        expected_result = {
+            'detail': 'Bad request.'
+        }
+
+        for path in (f'/api/v1/feature/category/{self.test_category.id}/', f'/api/v1/category/{self.test_category.id}/'):
+            for filter_params in (['abc'], [str(self.test_features.id), '1.5'], [str(2 ** 63)]):
+                response = self.client.get(path=path, data={'filter': filter_params})
+
+                assert HttpStatusCode.BAD_REQUEST.value == response.status_code
+                assert expected_result == response.json()
+
+    def test_get_unique_features_products_by_category_in_one_query(self):
+        """
+        Case: get list of unique features products by category with several keys.
+        Expect: list of unique features products by category selected in one query.
+        """
+        self.test_product.features.add(Features.objects.create(key='Another key', value='Another value'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                path=f'/api/v1/feature/category/{self.test_category.id}/',
+            )
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert ['Another key', 'Test key'] == [facet['key'] for facet in response.json()['results']]
+
+    def test_get_unique_features_products_by_category_with_query_params(self):
+        """
+        Case: get list of unique features products by category with selected features.
+        Expect: options counting the products matching the selected features of the other keys.
+        """
+        test_features_red = Features.objects.create(key='color', value='red')
+        test_features_blue = Features.objects.create(key='color', value='blue')
+        test_features_big = Features.objects.create(key='size', value='big')
+        test_features_small = Features.objects.create(key='size', value='small')
+
+        for title, features in (
+                ('red big', (test_features_red, test_features_big)),
+                ('blue big', (test_features_blue, test_features_big)),
+                ('red small', (test_features_red, test_features_small)),
+        ):
+            Product.objects.create(
+                title=title,
+                text=None,
+                price=400,
+                description='test description test',
+                category=self.test_category,
+            ).features.add(*features)
+
+        expected_result = [
+            {
+                'key': 'Test key',
+                'options': [{'value': self.test_features.value, 'id': self.test_features.id, 'product_count': 0}],
+            },
+            {
+                'key': 'color',
+                'options': [
+                    {'value': 'blue', 'id': test_features_blue.id, 'product_count': 1},
+                    {'value': 'red', 'id': test_features_red.id, 'product_count': 1},
+                ],
+            },
+            {
+                'key': 'size',
+                'options': [
+                    {'value': 'big', 'id': test_features_big.id, 'product_count': 1},
+                    {'value': 'small', 'id': test_features_small.id, 'product_count': 1},
+                ],
+            },
+        ]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                path=f'/api/v1/feature/category/{self.test_category.id}/',
+                data={'filter': [test_features_red.id, test_features_big.id]},
+            )
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert expected_result == response.json()['results']
+
+
+class CategoryFacetRefreshTestCase(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_features = Features.objects.create(
+            key='Test key',
+            value='Test value'
+        )
+        cls.test_category = Category.objects.create(
+            title='Test title'
+        )
+        cls.test_another_category = Category.objects.create(
+            title='Test another title'
+        )
+        cls.test_products = [
+            Product.objects.create(
+                title=f'title test{number}',
+                text=None,
+                price=500,
+                description='test description test',
+                category=cls.test_category,
+            )
+            for number in range(3)
+        ]
+
+    def get_product_count(self, category):
+        """Get the count of products with the test feature in the facets of the category"""
+        return CategoryFacet.objects.filter(
+            category=category,
+            feature=self.test_features
+        ).values_list('product_count', flat=True).first()
+
+    def test_refresh_facets_on_features_of_product_changed(self):
+        """
+        Case: add the feature to products and remove it from products.
+        Expect: the count of products in the facet follows the changes.
+        """
+        for test_product in self.test_products:
+            test_product.features.add(self.test_features)
+
+        assert self.get_product_count(self.test_category) == 3
+
+        self.test_products[0].features.remove(self.test_features)
+        self.test_products[1].features.clear()
+
+        assert self.get_product_count(self.test_category) == 1
+
+        self.test_features.product_set.add(*self.test_products[:2])
+
+        assert self.get_product_count(self.test_category) == 3
+
+    def test_refresh_facets_on_product_moved_and_deleted(self):
+        """
+        Case: move a product with the feature to another category, then delete it.
+        Expect: the counts of products in the facets of both categories follow the changes.
+        """
+        for test_product in self.test_products:
+            test_product.features.add(self.test_features)
+
+        self.test_products[0].category = self.test_another_category
+        self.test_products[0].save()
+
+        assert self.get_product_count(self.test_category) == 2
+        assert self.get_product_count(self.test_another_category) == 1
+
+        self.test_products[0].delete()
+
+        assert self.get_product_count(self.test_another_category) is None
+
+
+    def test_refresh_facets_on_products_deleted_at_once(self):
+        """
+        Case: delete products with the feature by a queryset, remove the feature from a product without it,
+        then delete the category of the last product.
+        Expect: the count of products in the facet follows the changes, the features of the products deleted at once
+        aren't read product by product.
+        """
+        for test_product in self.test_products:
+            test_product.features.add(self.test_features)
+        self.test_products[0].features.add(Features.objects.create(key='Test other key', value='Test other value'))
+
+        with CaptureQueriesContext(connection) as queries:
+            Product.objects.filter(id__in=[self.test_products[0].id, self.test_products[1].id]).delete()
+
+        assert self.get_product_count(self.test_category) == 1
+        assert not CategoryFacet.objects.filter(key='Test other key').exists()
+        assert 1 == len([query for query in queries if query['sql'].startswith('SELECT "product_features"')])
+
+        self.test_products[0].features.remove(self.test_features)
+        self.test_category.delete()
+
+        assert self.get_product_count(self.test_category) is None
@@ -0,0 +1,73 @@
+import json
+
+from django.test import override_settings
+from http import HTTPStatus as HttpStatusCode
+
+from product.models import Category, Product
+from product.tests.base import CatalogTestCase
+
+
+class RequestMetricsMiddlewareTestCase(CatalogTestCase):
+    """
+    Query-count and latency metrics of requests test case implementation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_category = Category.objects.create(
+            title='Test Category'
+        )
+        cls.test_product = Product.objects.create(
+            title='title test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=cls.test_category,
+        )
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=True)
+    def test_server_timing_of_product(self):
+        """
+        Case: get a product.
+        Expect: the Server-Timing header with the number of queries, the serializer, render and total time.
+        """
+        response = self.client.get(path=f'/api/v1/product/{self.test_product.id}/')
+
+        assert HttpStatusCode.OK.value == response.status_code
+        server_timing = response.headers['Server-Timing']
+        assert server_timing.startswith('db;desc="4 queries";dur=')
+        assert 'serializer;dur=' in server_timing
+        assert 'render;dur=' in server_timing
+        assert 'total;dur=' in server_timing
+
+    def test_log_metrics_of_request(self):
+        """
+        Case: get the list of products of a category.
+        Expect: a JSON line with the route, the number of queries and the size of the response, with INFO.
+        """
+        with self.assertLogs('performance', level='INFO') as logs:
+            response = self.client.get(path=f'/api/v1/category/{self.test_category.id}/')
+
+        metrics = json.loads(logs.records[0].getMessage())
+        assert 'INFO' == logs.records[0].levelname
+        assert 'api/v1/category/<int:category_id>/' == metrics['route']
+        assert HttpStatusCode.OK.value == metrics['status']
+        assert 0 < metrics['queries']
+        assert len(response.content) == metrics['response_size']
+        assert [] == metrics['exceeded']
+
+    @override_settings(REQUEST_METRICS_MAX_QUERIES=1, REQUEST_METRICS_SERVER_TIMING=False)
+    def test_log_request_exceeding_threshold(self):
+        """
+        Case: get a product with more queries than the threshold, without the Server-Timing header.
+        Expect: the metrics are logged with WARNING and the exceeded threshold, the response has no Server-Timing.
+        """
+        with self.assertLogs('performance', level='INFO') as logs:
+            response = self.client.get(path=f'/api/v1/product/{self.test_product.id}/')
+
+        assert 'WARNING' == logs.records[0].levelname
+        assert ['queries'] == json.loads(logs.records[0].getMessage())['exceeded']
+        assert 'Server-Timing' not in response.headers
@@ -0,0 +1,141 @@
+import base64
+import json
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from http import HTTPStatus as HttpStatusCode
+
+from product.models import Category, Product
+from product.tests.base import CatalogTestCase
+
+
+class ProductListPaginationTestCase(CatalogTestCase):
+    """
+    Keyset pagination of the list of products by category test case implementation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_category = Category.objects.create(
+            title='Test Category'
+        )
+        cls.test_products = [
+            Product.objects.create(
+                title=f'title test{number}',
+                text=None,
+                price=100 * (number // 2),
+                description='test description test',
+                category=cls.test_category,
+            )
+            for number in range(7)
+        ]
+
+    def get_all_pages(self, path, direction='next'):
+        """Get the pages of products following the links of the direction"""
+        pages = []
+        while path:
+            response = self.client.get(path=path)
+            assert HttpStatusCode.OK.value == response.status_code
+            pages.append(response.json())
+            path = response.json()[direction]
+
+        return pages
+
+    def test_get_list_of_product_by_category_by_cursor(self):
+        """
+        Case: get all pages of products sorted by a field with repeated values by cursor, and go back.
+        Expect: every product once in the order of the field and the id, the same pages backwards.
+        """
+        expected_titles = [
+            product.title for product in sorted(self.test_products, key=lambda product: (-product.price, -product.id))
+        ]
+
+        pages = self.get_all_pages(
+            f'/api/v1/category/{self.test_category.id}/?cursor=&limit=2&sort_by=price&sort_dict=desc')
+        previous_pages = self.get_all_pages(pages[-1]['previous'], 'previous')
+
+        assert expected_titles == [product['title'] for page in pages for product in page['results']]
+        assert [page['results'] for page in reversed(pages[:-1])] == [page['results'] for page in previous_pages]
+        assert pages[0]['previous'] is None
+        assert pages[0]['count'] == len(self.test_products)
+
+    @override_settings(PRODUCT_LIST_COUNT='none')
+    def test_get_list_of_product_by_category_by_cursor_without_count(self):
+        """
+        Case: get a page of products by cursor with the count of products skipped.
+        Expect: page of products without the count, no count query on products.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path=f'/api/v1/category/{self.test_category.id}/?cursor=&limit=3')
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert not [query for query in queries if 'COUNT(*)' in query['sql'] and 'product_product' in query['sql']]
+        assert response.json()['count'] is None
+        assert len(response.json()['results']) == 3
+
+    def test_get_list_of_product_by_category_by_invalid_cursor(self):
+        """
+        Case: get a page of products with an invalid cursor.
+        Expect: not found errors' messages.
+        """
+        expected_result = {
+            'detail': 'Invalid cursor'
+        }
+
+        response = self.client.get(path=f'/api/v1/category/{self.test_category.id}/?cursor=invalid')
+
+        assert HttpStatusCode.NOT_FOUND.value == response.status_code
+        assert expected_result == response.json()
+
+    def test_get_list_of_product_by_category_by_cursor_with_values_of_wrong_types(self):
+        """
+        Case: get a page of products with well-formed cursors having values of wrong types for the sort field,
+        the id or the direction, and with an id out of the range of ids.
+        Expect: not found errors' messages.
+        """
+        for sort_by, position in (
+                ('title', {'value': 'a', 'id': 'x', 'reverse': False}),
+                ('price', {'value': 'title test', 'id': 1, 'reverse': False}),
+                ('created_time', {'value': 'yesterday', 'id': 1, 'reverse': False}),
+                ('price', {'value': 500, 'id': 2 ** 70, 'reverse': False}),
+                ('price', {'value': 500, 'id': 1, 'reverse': 'no'}),
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+            response = self.client.get(
+                path=f'/api/v1/category/{self.test_category.id}/', data={'cursor': cursor, 'sort_by': sort_by})
+
+            assert HttpStatusCode.NOT_FOUND.value == response.status_code
+            assert {'detail': 'Invalid cursor'} == response.json()
+
+    def test_get_list_of_product_by_category_by_cursor_uses_index_condition(self):
+        """
+        Case: explain the query of the next page of products by cursor for every sort key and direction.
+        Expect: the index scan starts at the cursor, with the sort field in the index condition and no filter.
+        """
+        for sort_by, sort_field in Product.SORT_FIELDS.items():
+            for sort_dict in ('asc', 'desc'):
+                response = self.client.get(
+                    path=f'/api/v1/category/{self.test_category.id}/',
+                    data={'cursor': '', 'limit': 2, 'sort_by': sort_by, 'sort_dict': sort_dict},
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(path=response.json()['next'])
+                page_sql = next(query['sql'] for query in queries if '"id") ' in query['sql'])
+
+                with connection.cursor() as cursor:
+                    cursor.execute('SET enable_seqscan = off')
+                    try:
+                        cursor.execute(f'EXPLAIN {page_sql}')
+                        plan = [row[0] for row in cursor.fetchall()]
+                    finally:
+                        cursor.execute('RESET enable_seqscan')
+
+                index_conditions = [line for line in plan if 'Index Cond' in line and 'category_id' in line]
+                assert [f'ROW({sort_field}' in line.replace('(title)::text', 'title')
+                        for line in index_conditions] == [True], (sort_by, plan)
+                assert not any('Filter:' in line for line in plan), (sort_by, plan)
@@ -1,48 +1,50 @@
 from django.contrib.auth.models import User
-from django.core.files import File
-from django.test import TransactionTestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from http import HTTPStatus as HttpStatusCode
 
+from rest_framework.renderers import JSONRenderer
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from product.factories import get_placeholder_image
 from product.models import Category, Product, Features, ProductRating, ProductImage
+from product.serializer import ProductListSerializer
+from product.tests.base import CatalogTestCase
 
 
-class ProductModelViewGETMethodTestCase(TransactionTestCase):
+class ProductModelViewGETMethodTestCase(CatalogTestCase):
     """
     Product collection view get method test case implementation.
     """
 
-    reset_sequences = True
-
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
         Set up data for tests.
         """
-        self.test_category = Category.objects.create(
+        cls.test_category = Category.objects.create(
             title='Test Category'
         )
-        self.test_features = Features.objects.create(
+        cls.test_features = Features.objects.create(
             key='Test key',
             value='Test value'
         )
-        self.test_product_rating = ProductRating.objects
-        self.test_user = User.objects.create(
+        cls.test_user = User.objects.create(
             username='test_user',
             password='test_password'
         )
-        self.test_product = Product.objects.create(
+        cls.test_product = Product.objects.create(
             title='title test',
             text=None,
             price=500,
             description='test description test',
-            category=self.test_category,
+            category=cls.test_category,
         )
-        self.test_product.features.add(self.test_features)
-        self.test_product_image = ProductImage.objects.create(
+        cls.test_product.features.add(cls.test_features)
+        cls.test_product_image = ProductImage.objects.create(
             title='test',
-            image=File(open('test_image1.png', 'rb')),
-            product=self.test_product
+            image=get_placeholder_image('test_image1.png'),
+            product=cls.test_product
         )
 
     def get_main_fields_for_expected_result_product(self):
@@ -59,7 +61,13 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
                 'value': self.test_features.value
             }],
             'media': [
-                f'/media/{self.test_product_image.image}'
+                {
+                    'src': f'/media/{self.test_product_image.image}',
+                    'srcset': {
+                        'webp': f'/media/image/product_images/{self.test_category.id}/test_image1-1w.webp 1w',
+                        'jpeg': f'/media/image/product_images/{self.test_category.id}/test_image1-1w.jpg 1w',
+                    },
+                },
             ]
         }
 
@@ -93,12 +101,41 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
         }
 
         response = self.client.get(
-            path='/api/v1/category/1/',
+            path=f'/api/v1/category/{self.test_category.id}/',
         )
 
         assert HttpStatusCode.OK.value == response.status_code
         assert expected_result == response.json()
 
+    def test_get_list_of_product_by_category_same_as_serializer(self):
+        """
+        Case: get list of product by category with products without features and images and with unicode titles.
+        Expect: the same bytes as the products serialized by the serializer and rendered by the JSON renderer.
+        """
+        for number in range(2, 4):
+            Product.objects.create(
+                title=f'назва test{number}\u2028',
+                text=None,
+                price=500 * number,
+                description='test description test',
+                category=self.test_category,
+            )
+        products_list = Product.get_list_with_category_features_and_images(
+            Product.objects.filter(category=self.test_category).order_by('title', 'id'))
+
+        response = self.client.get(
+            path=f'/api/v1/category/{self.test_category.id}/',
+            headers={'Accept': 'application/json'},
+        )
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert JSONRenderer().render({
+            'count': 3,
+            'next': None,
+            'previous': None,
+            'results': ProductListSerializer(products_list, many=True).data,
+        }) == response.content
+
     def test_get_list_of_product_by_category_not_found(self):
         """
         Case: get list of product by category with category id out of scope
@@ -109,7 +146,7 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
         }
 
         response = self.client.get(
-            path=f'/api/v1/category/{Category.objects.count()+1}/',
+            path=f'/api/v1/category/{self.test_category.id + 1}/',
         )
 
         assert HttpStatusCode.NOT_FOUND.value == response.status_code
@@ -146,7 +183,7 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
             )
         }
 
-        ProductRating.objects.create(product=self.test_product, user=self.test_user, grade=True)
+        ProductRating.create_or_update_rating(True, self.test_product.id, self.test_user)
 
         response = self.client.get(
             path=f'/api/v1/product/{self.test_product.id}/',
@@ -169,7 +206,7 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
                 )
             }
 
-        ProductRating.objects.create(product=self.test_product, user=self.test_user, grade=False)
+        ProductRating.create_or_update_rating(False, self.test_product.id, self.test_user)
 
         response = self.client.get(
             path=f'/api/v1/product/{self.test_product.id}/',
@@ -179,6 +216,33 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
         assert HttpStatusCode.OK.value == response.status_code
         assert expected_result == response.json()
 
+    def test_get_product_with_rating_number_of_queries(self):
+        """
+        Case: get product with likes and dislikes from several users.
+        Expect: the values validating the cached product, the product with its rating, features and images
+        are selected in four queries.
+        """
+        for number in range(3):
+            ProductRating.create_or_update_rating(
+                bool(number % 2),
+                self.test_product.id,
+                User.objects.create(username=f'test_user{number}', password='test_password'),
+            )
+
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                path=f'/api/v1/product/{self.test_product.id}/',
+            )
+
+        expected_rating = {
+            'like_count': 1,
+            'dislike_count': 2,
+            'current_user_rating': None,
+        }
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert expected_rating == response.json()['rating']
+
     def test_get_product_not_found(self):
         """
         Case: get product with product id out of scope
@@ -189,7 +253,7 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
         }
 
         response = self.client.get(
-            path=f'/api/v1/product/{Product.objects.count()+1}/',
+            path=f'/api/v1/product/{self.test_product.id + 1}/',
         )
 
         assert HttpStatusCode.NOT_FOUND.value == response.status_code
@@ -209,24 +273,25 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
             category=self.test_category,
         )
 
-        test_features_in_product.features.add(Features.objects.create(
+        test_features = Features.objects.create(
             key='Test key 2',
             value='Test value 2'
-        ))
+        )
+        test_features_in_product.features.add(test_features)
         expected_result = {
             'count': 1,
             'next': None,
             'previous': None,
             'results': [
                 {
-                    'id': 2,
+                    'id': test_features_in_product.id,
                     'title': 'title test2',
                     'price': 400,
                     'category': 'Test Category',
-                    'category_id': 1,
+                    'category_id': self.test_category.id,
                     'features': [
                         {
-                            'id': 2,
+                            'id': test_features.id,
                             'key': 'Test key 2',
                             'value': 'Test value 2'
                         }
@@ -237,17 +302,141 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
         }
 
         response = self.client.get(
-            path=f'/api/v1/category/{self.test_category.id}/?filter=2',
+            path=f'/api/v1/category/{self.test_category.id}/?filter={test_features.id}',
         )
 
         assert HttpStatusCode.OK.value == response.status_code
         assert expected_result == response.json()
 
-    def tearDown(self):
+    def test_get_product_with_query_params_of_several_keys(self):
+        """
+        Case: get list product with several features of the same key and of different keys.
+        Expect: list product having any of the features of every key.
+        """
+        test_features_red = Features.objects.create(key='color', value='red')
+        test_features_blue = Features.objects.create(key='color', value='blue')
+        test_features_big = Features.objects.create(key='size', value='big')
+        test_features_small = Features.objects.create(key='size', value='small')
+
+        for title, features in (
+                ('red big', (test_features_red, test_features_big)),
+                ('blue big', (test_features_blue, test_features_big)),
+                ('red small', (test_features_red, test_features_small)),
+        ):
+            Product.objects.create(
+                title=title,
+                text=None,
+                price=400,
+                description='test description test',
+                category=self.test_category,
+            ).features.add(*features)
+
+        response = self.client.get(
+            path=f'/api/v1/category/{self.test_category.id}/',
+            data={'filter': [test_features_red.id, test_features_blue.id, test_features_big.id]},
+        )
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert ['blue big', 'red big'] == [product['title'] for product in response.json()['results']]
+
+    def test_get_list_of_product_by_category_number_of_queries_not_depends_on_limit(self):
+        """
+        Case: get list of product by category with a different page size.
+        Expect: the same number of queries for one product and for a page of products.
+        """
+        for number in range(2, 6):
+            test_product = Product.objects.create(
+                title=f'title test{number}',
+                text=None,
+                price=500,
+                description='test description test',
+                category=self.test_category,
+            )
+            test_product.features.add(self.test_features)
+            ProductImage.objects.create(
+                title=f'test{number}',
+                image=get_placeholder_image(f'test_image{number}.png'),
+                product=test_product
+            )
+
+        with CaptureQueriesContext(connection) as queries_for_one_product:
+            response_one_product = self.client.get(
+                path=f'/api/v1/category/{self.test_category.id}/?limit=1',
+            )
+
+        with CaptureQueriesContext(connection) as queries_for_page_of_products:
+            response_page_of_products = self.client.get(
+                path=f'/api/v1/category/{self.test_category.id}/?limit=5',
+            )
+
+        assert HttpStatusCode.OK.value == response_one_product.status_code
+        assert HttpStatusCode.OK.value == response_page_of_products.status_code
+        assert len(response_one_product.json()['results']) == 1
+        assert len(response_page_of_products.json()['results']) == 5
+        assert len(queries_for_one_product) == len(queries_for_page_of_products)
+
+    def create_test_products(self, count):
+        """Create products in the test category"""
+        return [
+            Product.objects.create(
+                title=f'title test{number}',
+                text=None,
+                price=500 * number,
+                description='test description test',
+                category=self.test_category,
+            )
+            for number in range(2, count + 2)
+        ]
+
+    def test_get_products_by_ids(self):
         """
-        Method to clean up resources after each test.
+        Case: get products by IDs in a custom order with a missing and a repeated ID, with a like from the user.
+        Expect: returned products in the order of the IDs, each once, the same as the product items.
         """
-        self.test_product_image.image.delete()
-        self.test_product_image.delete()
-        self.test_product.delete()
-        self.test_category.delete()
+        test_other_product, = self.create_test_products(1)
+        ProductRating.create_or_update_rating(True, self.test_product.id, self.test_user)
+        headers = {"Authorization": "Bearer " + str(RefreshToken.for_user(self.test_user).access_token)}
+
+        response = self.client.get(
+            path=f'/api/v1/product/?ids={test_other_product.id},{test_other_product.id + 1},{self.test_product.id},'
+                 f'{test_other_product.id}',
+            headers=headers,
+        )
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert [
+            self.client.get(path=f'/api/v1/product/{product_id}/', headers=headers).json()
+            for product_id in (test_other_product.id, self.test_product.id)
+        ] == response.json()
+        assert 'like' == response.json()[1]['rating']['current_user_rating']
+
+    def test_get_products_by_ids_number_of_queries_not_depends_on_ids(self):
+        """
+        Case: get one product and several products by IDs.
+        Expect: the products, their ratings, features and images are selected in three queries.
+        """
+        test_products = self.create_test_products(5)
+        for test_product in test_products:
+            test_product.features.add(self.test_features)
+
+        with self.assertNumQueries(3):
+            response_one_product = self.client.get(path=f'/api/v1/product/?ids={self.test_product.id}')
+
+        with self.assertNumQueries(3):
+            response_products = self.client.get(
+                path=f'/api/v1/product/?ids={",".join(str(product.id) for product in test_products)}')
+
+        assert HttpStatusCode.OK.value == response_one_product.status_code
+        assert HttpStatusCode.OK.value == response_products.status_code
+        assert [product.id for product in test_products] == [product['id'] for product in response_products.json()]
+
+    def test_get_products_by_ids_bad_request(self):
+        """
+        Case: get products by IDs which aren't integers, by too many IDs and without IDs.
+        Expect: 400 Bad request.
+        """
+        for ids in ('1,a', ','.join(str(product_id) for product_id in range(1, 102)), ''):
+            response = self.client.get(path=f'/api/v1/product/?ids={ids}')
+
+            assert HttpStatusCode.BAD_REQUEST.value == response.status_code
+            assert {'detail': 'Bad request.'} == response.json()
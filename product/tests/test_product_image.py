@@ -1,30 +1,29 @@
-import os
-
-from django.core.files import File
-from django.test import TransactionTestCase
-
+from product.factories import get_placeholder_image
 from product.models import Category, Product, ProductImage
+from product.tests.base import CatalogTestCase
 
 
-class ProductModelViewGETMethodTestCase(TransactionTestCase):
-    def setUp(self):
+class ProductModelViewGETMethodTestCase(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
         """
         Set up data for tests.
         """
-        self.test_category = Category.objects.create(
+        cls.test_category = Category.objects.create(
             title='Test category'
         )
-        self.test_product = Product.objects.create(
+        cls.test_product = Product.objects.create(
             title='Test product title',
             text=None,
             price=500,
             description='test product description',
-            category=self.test_category,
+            category=cls.test_category,
         )
-        self.test_product_image = ProductImage.objects.create(
+        cls.test_product_image = ProductImage.objects.create(
             title='test',
-            image=File(open('test_image1.png', 'rb')),
-            product=self.test_product
+            image=get_placeholder_image('test_image1.png'),
+            product=cls.test_product
         )
 
     def test_check_product_image_in_db(self):
@@ -48,7 +47,7 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
         """
         image2 = ProductImage.objects.create(
             title='test2',
-            image=File(open('test_image2.png', 'rb')),
+            image=get_placeholder_image('test_image2.png'),
             product=self.test_product
         )
 
@@ -57,14 +56,3 @@ class ProductModelViewGETMethodTestCase(TransactionTestCase):
         image2.delete()
 
         assert not ProductImage.objects.filter(pk=image2.id).exists()
-
-        os.remove(image2.image.path)
-
-    def tearDown(self):
-        """
-        Method to clean up resources after each test.
-        """
-        self.test_product_image.image.delete()
-        self.test_product_image.delete()
-        self.test_product.delete()
-        self.test_category.delete()
@@ -1,48 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
 from django.contrib.auth.models import User
-from django.test import TransactionTestCase
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import override_settings
 from http import HTTPStatus as HttpStatusCode
 
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from product.errors import NOT_FOUND
+from product import rating_buffer
 from product.models import Category, Product, ProductRating
+from product.rating_buffer import RatingBuffer, get_rating_buffer
+from product.tests.base import CatalogTestCase, CatalogTransactionTestCase
 
 
-class ProductRatingModelViewPOSTMethodTestCase(TransactionTestCase):
-
-    reset_sequences = True
+class ProductRatingModelViewPOSTMethodTestCase(CatalogTestCase):
 
-    def setUp(self):
-        self.test_category = Category.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_category = Category.objects.create(
             title='Test title'
         )
-        self.test_product = Product.objects.create(
+        cls.test_product = Product.objects.create(
             title='title test',
             text=None,
             price=500,
             description='test description test',
-            category=self.test_category,
+            category=cls.test_category,
         )
-        self.test_user = User.objects.create(
+        cls.test_user = User.objects.create(
             username='test_user',
             password='test_password'
         )
-        self.grade_like = True
-        self.grade_dislike = False
-        self.count_like = ProductRating.objects.filter(
-            product_id=self.test_product.id,
-            grade=self.grade_like
+        cls.grade_like = True
+        cls.grade_dislike = False
+        cls.count_like = ProductRating.objects.filter(
+            product_id=cls.test_product.id,
+            grade=cls.grade_like
         ).count()
-        self.count_dislike = ProductRating.objects.filter(
-            product_id=self.test_product.id,
-            grade=self.grade_dislike
+        cls.count_dislike = ProductRating.objects.filter(
+            product_id=cls.test_product.id,
+            grade=cls.grade_dislike
         ).count()
-        self.data_post_like = {
-            'product_id': self.test_product.id,
+        cls.data_post_like = {
+            'product_id': cls.test_product.id,
             'grade': 'like'
         }
-        self.data_post_dislike = {
-            'product_id': self.test_product.id,
+        cls.data_post_dislike = {
+            'product_id': cls.test_product.id,
             'grade': 'dislike'
         }
 
@@ -73,11 +81,7 @@ class ProductRatingModelViewPOSTMethodTestCase(TransactionTestCase):
             'like_count': self.count_like
         }
 
-        ProductRating.objects.create(
-            product_id=self.test_product.id,
-            user=self.test_user,
-            grade=self.grade_like
-        )
+        ProductRating.create_or_update_rating(self.grade_like, self.test_product.id, self.test_user)
 
         response = self.client.delete(
             path=f'/api/v1/rating/{self.test_product.id}/like/',
@@ -97,11 +101,7 @@ class ProductRatingModelViewPOSTMethodTestCase(TransactionTestCase):
             'dislike_count': self.count_like
         }
 
-        ProductRating.objects.create(
-            product_id=self.test_product.id,
-            user=self.test_user,
-            grade=self.grade_dislike
-        )
+        ProductRating.create_or_update_rating(self.grade_dislike, self.test_product.id, self.test_user)
 
         response = self.client.delete(
             path=f'/api/v1/rating/{self.test_product.id}/dislike/',
@@ -121,11 +121,7 @@ class ProductRatingModelViewPOSTMethodTestCase(TransactionTestCase):
             'dislike_count': self.count_dislike + 1
         }
 
-        ProductRating.objects.create(
-            product_id=self.test_product.id,
-            user=self.test_user,
-            grade=self.grade_like,
-        )
+        ProductRating.create_or_update_rating(self.grade_like, self.test_product.id, self.test_user)
 
         response = self.client.post(
             path=f'/api/v1/rating/{self.test_product.id}/dislike/',
@@ -148,3 +144,347 @@ class ProductRatingModelViewPOSTMethodTestCase(TransactionTestCase):
         )
         assert HttpStatusCode.UNAUTHORIZED.value == response.status_code
         assert expected_result == response.json()
+
+    def test_record_user_rating_product_not_found(self):
+        """
+        Case: record like from user for product id out of scope
+        Expect: not found errors' messages.
+        """
+        expected_result = {
+            'detail': NOT_FOUND
+        }
+
+        response = self.client.post(
+            path=f'/api/v1/rating/{self.test_product.id + 1}/like/',
+            headers={'Authorization': 'Bearer ' + str(RefreshToken.for_user(self.test_user).access_token)}
+        )
+
+        assert HttpStatusCode.NOT_FOUND.value == response.status_code
+        assert expected_result == response.json()
+
+    def test_swap_user_rating_updates_both_counters(self):
+        """
+        Case: swap like with dislike
+        Expect: like counter of the product decremented and dislike counter incremented
+        """
+        ProductRating.create_or_update_rating(self.grade_like, self.test_product.id, self.test_user)
+        ProductRating.create_or_update_rating(self.grade_dislike, self.test_product.id, self.test_user)
+
+        assert {'like_count': 0, 'dislike_count': 1} == Product.get_rating_counters(self.test_product.id)
+
+    def test_rebuild_rating_counters(self):
+        """
+        Case: ratings recorded with bulk_create, which doesn't update the counters of the product
+        Expect: the check reports inconsistent counters and the rebuild recounts them from the ratings
+        """
+        ProductRating.objects.bulk_create([ProductRating(
+            product_id=self.test_product.id,
+            user=self.test_user,
+            grade=self.grade_like
+        )])
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rating_counters', '--check', stdout=StringIO())
+
+        call_command('rebuild_rating_counters', stdout=StringIO())
+
+        assert {'like_count': 1, 'dislike_count': 0} == Product.get_rating_counters(self.test_product.id)
+        assert not ProductRating.get_products_with_inconsistent_rating_counters().exists()
+
+    def test_rating_counters_of_ratings_written_with_orm(self):
+        """
+        Case: create a like with the ORM as the admin does, change it to a dislike, then delete the user.
+        Expect: the counters of the product follow the rating, and no ratings and no counters are left.
+        """
+        test_rating = ProductRating.objects.create(
+            product_id=self.test_product.id,
+            user=self.test_user,
+            grade=self.grade_like
+        )
+
+        assert {'like_count': 1, 'dislike_count': 0} == Product.get_rating_counters(self.test_product.id)
+
+        test_rating.grade = self.grade_dislike
+        test_rating.save()
+
+        assert {'like_count': 0, 'dislike_count': 1} == Product.get_rating_counters(self.test_product.id)
+
+        self.test_user.delete()
+
+        assert {'like_count': 0, 'dislike_count': 0} == Product.get_rating_counters(self.test_product.id)
+        assert not ProductRating.get_products_with_inconsistent_rating_counters().exists()
+
+    def test_record_user_ratings_batch(self):
+        """
+        Case: record a batch of likes, dislikes and removed ratings of several products, of a missing product,
+        with two operations on one product
+        Expect: returned counters of the existing products in the order of the operations,
+        the last operation on a product applied, the counters consistent with the ratings
+        """
+        test_other_product = Product.objects.create(
+            title='title other test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=self.test_category,
+        )
+        test_third_product = Product.objects.create(
+            title='title third test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=self.test_category,
+        )
+        ProductRating.create_or_update_rating(self.grade_like, test_third_product.id, self.test_user)
+        ProductRating.create_or_update_rating(self.grade_like, test_other_product.id, self.test_user)
+
+        response = self.client.post(
+            path='/api/v1/rating/batch/',
+            data=[
+                {'product_id': test_other_product.id, 'grade': False},
+                {'product_id': self.test_product.id, 'grade': False},
+                {'product_id': 100, 'grade': True},
+                {'product_id': test_third_product.id, 'grade': None},
+                {'product_id': self.test_product.id, 'grade': True},
+            ],
+            content_type='application/json',
+            headers={'Authorization': 'Bearer ' + str(RefreshToken.for_user(self.test_user).access_token)}
+        )
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert [
+            {'product_id': test_other_product.id, 'like_count': 0, 'dislike_count': 1},
+            {'product_id': self.test_product.id, 'like_count': 1, 'dislike_count': 0},
+            {'product_id': test_third_product.id, 'like_count': 0, 'dislike_count': 0},
+        ] == response.json()
+        assert {
+            (test_other_product.id, False), (self.test_product.id, True),
+        } == set(ProductRating.objects.filter(user=self.test_user).values_list('product_id', 'grade'))
+        assert not ProductRating.get_products_with_inconsistent_rating_counters().exists()
+
+    def test_record_user_ratings_batch_bad_request(self):
+        """
+        Case: record a batch of ratings with an invalid grade, a product ID out of the range of IDs
+            and a batch with too many operations
+        Expect: 400 Bad request, no ratings recorded
+        """
+        for data in (
+                [{'product_id': self.test_product.id, 'grade': 'invalid'}],
+                [{'product_id': 2 ** 63, 'grade': True}],
+                [{'product_id': self.test_product.id, 'grade': True}] * 101,
+        ):
+            response = self.client.post(
+                path='/api/v1/rating/batch/',
+                data=data,
+                content_type='application/json',
+                headers={'Authorization': 'Bearer ' + str(RefreshToken.for_user(self.test_user).access_token)}
+            )
+
+            assert HttpStatusCode.BAD_REQUEST.value == response.status_code
+
+        assert not ProductRating.objects.exists()
+
+
+class ProductRatingConcurrencyTestCase(CatalogTransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.test_category = Category.objects.create(
+            title='Test title'
+        )
+        self.test_product = Product.objects.create(
+            title='title test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=self.test_category,
+        )
+        self.test_users = [
+            User.objects.create(username=f'test_user{number}', password='test_password')
+            for number in range(20)
+        ]
+
+    def rate_product(self, grade, user):
+        """Rate the product from a separate thread with its own database connection."""
+        try:
+            return ProductRating.create_or_update_rating(grade, self.test_product.id, user)
+        finally:
+            connection.close()
+
+    def test_concurrent_ratings_from_many_users(self):
+        """
+        Case: many users like and dislike the same product at the same time
+        Expect: every vote is recorded and the counters of the product match the ratings
+        """
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(
+                lambda user: self.rate_product(user.id % 3 != 0, user),
+                self.test_users * 5
+            ))
+
+        assert None not in results
+        assert ProductRating.objects.filter(product_id=self.test_product.id).count() == len(self.test_users)
+        assert {
+            'like_count': ProductRating.objects.filter(product_id=self.test_product.id, grade=True).count(),
+            'dislike_count': ProductRating.objects.filter(product_id=self.test_product.id, grade=False).count(),
+        } == Product.get_rating_counters(self.test_product.id)
+
+    def test_concurrent_swaps_from_one_user(self):
+        """
+        Case: one user swaps like and dislike of the same product at the same time
+        Expect: one rating of the user is recorded and the counters of the product match it
+        """
+        test_user = self.test_users[0]
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(lambda number: self.rate_product(bool(number % 2), test_user), range(50)))
+
+        rating_from_user = ProductRating.objects.get(product_id=self.test_product.id, user=test_user)
+
+        assert {
+            'like_count': int(rating_from_user.grade),
+            'dislike_count': int(not rating_from_user.grade),
+        } == Product.get_rating_counters(self.test_product.id)
+
+
+@override_settings(PRODUCT_RATING_WRITE_BEHIND=True)
+class ProductRatingWriteBehindTestCase(CatalogTransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.test_category = Category.objects.create(
+            title='Test title'
+        )
+        self.test_product = Product.objects.create(
+            title='title test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=self.test_category,
+        )
+        self.test_user = User.objects.create(
+            username='test_user',
+            password='test_password'
+        )
+        self.test_authorization = 'Bearer ' + str(RefreshToken.for_user(self.test_user).access_token)
+
+    def tearDown(self):
+        """
+        Stop the buffer, so its thread closes the database connection before the test database is dropped.
+        """
+        if rating_buffer._rating_buffer is not None:
+            rating_buffer._rating_buffer.stop()
+            rating_buffer._rating_buffer = None
+
+    def test_record_user_rating_write_behind(self):
+        """
+        Case: like and then dislike a product with the write-behind of ratings
+        Expect: 202 with the current counters, the dislike is recorded after the buffer is written
+        """
+        like_response = self.client.post(
+            path=f'/api/v1/rating/{self.test_product.id}/like/',
+            headers={'Authorization': self.test_authorization}
+        )
+        get_rating_buffer().flush()
+        dislike_response = self.client.post(
+            path=f'/api/v1/rating/{self.test_product.id}/dislike/',
+            headers={'Authorization': self.test_authorization}
+        )
+        get_rating_buffer().flush()
+
+        assert HttpStatusCode.ACCEPTED.value == like_response.status_code
+        assert {'like_count': 0} == like_response.json()
+        assert HttpStatusCode.ACCEPTED.value == dislike_response.status_code
+        assert {'dislike_count': 0} == dislike_response.json()
+        assert not ProductRating.objects.get(product_id=self.test_product.id, user=self.test_user).grade
+        assert {'like_count': 0, 'dislike_count': 1} == Product.get_rating_counters(self.test_product.id)
+
+    def test_record_user_rating_write_behind_product_not_found(self):
+        """
+        Case: like a missing product with the write-behind of ratings
+        Expect: 404 without putting the like to the buffer
+        """
+        response = self.client.post(
+            path='/api/v1/rating/1000/like/',
+            headers={'Authorization': self.test_authorization}
+        )
+
+        assert HttpStatusCode.NOT_FOUND.value == response.status_code
+        assert rating_buffer._rating_buffer is None
+
+    def test_combine_buffered_rating_operations(self):
+        """
+        Case: write a like, a removal of a dislike, a removal of the like and a dislike from the user in one batch
+        Expect: only the dislike is recorded, the removal of the dislike doesn't remove the like
+        """
+        result = ProductRating.apply_rating_operations([
+            (self.test_user.id, self.test_product.id, True, None),
+            (self.test_user.id, self.test_product.id, None, False),
+            (self.test_user.id, self.test_product.id, None, True),
+            (self.test_user.id, self.test_product.id, False, None),
+        ])
+
+        assert [{'product_id': self.test_product.id, 'like_count': 0, 'dislike_count': 1}] == result
+        assert not ProductRating.objects.get(product_id=self.test_product.id, user=self.test_user).grade
+
+        ProductRating.apply_rating_operations([
+            (self.test_user.id, self.test_product.id, True, None),
+            (self.test_user.id, self.test_product.id, None, False),
+        ])
+
+        assert ProductRating.objects.get(product_id=self.test_product.id, user=self.test_user).grade
+
+    def test_record_user_rating_buffer_full(self):
+        """
+        Case: like a product when the buffer is full with a dislike of the user
+        Expect: the like is put to the buffer with 202 after the dislike, so the like is recorded
+        """
+        rating_buffer._rating_buffer = RatingBuffer(max_size=1, batch_size=1, put_timeout=5)
+        rating_buffer._rating_buffer.put(self.test_user.id, self.test_product.id, False)
+
+        response = self.client.post(
+            path=f'/api/v1/rating/{self.test_product.id}/like/',
+            headers={'Authorization': self.test_authorization}
+        )
+        get_rating_buffer().flush()
+
+        assert HttpStatusCode.ACCEPTED.value == response.status_code
+        assert ProductRating.objects.get(product_id=self.test_product.id, user=self.test_user).grade
+        assert {'like_count': 1, 'dislike_count': 0} == Product.get_rating_counters(self.test_product.id)
+
+    @override_settings(PRODUCT_RATING_BUFFER_RETRY_AFTER=2)
+    def test_record_user_rating_buffer_full_with_writer_stalled(self):
+        """
+        Case: like a product when the buffer stays full with a dislike of the user, since its writer is stalled
+        Expect: 503 with Retry-After after the timeout, the dislike is recorded once the writer runs again
+        """
+        rating_buffer._rating_buffer = RatingBuffer(max_size=1, batch_size=1, put_timeout=0.1)
+        # The running test thread stands for a stalled writer, so the buffer doesn't start another one
+        rating_buffer._rating_buffer.worker = threading.current_thread()
+        rating_buffer._rating_buffer.put(self.test_user.id, self.test_product.id, False)
+
+        response = self.client.post(
+            path=f'/api/v1/rating/{self.test_product.id}/like/',
+            headers={'Authorization': self.test_authorization}
+        )
+        rating_buffer._rating_buffer.worker = None
+        rating_buffer._rating_buffer.start()
+        get_rating_buffer().flush()
+
+        assert HttpStatusCode.SERVICE_UNAVAILABLE.value == response.status_code
+        assert '2' == response.headers['Retry-After']
+        assert {'detail': 'Ratings are busy, retry later.'} == response.json()
+        assert {'like_count': 0, 'dislike_count': 1} == Product.get_rating_counters(self.test_product.id)
+
+    def test_write_buffered_rating_operations_of_missing_user(self):
+        """
+        Case: write a batch with a like of a missing user and a like of the user
+        Expect: the like of the user is recorded, the like of the missing user is skipped
+        """
+        RatingBuffer.write_batch([
+            (self.test_user.id + 1, self.test_product.id, True, None),
+            (self.test_user.id, self.test_product.id, True, None),
+        ])
+
+        assert [self.test_user.id] == list(ProductRating.objects.values_list('user_id', flat=True))
+        assert {'like_count': 1, 'dislike_count': 0} == Product.get_rating_counters(self.test_product.id)
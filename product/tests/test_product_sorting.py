@@ -0,0 +1,68 @@
+from django.db import connection
+from http import HTTPStatus as HttpStatusCode
+
+from product.models import Category, Product
+from product.tests.base import CatalogTestCase
+
+
+class ProductSortingTestCase(CatalogTestCase):
+    """
+    Sorting of the list of products by category test case implementation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_category = Category.objects.create(
+            title='Test Category'
+        )
+        for number in range(3):
+            Product.objects.create(
+                title=f'title test{number}',
+                text=None,
+                price=500 - number,
+                description='test description test',
+                category=cls.test_category,
+            )
+
+    def get_plan_nodes(self, products_list):
+        """Get the names of the nodes of the plan of the query, with sequential scans disabled"""
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                plan = products_list.explain()
+            finally:
+                cursor.execute('RESET enable_seqscan')
+
+        return [line.strip().lstrip('->').strip().split('  ')[0] for line in plan.splitlines()]
+
+    def test_every_sort_of_list_of_product_uses_index(self):
+        """
+        Case: explain the query of a page of products for every sort key and direction.
+        Expect: products are read in order from an index scan without sorting.
+        """
+        for sort_by, sort_field in Product.SORT_FIELDS.items():
+            for sort_dict in ('', '-'):
+                plan_nodes = self.get_plan_nodes(Product.get_filtered_and_sorted_list_of_product_by_category(
+                    self.test_category.id, sort_dict, sort_field, None)[:5])
+
+                assert any(node.startswith('Index Scan') for node in plan_nodes), (sort_by, plan_nodes)
+                assert not any(node.startswith('Sort') for node in plan_nodes), (sort_by, plan_nodes)
+
+    def test_get_list_of_product_by_category_sorted_by_unknown_field(self):
+        """
+        Case: get list of product by category sorted by a field which isn't a sort key.
+        Expect: bad request errors' messages.
+        """
+        expected_result = {
+            'detail': 'Bad request.'
+        }
+
+        response = self.client.get(
+            path=f'/api/v1/category/{self.test_category.id}/?sort_by=description',
+        )
+
+        assert HttpStatusCode.BAD_REQUEST.value == response.status_code
+        assert expected_result == response.json()
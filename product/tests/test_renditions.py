@@ -0,0 +1,130 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from http import HTTPStatus as HttpStatusCode
+from PIL import Image
+
+from product.factories import get_placeholder_image
+from product.models import Category, Product, ProductImage
+from product.tests.base import CatalogTestCase
+
+
+@override_settings(PRODUCT_IMAGE_RENDITION_WIDTHS=(320, 640, 1280))
+class ProductImageRenditionsTestCase(CatalogTestCase):
+    """
+    Renditions of images of products test case implementation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up data for tests.
+        """
+        cls.test_category = Category.objects.create(
+            title='Test category'
+        )
+        cls.test_product = Product.objects.create(
+            title='Test product title',
+            text=None,
+            price=500,
+            description='test product description',
+            category=cls.test_category,
+        )
+
+    def get_rendition_sizes(self, product_image, rendition_format):
+        """Get the formats and sizes of the rendition files of the image in a format"""
+        sizes = []
+        for _, name in product_image.renditions[rendition_format]:
+            with product_image.image.storage.open(name) as rendition_file, Image.open(rendition_file) as image:
+                sizes.append((image.format, image.size))
+
+        return sizes
+
+    def test_create_renditions_on_image_uploaded(self):
+        """
+        Case: upload an image wider than two of the widths of renditions and get the product.
+        Expect: WebP and JPEG renditions next to the image, the widest one not upscaled, in the srcset of the media.
+        """
+        product_image = ProductImage.objects.create(
+            title='test',
+            image=get_placeholder_image('test_uploaded_image.png', (1000, 500)),
+            product=self.test_product
+        )
+        image_path = f'image/product_images/{self.test_category.id}/test_uploaded_image'
+
+        response = self.client.get(path=f'/api/v1/product/{self.test_product.id}/')
+
+        assert HttpStatusCode.OK.value == response.status_code
+        assert [
+            ('WEBP', (320, 160)), ('WEBP', (640, 320)), ('WEBP', (1000, 500)),
+        ] == self.get_rendition_sizes(product_image, 'webp')
+        assert [
+            ('JPEG', (320, 160)), ('JPEG', (640, 320)), ('JPEG', (1000, 500)),
+        ] == self.get_rendition_sizes(product_image, 'jpeg')
+        assert [{
+            'src': f'/media/{image_path}.png',
+            'srcset': {
+                'webp': f'/media/{image_path}-320w.webp 320w, /media/{image_path}-640w.webp 640w, '
+                        f'/media/{image_path}-1000w.webp 1000w',
+                'jpeg': f'/media/{image_path}-320w.jpg 320w, /media/{image_path}-640w.jpg 640w, '
+                        f'/media/{image_path}-1000w.jpg 1000w',
+            },
+        }] == response.json()['media']
+        assert response.json()['media'] == self.client.get(
+            path=f'/api/v1/category/{self.test_category.id}/').json()['results'][0]['media']
+
+    def test_replace_renditions_on_image_changed(self):
+        """
+        Case: save an image without changes, upload another image instead, then delete the image.
+        Expect: the renditions are kept, replaced by the renditions of the other image, then deleted.
+        """
+        product_image = ProductImage.objects.create(
+            title='test',
+            image=get_placeholder_image('test_changed_image.png', (400, 400)),
+            product=self.test_product
+        )
+        storage = product_image.image.storage
+        renditions = product_image.renditions
+
+        product_image.title = 'test changed'
+        product_image.save()
+
+        assert renditions == ProductImage.objects.get(pk=product_image.pk).renditions
+
+        product_image.image = get_placeholder_image('test_other_image.png', (200, 100))
+        product_image.save()
+
+        assert not any(storage.exists(name) for _, name in renditions['webp'] + renditions['jpeg'])
+        assert [('WEBP', (200, 100))] == self.get_rendition_sizes(product_image, 'webp')
+        assert product_image.renditions == ProductImage.objects.get(pk=product_image.pk).renditions
+
+        other_renditions = product_image.renditions
+        product_image.delete()
+
+        assert not any(storage.exists(name) for _, name in other_renditions['webp'] + other_renditions['jpeg'])
+
+    def test_create_image_renditions_command(self):
+        """
+        Case: create renditions of an image without renditions and of an image which isn't a file with the command.
+        Expect: the renditions of the image, no renditions of the missing file, the media of the product changed.
+        """
+        product_image = ProductImage.objects.create(
+            title='test',
+            image=get_placeholder_image('test_image.png', (400, 400)),
+            product=self.test_product
+        )
+        ProductImage.objects.filter(pk=product_image.pk).update(renditions={})
+        with self.assertLogs('main', level='WARNING'):
+            ProductImage.objects.create(title='test missing', image='image/missing.png', product=self.test_product)
+        media_before = self.client.get(path=f'/api/v1/product/{self.test_product.id}/').json()['media']
+
+        with self.assertLogs('main', level='WARNING'):
+            call_command('create_image_renditions', '--missing', stdout=StringIO())
+
+        product_image.refresh_from_db()
+        media = self.client.get(path=f'/api/v1/product/{self.test_product.id}/').json()['media']
+
+        assert [('JPEG', (320, 320)), ('JPEG', (400, 400))] == self.get_rendition_sizes(product_image, 'jpeg')
+        assert [{}, {}] == [product_media['srcset'] for product_media in media_before]
+        assert [{'webp', 'jpeg'}, set()] == [set(product_media['srcset']) for product_media in media]
@@ -0,0 +1,130 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.test import LiveServerTestCase
+
+from product.models import Category, Product, ProductRating
+from product.tests.base import CatalogTransactionTestCase
+
+
+class ReplayTrafficCommandTestCase(CatalogTransactionTestCase):
+    """
+    Replay of captured traffic test case implementation.
+    """
+
+    def setUp(self):
+        """
+        Set up data for tests.
+        """
+        super().setUp()
+        self.test_category = Category.objects.create(
+            title='Test Category'
+        )
+        self.test_product = Product.objects.create(
+            title='title test',
+            text=None,
+            price=500,
+            description='test description test',
+            category=self.test_category,
+        )
+        self.test_user = User.objects.create(
+            username='test_user',
+            password='test_password'
+        )
+        self.test_directory = tempfile.TemporaryDirectory()
+        self.test_records_path = os.path.join(self.test_directory.name, 'requests.jsonl')
+        self.test_output_path = os.path.join(self.test_directory.name, 'report.json')
+        self.write_records([
+            {'method': 'GET', 'path': f'/api/v1/category/{self.test_category.id}/', 'query': {'sort_by': 'price'}},
+            {'method': 'GET', 'path': f'/api/v1/product/{self.test_product.id}/', 'query': ''},
+            {'path': f'/api/v1/product/{self.test_product.id}/'},
+            {'method': 'post', 'path': f'/api/v1/rating/{self.test_product.id}/like/', 'user': 'test_user'},
+            {'method': 'POST', 'path': '/api/v1/rating/batch/', 'user': self.test_user.id,
+             'body': [{'product_id': self.test_product.id, 'grade': False}]},
+            {'method': 'POST', 'path': f'/api/v1/rating/{self.test_product.id}/like/', 'user': 'test_missing_user'},
+        ])
+
+    def tearDown(self):
+        self.test_directory.cleanup()
+
+    def write_records(self, records):
+        with open(self.test_records_path, 'w') as records_file:
+            records_file.write('\n'.join(json.dumps(record) for record in records) + '\n\n')
+
+    def test_replay_traffic_in_process(self):
+        """
+        Case: replay requests in the process with two threads, with the output to a file.
+        Expect: the report of every endpoint, the requests of users are authorized, missing users aren't.
+        """
+        stderr = StringIO()
+        call_command('replay_traffic', self.test_records_path, '--concurrency', '2', '--output',
+                     self.test_output_path, stdout=StringIO(), stderr=stderr)
+
+        with open(self.test_output_path) as output_file:
+            report = json.load(output_file)
+
+        assert 6 == report['requests']
+        assert {'200': 2} == report['results']['GET /api/v1/product/<int:pk>/']['statuses']
+        assert {'200': 1} == report['results']['GET /api/v1/category/<int:category_id>/']['statuses']
+        assert {'200': 1, '401': 1} == report['results']['POST /api/v1/rating/<int:product_id>/like/']['statuses']
+        assert {'200': 1} == report['results']['POST /api/v1/rating/batch/']['statuses']
+        assert 0 == sum(results['errors'] for results in report['results'].values())
+        assert 'test_missing_user' in stderr.getvalue()
+        assert 1 == ProductRating.objects.filter(user=self.test_user).count()
+
+    def test_replay_traffic_compare(self):
+        """
+        Case: replay requests twice, comparing the second replay with the first one.
+        Expect: the changes of the latency of endpoints from the first replay.
+        """
+        call_command('replay_traffic', self.test_records_path, '--output', self.test_output_path, stdout=StringIO(),
+                     stderr=StringIO())
+        stdout = StringIO()
+        call_command('replay_traffic', self.test_records_path, '--repeat', '2', '--compare', self.test_output_path,
+                     stdout=stdout, stderr=StringIO())
+
+        assert '12 requests' in stdout.getvalue()
+        assert 'Changes from the baseline' in stdout.getvalue()
+
+    def test_replay_traffic_without_requests(self):
+        """
+        Case: replay a file without requests.
+        Expect: the command fails.
+        """
+        self.write_records([{'method': 'GET'}])
+
+        with self.assertRaises(CommandError):
+            call_command('replay_traffic', self.test_records_path, stdout=StringIO())
+
+
+class ReplayTrafficHTTPTestCase(LiveServerTestCase):
+    """
+    Replay of captured traffic over HTTP test case implementation.
+    """
+
+    def test_replay_traffic_over_http(self):
+        """
+        Case: replay requests of an existing and a missing product over HTTP.
+        Expect: the statuses of the responses of the server in the report.
+        """
+        test_category = Category.objects.create(title='Test Category')
+        test_product = Product.objects.create(
+            title='title test', price=500, description='test description test', category=test_category)
+        stdin = StringIO('\n'.join(json.dumps(record) for record in [
+            {'method': 'GET', 'path': f'/api/v1/product/{test_product.id}/'},
+            {'method': 'GET', 'path': '/api/v1/product/1000/'},
+        ]))
+
+        with tempfile.TemporaryDirectory() as test_directory:
+            test_output_path = os.path.join(test_directory, 'report.json')
+            with self.settings(ALLOWED_HOSTS=['localhost']):
+                call_command('replay_traffic', '-', '--url', self.live_server_url, '--output', test_output_path,
+                             stdin=stdin, stdout=StringIO())
+            with open(test_output_path) as output_file:
+                report = json.load(output_file)
+
+        assert {'200': 1, '404': 1} == report['results']['GET /api/v1/product/<int:pk>/']['statuses']
@@ -1,18 +1,19 @@
 import json
 
 from django.contrib.auth.models import User
-from django.test import TransactionTestCase
+from django.test import TestCase
 from http import HTTPStatus as HttpStatusCode
 
 
-class UserModelViewPOSTMethodTestCase(TransactionTestCase):
-    def setUp(self):
-        self.test_user = User.objects.create_user(
+class UserModelViewPOSTMethodTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user(
             username='main_test',
             password='main_test_pass'
         )
-        self.username = 'test'
-        self.password = 'test_pass'
+        cls.username = 'test'
+        cls.password = 'test_pass'
 
     def test_create_user(self):
         data = {
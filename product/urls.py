@@ -1,20 +1,40 @@
 from django.urls import path
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
+from .cache import (
+    cache_versioned_page,
+    category_version_keys,
+    categories_version_keys,
+    normalize_product_list_query_params,
+    normalize_facets_query_params,
+)
+from .conditional import (
+    product_etag,
+    product_last_modified,
+    categories_etag,
+    category_etag,
+)
 from .views import (
     ListOfProductsByCategory,
     ItemOfProducts,
+    ListOfProductsByIds,
     ListOfCategories,
     UniqueFeaturesProductsByCategory,
     DislikeFromUser,
     LikeFromUser,
+    RatingBatch,
 )
 
 urlpatterns = [
-    path('category/<int:category_id>/', cache_page(60*15, cache='database_cached')(ListOfProductsByCategory.as_view())),
-    path('feature/category/<int:category_id>/', UniqueFeaturesProductsByCategory.as_view()),
-    path('category/', cache_page(60*15, cache='default')(ListOfCategories.as_view())),
-    path('product/<int:pk>/', ItemOfProducts.as_view()),
+    path('category/<int:category_id>/', condition(etag_func=category_etag)(cache_versioned_page(
+        category_version_keys, normalize_product_list_query_params)(ListOfProductsByCategory.as_view()))),
+    path('feature/category/<int:category_id>/', condition(etag_func=category_etag)(cache_versioned_page(
+        category_version_keys, normalize_facets_query_params)(UniqueFeaturesProductsByCategory.as_view()))),
+    path('category/', condition(etag_func=categories_etag)(cache_versioned_page(
+        categories_version_keys)(ListOfCategories.as_view()))),
+    path('product/', ListOfProductsByIds.as_view()),
+    path('product/<int:pk>/', condition(product_etag, product_last_modified)(ItemOfProducts.as_view())),
     path('rating/<int:product_id>/like/', LikeFromUser.as_view()),
     path('rating/<int:product_id>/dislike/', DislikeFromUser.as_view()),
+    path('rating/batch/', RatingBatch.as_view()),
 ]
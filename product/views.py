@@ -1,14 +1,20 @@
 from http import HTTPStatus as HttpStatusCode
+from django.conf import settings
 from django.http import JsonResponse
 from rest_framework import generics
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .errors import NOT_FOUND
+from .cache import get_versioned_data, product_version_keys
+from .errors import NOT_FOUND, BAD_DATA_IN_REQUEST, RatingBufferFull
+from .metrics import measure
+from .pagination import ProductListPagination
+from .rating_buffer import put_rating_operation
 from .models import (
     Product,
     Category,
-    ProductRating, Features,
+    ProductRating, CategoryFacet,
 )
 from .permission import (
     IsAdminOrReadOnly,
@@ -16,22 +22,70 @@ from .permission import (
 )
 from .serializer import (
     CategorySerializer,
-    ProductListSerializer, ProductRatingSerializer, ProductSerializer, FeaturesSerializer,
+    ProductListSerializer, ProductRatingSerializer, ProductSerializer, CategoryFacetSerializer,
+    RatingOperationSerializer, get_current_user_rating, get_product_list_rows,
 )
 
 
-class ListOfProductsByCategory(generics.ListAPIView):
+class SerializerTimingMixin:
     """
-    A view for listing products by category.
+    A mixin of list views measuring the serialization of the list as the `serializer` time of the request.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with measure('serializer'):
+                data = self.get_serializer(page, many=True).data
+            return self.get_paginated_response(data)
+
+        with measure('serializer'):
+            data = self.get_serializer(queryset, many=True).data
+        return Response(data)
+
+
+class FeaturesFilterMixin:
+    """
+    A mixin reading the features selected for filtering products from the query parameters.
+    """
+
+    # IDs of features are bigint
+    max_feature_id = 9223372036854775807
+
+    def get_query_params_for_filter(self):
+        """
+        Get the filter parameter values from the query parameters.
+        Returns the filter parameter values as a list of IDs of features, None without filter parameters.
+        Raises ParseError exception if a value isn't an ID of a feature.
+        """
+        try:
+            filter_params = [int(feature_id) for feature_id in self.request.query_params.getlist('filter')]
+        except ValueError:
+            raise ParseError(BAD_DATA_IN_REQUEST)
+
+        if any(not 0 < feature_id <= self.max_feature_id for feature_id in filter_params):
+            raise ParseError(BAD_DATA_IN_REQUEST)
+
+        return filter_params or None
+
+
+class ListOfProductsByCategory(FeaturesFilterMixin, generics.ListAPIView):
+    """
+    A view for listing products by category, paginated by limit and offset or by cursor.
     Only authenticated administrators have write access, while all users have read access.
     """
     queryset = Product.objects.all()
     serializer_class = ProductListSerializer
     permission_classes = [IsAdminOrReadOnly, ]
+    pagination_class = ProductListPagination
+    # Values of products for the rows of the list, the field of the sort is added for the cursor
+    list_values_fields = ('id', 'title', 'price', 'category__title', 'category_id')
 
     def get_queryset(self):
         """
-        Returns the queryset of products filtered and sorted based on the provided query parameters.
+        Returns the values of products filtered and sorted based on the provided query parameters,
+        and keeps the count of the products in `products_count` for the pagination if it is known without a query.
         Raises NotFound exception if no products are found.
         """
         sort_dict, sort_by = self.get_query_params_for_sort()
@@ -39,33 +93,79 @@ class ListOfProductsByCategory(generics.ListAPIView):
 
         product_list = Product.get_filtered_and_sorted_list_of_product_by_category(
             self.kwargs['category_id'], sort_dict, sort_by, filter_params)
+        self.products_count = Product.get_count_of_filtered_products(self.kwargs['category_id'], filter_params)
 
-        if not product_list:
+        if self.products_count == 0 or (self.products_count is None and not product_list.exists()):
             raise NotFound
 
-        return product_list
+        return product_list.values(*dict.fromkeys(self.list_values_fields + (sort_by,)))
+
+    def list(self, request, *args, **kwargs):
+        """
+        Returns the page of products built from the values of products, the same as with the serializer.
+        """
+        page = self.paginate_queryset(self.get_queryset())
+
+        with measure('serializer'):
+            rows = get_product_list_rows(page)
+        return self.get_paginated_response(rows)
 
     def get_query_params_for_sort(self):
         """
         Get the sort_dict and sort_by values from the query parameters.
-        Returns the sort_dict and sort_by values.
+        Returns the sort_dict and the field to sort by for the sort_by value.
+        Raises ParseError exception if the sort_by value isn't one of the sort keys of products.
         """
         dictionary_from_id = self.request.query_params
 
         sort_dict = '-' if dictionary_from_id.get('sort_dict') == 'desc' else ''
         sort_by = 'title' if dictionary_from_id.get('sort_by') is None else dictionary_from_id.get('sort_by')
 
-        return sort_dict, sort_by
+        if sort_by not in Product.SORT_FIELDS:
+            raise ParseError(BAD_DATA_IN_REQUEST)
 
-    def get_query_params_for_filter(self):
+        return sort_dict, Product.SORT_FIELDS[sort_by]
+
+
+class RatingFromUserMixin:
+    """
+    A mixin writing the rating of a product by the current user, or putting it to the write-behind buffer
+    of ratings when `PRODUCT_RATING_WRITE_BEHIND` is enabled.
+    """
+
+    def write_rating(self, grade, product_id, is_deleted=False):
         """
-        Get the filter parameter values from the query parameters.
-        Returns the filter parameter values as a list.
+        Write the rating, or put it to the buffer and get the current counters of the product.
+
+        Arguments:
+            grade (bool): The grade value.
+            product_id (int): ID of the product.
+            is_deleted (bool): Whether to delete the rating with the grade.
+
+        Returns:
+            A tuple of a dictionary with `like_count` and `dislike_count` of the product, or None if the product
+            doesn't exist, and the status of the response: 202 if the rating is put to the buffer.
+        Raises RatingBufferFull exception if the buffer stays full.
         """
-        return self.request.query_params.getlist('filter') if self.request.query_params.getlist('filter') else None
+        if settings.PRODUCT_RATING_WRITE_BEHIND:
+            rating_counters = Product.get_rating_counters(product_id)
+            if rating_counters is None:
+                return None, HttpStatusCode.NOT_FOUND
+            if is_deleted:
+                is_put = put_rating_operation(self.request.user.id, product_id, None, grade)
+            else:
+                is_put = put_rating_operation(self.request.user.id, product_id, grade)
+            if not is_put:
+                raise RatingBufferFull(settings.PRODUCT_RATING_BUFFER_RETRY_AFTER)
+
+            return rating_counters, HttpStatusCode.ACCEPTED
 
+        if is_deleted:
+            return ProductRating.delete_rating(grade, product_id, self.request.user), HttpStatusCode.OK
+        return ProductRating.create_or_update_rating(grade, product_id, self.request.user), HttpStatusCode.OK
 
-class LikeFromUser(APIView):
+
+class LikeFromUser(RatingFromUserMixin, APIView):
     """
     API view for rating a product with a dislike.
     Only authenticated users have access to rate a product.
@@ -83,26 +183,28 @@ class LikeFromUser(APIView):
             product_id (Request): a product id.
 
         Returns:
-            updated like count
+            updated like count, or the current like count with 202 if the like is written later
             Otherwise, incoming arguments validation errors.
         """
-        if ProductRating.create_or_update_rating(True, product_id, self.request.user):
+        rating_counters, status = self.write_rating(True, product_id)
+        if rating_counters is None:
             return JsonResponse({'detail': NOT_FOUND}, status=HttpStatusCode.NOT_FOUND)
         return JsonResponse(
-            {'like_count': ProductRating.get_count_rating_for_one_product(product_id, True)},
-            status=HttpStatusCode.OK
+            {'like_count': rating_counters['like_count']},
+            status=status
         )
 
     def delete(self, request, product_id):
-        if ProductRating.delete_rating(True, product_id, self.request.user):
+        rating_counters, status = self.write_rating(True, product_id, is_deleted=True)
+        if rating_counters is None:
             return JsonResponse({'detail': NOT_FOUND}, status=HttpStatusCode.NOT_FOUND)
         return JsonResponse(
-            {'like_count': ProductRating.get_count_rating_for_one_product(product_id, True)},
-            status=HttpStatusCode.OK
+            {'like_count': rating_counters['like_count']},
+            status=status
         )
 
 
-class DislikeFromUser(APIView):
+class DislikeFromUser(RatingFromUserMixin, APIView):
     """
     API view for rating a product with a dislike.
     Only authenticated users have access to rate a product.
@@ -120,36 +222,154 @@ class DislikeFromUser(APIView):
             product_id (Request): a product id.
 
         Returns:
-            updated dislike count
+            updated dislike count, or the current dislike count with 202 if the dislike is written later
             Otherwise, incoming arguments validation errors.
         """
-        if ProductRating.create_or_update_rating(False, product_id, self.request.user):
+        rating_counters, status = self.write_rating(False, product_id)
+        if rating_counters is None:
             return JsonResponse({'detail': NOT_FOUND}, status=HttpStatusCode.NOT_FOUND)
         return JsonResponse(
-            {'dislike_count': ProductRating.get_count_rating_for_one_product(product_id, False)},
-            status=HttpStatusCode.OK
+            {'dislike_count': rating_counters['dislike_count']},
+            status=status
         )
 
     def delete(self, request, product_id):
-        if ProductRating.delete_rating(False, product_id, self.request.user):
+        rating_counters, status = self.write_rating(False, product_id, is_deleted=True)
+        if rating_counters is None:
             return JsonResponse({'detail': NOT_FOUND}, status=HttpStatusCode.NOT_FOUND)
         return JsonResponse(
-            {'dislike_count': ProductRating.get_count_rating_for_one_product(product_id, False)},
-            status=HttpStatusCode.OK
+            {'dislike_count': rating_counters['dislike_count']},
+            status=status
         )
 
 
+class RatingBatch(APIView):
+    """
+    API view for rating several products with likes and dislikes or removing the ratings at once.
+    Only authenticated users have access to rate products.
+    """
+    queryset = ProductRating.objects.all()
+    permission_classes = [IsAdminOrAuthenticatedUser, ]
+    serializer_class = RatingOperationSerializer
+
+    def post(self, request):
+        """
+        Apply a list of rating operations in one transaction and return the updated counters of the products.
+
+        Arguments:
+            request (Request): a request with a list of operations like `{"product_id": 1, "grade": true}`,
+                the grade is true for a like, false for a dislike and null to remove the rating.
+
+        Returns:
+            like and dislike counters of the existing products in the order of the operations
+            Otherwise, incoming arguments validation errors.
+        """
+        serializer = self.serializer_class(
+            data=request.data, many=True, max_length=settings.PRODUCT_RATING_BATCH_MAX_OPERATIONS)
+        serializer.is_valid(raise_exception=True)
+
+        rating_counters = ProductRating.apply_rating_operations([
+            (request.user.id, operation['product_id'], operation['grade'], None)
+            for operation in serializer.validated_data
+        ])
+        if rating_counters is None:
+            return JsonResponse({'detail': NOT_FOUND}, status=HttpStatusCode.NOT_FOUND)
+        return JsonResponse(rating_counters, status=HttpStatusCode.OK, safe=False)
+
+
 class ItemOfProducts(generics.RetrieveAPIView):
     """
     A view for retrieving a single product item.
     Only authenticated administrators have write access, while all users have read access.
     """
-    queryset = Product.objects.all()
+    queryset = Product.get_list_with_category_features_and_images(Product.objects.all())
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrReadOnly, ]
 
+    def get_queryset(self):
+        """
+        Returns the queryset of products annotated with an empty grade of the user,
+        so the product is serialized the same way for all users and can be cached.
+        """
+        return ProductRating.annotate_rating_from_user(super().get_queryset(), None)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Returns the product from the cache, with the rating of the product by the current user
+        selected for every request, or taken from the validators of the conditional request.
+        """
+        data = get_versioned_data(product_version_keys(self.kwargs['pk']), 'item', self.get_serialized_product)
+
+        if request.user.is_authenticated:
+            validators = getattr(request._request, '_product_validators', None)
+            if validators is not None and validators['user_id'] == request.user.id:
+                current_user_grade = validators['current_user_grade']
+            else:
+                current_user_rating = ProductRating.get_rating_from_user(self.kwargs['pk'], request.user)
+                current_user_grade = current_user_rating.grade if current_user_rating else None
+
+            data = {
+                **data,
+                'rating': {**data['rating'], 'current_user_rating': get_current_user_rating(current_user_grade)},
+            }
+
+        return Response(data)
+
+    def get_serialized_product(self):
+        """
+        Returns the serialized product and that it can be cached.
+        Raises NotFound exception if the product isn't found.
+        """
+        product = self.get_object()
+        with measure('serializer'):
+            return self.get_serializer(product).data, True
+
+
+class ListOfProductsByIds(SerializerTimingMixin, generics.ListAPIView):
+    """
+    A view for retrieving several products by the `ids` query parameter, like `?ids=1,2,3`,
+    in the order of the IDs. Missing products are skipped.
+    Only authenticated administrators have write access, while all users have read access.
+    """
+    queryset = Product.get_list_with_category_features_and_images(Product.objects.all())
+    serializer_class = ProductSerializer
+    permission_classes = [IsAdminOrReadOnly, ]
+    pagination_class = None
+
+    def get_queryset(self):
+        """
+        Returns the products with the requested IDs in the order of the IDs, annotated with the current user's grade,
+        so the products, their ratings, features and images are selected in three queries for any number of IDs.
+        """
+        product_ids = self.get_query_params_for_ids()
+        current_user = self.request.user if self.request.user.is_authenticated else None
+        products_by_ids = {
+            product.id: product
+            for product in ProductRating.annotate_rating_from_user(
+                super().get_queryset().filter(id__in=product_ids), current_user)
+        }
+
+        return [products_by_ids[product_id] for product_id in product_ids if product_id in products_by_ids]
+
+    def get_query_params_for_ids(self):
+        """
+        Get the unique product IDs from the `ids` query parameter in the requested order.
+        Raises ParseError exception if the IDs are missing, aren't integers or there are more than
+        `PRODUCT_BULK_MAX_IDS` of them.
+        """
+        try:
+            product_ids = list(dict.fromkeys(
+                int(product_id) for product_id in self.request.query_params.get('ids', '').split(',')))
+        except ValueError:
+            raise ParseError(BAD_DATA_IN_REQUEST)
+
+        if len(product_ids) > settings.PRODUCT_BULK_MAX_IDS:
+            raise ParseError(BAD_DATA_IN_REQUEST)
+
+        return product_ids
+
 
-class ListOfCategories(generics.ListAPIView):
+class ListOfCategories(SerializerTimingMixin, generics.ListAPIView):
     """
     A view for listing categories.
     Only authenticated administrators have write access, while all users have read access.
@@ -159,21 +379,23 @@ class ListOfCategories(generics.ListAPIView):
     serializer_class = CategorySerializer
 
 
-class UniqueFeaturesProductsByCategory(generics.ListAPIView):
+class UniqueFeaturesProductsByCategory(SerializerTimingMixin, FeaturesFilterMixin, generics.ListAPIView):
     """
-    A view for retrieving unique keys of features by products in a specific category.
+    A view for retrieving unique keys of features by products in a specific category
+    with the values of the keys and the count of products having them, respecting the selected filters.
     Only authenticated administrators have write access, while all users have read access.
     """
-    queryset = Features.objects.all()
+    queryset = CategoryFacet.objects.all()
     permission_classes = [IsAdminOrReadOnly, ]
-    serializer_class = FeaturesSerializer
+    serializer_class = CategoryFacetSerializer
 
     def get_queryset(self):
         """
-        Returns a queryset of unique feature keys by category.
+        Returns a list of unique feature keys by category with their options and the count of products
+        matching the filter parameters.
         Raises NotFound exception if no features are found.
         """
-        result_queryset = Features.get_unique_features_keys_by_category(self.kwargs['category_id'])
-        if result_queryset:
-            return result_queryset
+        facets = CategoryFacet.get_facets_by_category(self.kwargs['category_id'], self.get_query_params_for_filter())
+        if facets:
+            return facets
         raise NotFound
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'product.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -121,13 +122,19 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Tests run in parallel processes, each with its own clone of the test database
+TEST_RUNNER = 'shop.test_runner.ParallelDiscoverRunner'
+
+# Number of test processes without --parallel, "auto" for a process per core or DJANGO_TEST_PROCESSES
+TEST_PROCESSES = 'auto'
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 5,
+    # The browsable API is rendered only for development
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+        'product.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
@@ -179,16 +186,104 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Engine filtering products by features and counting facets: 'orm' runs queries on the features of products,
+# 'bitmap' keeps an in-process bitmap index of the features of products per category
+PRODUCT_FILTER_ENGINE = 'orm'
+
+# Seconds after which a process reloads the bitmap index of a category
+PRODUCT_BITMAP_INDEX_TTL = 60
+
+# Total count of products in pages of products: 'exact' counts them on every request, 'cached' keeps the count
+# in PRODUCT_LIST_COUNT_CACHE for PRODUCT_LIST_COUNT_CACHE_TIMEOUT seconds, 'estimate' takes the estimate of
+# the query planner, 'none' skips the count of keyset pages (limit and offset pages count them exactly)
+PRODUCT_LIST_COUNT = 'exact'
+PRODUCT_LIST_COUNT_CACHE = 'catalog'
+PRODUCT_LIST_COUNT_CACHE_TIMEOUT = 60 * 5
+
+# Maximum number of products requested at once by IDs
+PRODUCT_BULK_MAX_IDS = 100
+
+# Maximum number of rating operations applied at once
+PRODUCT_RATING_BATCH_MAX_OPERATIONS = 100
+
+# Whether the like and dislike views put ratings to an in-process buffer written in batches by a background thread
+PRODUCT_RATING_WRITE_BEHIND = False
+
+# Maximum number of rating operations waiting in the buffer
+PRODUCT_RATING_BUFFER_SIZE = 10000
+
+# Maximum number of rating operations written in one batch
+PRODUCT_RATING_BUFFER_BATCH_SIZE = 500
+
+# Seconds a view waits for a place in a full buffer, and the seconds of `Retry-After` of the 503 response
+# telling the client to retry the rating when the buffer stays full
+PRODUCT_RATING_BUFFER_PUT_TIMEOUT = 0.5
+PRODUCT_RATING_BUFFER_RETRY_AFTER = 1
+
+# Seconds the process waits on exit for the buffer to be written
+PRODUCT_RATING_BUFFER_STOP_TIMEOUT = 10
+
+# Widths in pixels and formats ("webp", "jpeg") of the renditions of uploaded images of products,
+# and the quality of the renditions from 1 to 100
+PRODUCT_IMAGE_RENDITION_WIDTHS = (320, 640, 1280)
+PRODUCT_IMAGE_RENDITION_FORMATS = ('webp', 'jpeg')
+PRODUCT_IMAGE_RENDITION_QUALITY = 80
+
+# Whether responses get the Server-Timing header with the number and time of queries and the time of serialization,
+# only in development by default, since it exposes the queries of every request to clients
+REQUEST_METRICS_SERVER_TIMING = DEBUG
+
+# File of the JSON lines with the metrics of every request
+PERFORMANCE_LOG_FILE = os.environ.get('PERFORMANCE_LOG_FILE', os.path.join(BASE_DIR, 'performance.log'))
+
+# Requests with more queries, longer duration in seconds or larger responses in bytes are logged with WARNING
+REQUEST_METRICS_MAX_QUERIES = 20
+REQUEST_METRICS_MAX_DURATION = 0.5
+REQUEST_METRICS_MAX_RESPONSE_SIZE = 1024 * 1024
+
+# Cache of responses of catalog views, and the shared cache of versions of categories invalidating them
+PRODUCT_CACHE = 'catalog'
+PRODUCT_CACHE_TIMEOUT = 60 * 60 * 6
+PRODUCT_VERSION_CACHE = 'default'
+
+# Only one request computes a cached response at a time: the other requests wait for it for up to
+# PRODUCT_CACHE_LOCK_TIMEOUT seconds, or get the expired response for up to PRODUCT_CACHE_STALE_TIMEOUT seconds
+# after the expiration. Responses are recomputed early with the probability growing with
+# PRODUCT_CACHE_EARLY_REFRESH_BETA, 0 disables the early recomputation
+PRODUCT_CACHE_LOCK_TIMEOUT = 10
+PRODUCT_CACHE_STALE_TIMEOUT = 60 * 5
+PRODUCT_CACHE_EARLY_REFRESH_BETA = 1.0
+
+# Memcached servers of the shared cache, separated by ";", files in CACHE_DIRECTORY shared by the processes
+# of the host if not set. The cache is shared by all processes, since it has the versions of PRODUCT_VERSION_CACHE
+# and the locks of responses, so its add and incr must be atomic across the processes
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION')
+CACHE_DIRECTORY = os.environ.get('CACHE_DIRECTORY', os.path.join(BASE_DIR, 'category_cache'))
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': os.path.join(BASE_DIR, 'category_cache'),
+        'BACKEND': 'django.core.cache.backends.memcached.PyLibMCCache',
+        'LOCATION': MEMCACHED_LOCATION.split(';'),
+        'OPTIONS': {
+            'binary': True,
+            'behaviors': {'tcp_nodelay': True, 'ketama': True},
+        },
+    } if MEMCACHED_LOCATION else {
+        'BACKEND': 'product.cache_backends.LockedFileBasedCache',
+        'LOCATION': CACHE_DIRECTORY,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Hot entries of the shared cache in the memory of the process, for values not changing under the same key
+    'catalog': {
+        'BACKEND': 'product.cache_backends.TwoLevelCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+        },
     },
-    'database_cached': {
-        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
-        'LOCATION': 'cache_table',
-
-    }
 }
 
 LOGGING = {
@@ -198,6 +293,10 @@ LOGGING = {
         'main_format': {
             'format': '{module} || {asctime} || {levelname} || {filename} || {message}',
             'style': '{',
+        },
+        'performance_format': {
+            'format': '{message}',
+            'style': '{',
         }
     },
 
@@ -207,6 +306,13 @@ LOGGING = {
             'formatter': 'main_format',
             'level': 'WARNING',
             'filename': 'information.log',
+        },
+        'performance_file': {
+            'class': 'logging.FileHandler',
+            'formatter': 'performance_format',
+            'level': 'INFO',
+            'filename': PERFORMANCE_LOG_FILE,
+            'delay': True,
         }
     },
 
@@ -215,6 +321,11 @@ LOGGING = {
             'handlers': ['in_file', ],
             'level': 'WARNING',
             'propagate': True,
+        },
+        'performance': {
+            'handlers': ['performance_file', ],
+            'level': 'INFO',
+            'propagate': False,
         }
     },
 
@@ -0,0 +1,43 @@
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner, get_max_test_processes
+from django.test.utils import override_settings
+
+
+class ParallelDiscoverRunner(DiscoverRunner):
+    """
+    Test runner running tests in `TEST_PROCESSES` processes unless `--parallel` is given, with "auto" for
+    a process per core or `DJANGO_TEST_PROCESSES`. Every process gets its own clone of the Postgres test database.
+
+    The shared default cache is replaced with the local memory cache of every process, so processes clearing caches
+    don't clear the caches of each other, and tests don't write to the cache of the project.
+    The handlers of the `performance` logger are removed, so tests don't write the metrics of their requests
+    to `PERFORMANCE_LOG_FILE`; `assertLogs` still gets them.
+    """
+
+    def __init__(self, parallel=0, **kwargs):
+        if not parallel and not kwargs.get('pdb'):
+            parallel = settings.TEST_PROCESSES
+        if parallel == 'auto':
+            parallel = get_max_test_processes()
+        super().__init__(parallel=parallel, **kwargs)
+        self.caches_override = override_settings(CACHES={
+            **settings.CACHES,
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'shared',
+            },
+        })
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.caches_override.enable()
+        performance_logger = logging.getLogger('performance')
+        self.performance_handlers = performance_logger.handlers
+        performance_logger.handlers = [logging.NullHandler()]
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger('performance').handlers = self.performance_handlers
+        self.caches_override.disable()
+        super().teardown_test_environment(**kwargs)